@@ -0,0 +1,114 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from dashboard import arrow_store, datasource
+from dashboard.ages import BANDINGS
+from dashboard.config import SECRETS_PATH, load_secrets
+from dashboard.penetration import (
+    DATE_COL, build_region_tree, node_path, prepare_patients, region_label, region_tables,
+)
+from dashboard.population import PopulationTable
+from dashboard.regions import CODE_COL, LEVELS, prepare_population
+from dashboard.report import REPORT_FORMATS, index_frame, safe_name, write_bundle
+
+# 지역별 장악도 보고서 일괄 생성 (지역장악도 페이지를 지역마다 고르는 대신)
+#
+#   python batch_report.py --out reports --format xlsx --workers 8
+#
+# 환자별 마지막 방문 데이터를 한 번 전처리해 지역코드 순으로 정렬한 Arrow 파일로 저장하고,
+# 워커 프로세스들은 이 파일을 메모리 매핑해(데이터 본체는 한 벌) 맡은 지역들의
+# 구간을 searchsorted 로 잘라 KPI·연령대·하위 지역 표를 만든 뒤 지역별 파일로 쓴다.
+# 출력: <out>/<단계(시도·시군구·행정동)>/<지역>.<xlsx|html> 와 전체 목록 <out>/index.<xlsx|html>
+
+# 워커 프로세스별 상태 (초기화 때 한 번)
+_worker = {}
+
+
+def _init(shared_path, tree, population, banding, cutoff, out_dir, fmt):
+    _worker.update(
+        patients=arrow_store.open_mapped(shared_path),
+        tree=tree, population=population, banding=banding,
+        cutoff=cutoff, out_dir=out_dir, fmt=fmt,
+    )
+
+
+def _run(codes):
+    w = _worker
+    tree = w["tree"]
+    rows = []
+    for code in codes:
+        tables = region_tables(tree, w["population"], w["patients"], int(code), w["cutoff"], w["banding"])
+        path = node_path(tree, code)
+        label = region_label(path)
+        level = "전체" if code < 0 else LEVELS[int(tree.nodes["level"].values[code])]
+        file = os.path.join(w["out_dir"], safe_name(level.replace("/", "")), f"{safe_name(label)}.{w['fmt']}")
+        write_bundle(tables, file, w["fmt"], title=f"{label} 장악도")
+
+        summary = dict(zip(tables["요약"]["항목"], tables["요약"]["값"]))
+        summary.pop("활성 기준일")
+        rows.append({"단계": level, **summary, "파일": file})
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="지역별 장악도 보고서 일괄 생성")
+    parser.add_argument("--out", default="reports", help="출력 폴더")
+    parser.add_argument("--format", choices=REPORT_FORMATS, default="xlsx")
+    parser.add_argument("--levels", nargs="+", choices=list(LEVELS), default=list(LEVELS), help="보고서를 만들 단계")
+    parser.add_argument("--months", type=int, default=12, help="최근 몇 개월 방문을 활성 환자로 볼지")
+    parser.add_argument("--banding", choices=list(BANDINGS), default="10세 단위", help="연령 구간")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--secrets", default=SECRETS_PATH, help="데이터 소스 설정 파일")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.time()
+    secrets = load_secrets(args.secrets)
+
+    pop = prepare_population(datasource.load_population(secrets))
+    patients = prepare_patients(datasource.load_visits(secrets))
+    tree = build_region_tree(pop, patients)
+    population = PopulationTable.build(pop, tree)
+
+    # 워커가 공유하는 데이터: 지역코드 순 환자별 (지역코드, 나이, 마지막 방문일)
+    shared = pd.DataFrame({
+        CODE_COL: tree.leaf_codes(patients),
+        "나이": pd.to_numeric(patients["나이"], errors="coerce").values,
+        DATE_COL: patients[DATE_COL].values,
+    }).sort_values(CODE_COL, kind="stable", ignore_index=True)
+
+    # 전체 + 인구 시트에 있는 지역 (페이지 선택지와 같은 기준)
+    levels = [LEVELS.index(name) for name in args.levels]
+    nodes = tree.nodes
+    targets = np.flatnonzero(nodes["level"].isin(levels).values & (nodes["인구행"].values > 0))
+    codes = np.concatenate([[-1], targets])
+    workers = max(1, args.workers)
+    batches = [b for b in np.array_split(codes, workers * 8) if len(b)]
+    cutoff = pd.Timestamp(datetime.now() - timedelta(days=30 * args.months)).ceil("D")
+    print(f"환자 {len(shared):,}명, 지역 {len(codes):,}곳 → 워커 {workers}개 ({time.time() - started:.1f}초)")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        shared_path = os.path.join(tmp, "patients.arrow")
+        arrow_store.publish(shared, shared_path)
+        initargs = (shared_path, tree, population, BANDINGS[args.banding], cutoff, args.out, args.format)
+        with ProcessPoolExecutor(workers, initializer=_init, initargs=initargs) as pool:
+            for done in pool.map(_run, batches):
+                rows.extend(done)
+
+    index = index_frame(rows, args.out)
+    write_bundle({"지역 목록": index}, os.path.join(args.out, f"index.{args.format}"), args.format, "지역별 장악도 보고서")
+    print(f"보고서 {len(rows):,}개 → {args.out} ({time.time() - started:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# 1세 단위 연령 히스토그램 (0 ~ MAX_AGE, MAX_AGE 칸은 "MAX_AGE세 이상")
+MAX_AGE = 100
+# pd.cut 기본 구간(… 100세이상 = [100, 999)) 과 맞춘 유효 나이 상한
+AGE_LIMIT = 999
+
+LABELS_10Y = ["9세이하"] + [f"{i}대" for i in range(10, 100, 10)] + ["100세이상"]
+
+
+# weights 가 있으면 나이별 집계 결과(나이, 건수)를 히스토그램으로 펼친다
+def age_histogram(ages, weights=None, max_age=MAX_AGE):
+    ages = pd.to_numeric(pd.Series(ages), errors="coerce").values.astype(np.float64)
+    ok = ~np.isnan(ages) & (ages >= 0) & (ages < AGE_LIMIT)
+    w = None if weights is None else np.asarray(weights)[ok]
+    hist = np.bincount(np.minimum(ages[ok].astype(np.int64), max_age), weights=w, minlength=max_age + 1)
+    return hist.astype(np.int64)
+
+
+# 구간 합계 → 1세 단위 (구간 안에 고르게 나누고 나머지는 앞 나이부터 1씩)
+#   starts / widths: 구간별 시작 나이와 폭. 정수 합이 구간 합계와 정확히 같다.
+def spread_bands(totals, starts, widths, max_age=MAX_AGE):
+    totals = np.asarray(totals, dtype=np.int64)
+    hist = np.zeros(totals.shape[:-1] + (max_age + 1,), dtype=np.int64)
+    for j, (start, width) in enumerate(zip(starts, widths)):
+        base, rem = np.divmod(totals[..., j], width)
+        for k in range(width):
+            hist[..., start + k] += base + (k < rem)
+    return hist
+
+
+def _default_labels(edges):
+    labels = [f"{a}-{b - 1}세" for a, b in zip(edges[:-1], edges[1:])]
+    return labels + [f"{edges[-1]}세 이상"]
+
+
+# 연령 구간: 시작 나이 목록(edges, 0 부터 오름차순). 마지막 구간은 열린 구간이다.
+class Banding:
+    def __init__(self, edges, labels=None):
+        edges = [int(e) for e in edges]
+        if not edges or edges[0] != 0 or any(b <= a for a, b in zip(edges, edges[1:])) or edges[-1] > MAX_AGE:
+            raise ValueError(f"연령 구간은 0 부터 {MAX_AGE} 이하까지 오름차순이어야 합니다: {edges}")
+        self.edges = edges
+        self.labels = list(labels) if labels is not None else _default_labels(edges)
+
+    def apply(self, hist):
+        return np.add.reduceat(np.asarray(hist), self.edges, axis=-1)
+
+    def frame(self, hist, name):
+        return pd.DataFrame({
+            "연령대": self.labels,
+            name: self.apply(hist),
+        })
+
+    # 나이별 구간 번호 (나이가 없거나 범위 밖이면 -1)
+    def index(self, ages):
+        ages = pd.to_numeric(pd.Series(ages), errors="coerce").values.astype(np.float64)
+        ok = ~np.isnan(ages) & (ages >= 0) & (ages < AGE_LIMIT)
+        out = np.full(len(ages), -1, dtype=np.int64)
+        out[ok] = np.searchsorted(self.edges, ages[ok], side="right") - 1
+        return out
+
+
+BANDINGS = {
+    "10세 단위": Banding(range(0, MAX_AGE + 1, 10), LABELS_10Y),
+    "5세 단위": Banding(range(0, MAX_AGE + 1, 5)),
+    "소아·청소년 세분": Banding([0, 7, 13, 19, 30, 40, 50, 60, 70, 80, 90, 100]),
+    "생애 주기": Banding([0, 7, 13, 19, 30, 45, 65, 80]),
+}
+CUSTOM = "직접 입력"
+
+
+# "0, 7, 13, 19, 65" → Banding (0 이 없으면 앞에 넣는다)
+def parse_edges(text):
+    try:
+        edges = sorted({int(x) for x in text.replace(" ", "").split(",") if x})
+    except ValueError:
+        raise ValueError(f"숫자를 쉼표로 구분해 입력하세요: {text}")
+    if not edges or edges[0] != 0:
+        edges = [0] + edges
+    return Banding(edges)
@@ -0,0 +1,91 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# 전처리가 끝난 DataFrame 을 Arrow IPC(무압축) 파일로 저장한다.
+# 임시 파일에 쓴 뒤 교체하므로 이미 열어 둔 다른 프로세스의 매핑은 그대로 유지된다.
+def publish(df, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # 시트에서 숫자와 "1,234" 같은 문자열이 섞여 들어온 컬럼은 문자열로 맞춘다
+    mixed = [
+        c for c in df.columns
+        if df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True).startswith("mixed")
+    ]
+    if mixed:
+        df = df.astype({c: str for c in mixed})
+    table = pa.Table.from_pandas(df)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+# 메모리 매핑으로 연다. 버퍼는 OS 페이지 캐시를 공유하므로
+# 워커 프로세스가 늘어도 데이터 본체는 한 벌만 메모리에 올라간다.
+def open_mapped(path):
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+# 프레임 내용의 짧은 지문 (16자리 16진수)
+# 다른 데이터셋으로 만든 값이 들어 있는 파일은 이름에 그 데이터셋의 지문을 붙인다.
+# 예) 인구 시트로 매긴 지역코드가 붙은 방문 파일: 인구 파일이 ttl 로 따로 다시 만들어져 내용이 바뀌면
+#     방문 파일도 새 이름으로 다시 만들어지므로 페이지가 새로 만든 지역 트리와 코드가 어긋나지 않는다.
+def fingerprint(df):
+    rows = pd.util.hash_pandas_object(df, index=True).values
+    columns = pd.util.hash_array(np.asarray(df.columns.astype(str), dtype=object))
+    return format((int(rows.sum()) + int(columns.sum())) % (1 << 64), "016x")
+
+
+def _fresh(path, ttl):
+    if not os.path.exists(path):
+        return False
+    return ttl is None or time.time() - os.path.getmtime(path) < ttl
+
+
+class _Lock:
+    def __init__(self, path):
+        self.path = f"{path}.lock"
+
+    def __enter__(self):
+        self.f = open(self.path, "w")
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+
+
+# secrets 예시
+#   [arrow_cache]
+#   path = "cache"     # 데이터셋별 <path>/<name>.arrow
+#   ttl = 3600         # 초, 생략하면 파일을 지울 때까지 재사용
+#
+# 설정이 없으면 build() 결과를 그대로 돌려준다.
+# 처음 여는 워커 하나만 build() 후 publish 하고, 나머지는 파일 잠금 뒤 매핑만 한다.
+def load_shared(secrets, name, build):
+    conf = secrets.get("arrow_cache")
+    if not conf:
+        return build()
+    path = os.path.join(conf["path"], f"{name}.arrow")
+    ttl = conf.get("ttl")
+    if not _fresh(path, ttl):
+        os.makedirs(conf["path"], exist_ok=True)
+        with _Lock(path):
+            if not _fresh(path, ttl):
+                publish(build(), path)
+    return open_mapped(path)
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+# 사전 계산 결과 저장소 (precompute.py 가 쓰고 페이지가 읽는다)
+#
+#   <path>/v<SCHEMA_VERSION>/LATEST                      마지막으로 끝난 실행 이름
+#   <path>/v<SCHEMA_VERSION>/<실행>/manifest.json         페이지별 프리셋: 조건, 데이터 확인값, KPI 값, 표 이름
+#   <path>/v<SCHEMA_VERSION>/<실행>/<페이지>/<키>/<표>.parquet
+#
+# 지표 정의나 표 모양이 바뀌면 SCHEMA_VERSION 을 올린다. 페이지는 자기 버전 폴더만 보므로
+# 예전 결과를 잘못 읽지 않고, 새 버전 배치가 한 번 돌 때까지는 직접 계산한다.
+SCHEMA_VERSION = 1
+DEFAULT_PATH = "artifacts"
+DEFAULT_KEEP = 7
+
+
+# secrets 예시
+#   [precomputed]
+#   path = "artifacts"   # 배치 사전 계산 결과 폴더
+#   keep = 7             # 남겨 둘 실행 수
+#
+# 설정이 없으면 None (페이지는 항상 직접 계산한다)
+def artifact_root(secrets):
+    conf = secrets.get("precomputed")
+    if not conf:
+        return None
+    return os.path.join(conf.get("path", DEFAULT_PATH), f"v{SCHEMA_VERSION}")
+
+
+# 조건 dict → 파일 이름으로 쓸 짧은 키 (키 순서와 무관)
+def preset_key(params):
+    text = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def latest_run(root):
+    try:
+        with open(os.path.join(root, "LATEST"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# current 에서 None 인 값(페이지가 모르는 값)은 비교하지 않는다
+def _same_data(stamp, current):
+    return all(value is None or stamp.get(key) == value for key, value in current.items())
+
+
+class Precomputed:
+    def __init__(self, run_dir, page, key, entry):
+        self.dir = os.path.join(run_dir, page, key)
+        self.scalars = entry["scalars"]
+        self.names = entry["tables"]
+        self._tables = {}
+
+    # 표는 처음 쓸 때 한 번 읽는다
+    def table(self, name):
+        if name not in self._tables:
+            self._tables[name] = pd.read_parquet(os.path.join(self.dir, f"{name}.parquet"))
+        return self._tables[name]
+
+
+# 실행 하나의 manifest (페이지에서는 실행 이름별로 캐시해 둔다)
+class ArtifactRun:
+    def __init__(self, root, run, manifest):
+        self.dir = os.path.join(root, run)
+        self.run = run
+        self.manifest = manifest
+        self._hits = {}
+
+    # 실행 폴더가 없거나(정리됨) 스키마가 다르면 None
+    @classmethod
+    def open(cls, root, run):
+        try:
+            with open(os.path.join(root, run, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except OSError:
+            return None
+        if manifest.get("schema") != SCHEMA_VERSION:
+            return None
+        return cls(root, run, manifest)
+
+    # 페이지 조건과 데이터가 같은 프리셋이 있으면 Precomputed, 없으면 None
+    def find(self, page, params, stamp):
+        key = preset_key(params)
+        entry = self.manifest["pages"].get(page, {}).get(key)
+        if entry is None or not _same_data(entry["stamp"], stamp):
+            return None
+        if (page, key) not in self._hits:
+            self._hits[page, key] = Precomputed(self.dir, page, key, entry)
+        return self._hits[page, key]
+
+
+# 페이지용: 최신 실행에서 조건·데이터가 같은 결과 (없으면 None)
+#   open_run: 실행 이름별로 캐시한 ArtifactRun.open (페이지의 st.cache_resource 함수)
+def lookup(secrets, page, params, stamp, open_run=ArtifactRun.open):
+    root = artifact_root(secrets)
+    run = latest_run(root) if root else None
+    store = open_run(root, run) if run else None
+    return store.find(page, params, stamp) if store else None
+
+
+# 실행 하나를 새 폴더에 쓰고, 다 쓴 뒤에 LATEST 를 바꾼다 (읽는 쪽은 끝난 실행만 본다)
+class RunWriter:
+    def __init__(self, root, run=None):
+        self.root = root
+        self.run = run or datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.dir = os.path.join(root, self.run)
+        self.pages = {}
+        os.makedirs(self.dir, exist_ok=True)
+
+    def add(self, page, params, stamp, scalars, tables):
+        key = preset_key(params)
+        out = os.path.join(self.dir, page, key)
+        os.makedirs(out, exist_ok=True)
+        for name, frame in tables.items():
+            frame.to_parquet(os.path.join(out, f"{name}.parquet"))
+        self.pages.setdefault(page, {})[key] = {
+            "params": params, "stamp": stamp, "scalars": scalars, "tables": list(tables),
+        }
+        return key
+
+    def publish(self, keep=DEFAULT_KEEP):
+        manifest = {
+            "schema": SCHEMA_VERSION,
+            "run": self.run,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "pages": self.pages,
+        }
+        _write_atomic(os.path.join(self.dir, "manifest.json"), json.dumps(manifest, ensure_ascii=False, indent=1))
+        _write_atomic(os.path.join(self.root, "LATEST"), self.run)
+        self.prune(keep)
+        return manifest
+
+    # 최근 keep 개 실행만 남긴다 (실행 이름은 시각 순)
+    def prune(self, keep):
+        runs = sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name)) and name != self.run
+        )
+        for name in runs[:max(len(runs) - (keep - 1), 0)]:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
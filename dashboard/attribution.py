@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dashboard.regions import ALL, LEVELS
+
+REGISTRY_COLUMNS = ["캠페인", "시작일", "종료일", "시/도", "시/군/구", "행정동", "비용"]
+RULES = {"마지막 접점": "last", "시간 감쇠": "decay", "지역 가중": "region"}
+DEFAULT_PATH = "campaigns.csv"
+
+
+# secrets 예시
+#   [campaigns]
+#   path = "data/campaigns.csv"   # 캠페인, 시작일, 종료일, 시/도, 시/군/구, 행정동, 비용
+def registry_path(secrets):
+    return secrets.get("campaigns", {}).get("path", DEFAULT_PATH)
+
+
+def empty_registry():
+    return pd.DataFrame({
+        "캠페인": pd.Series(dtype=object),
+        "시작일": pd.Series(dtype="datetime64[ns]"),
+        "종료일": pd.Series(dtype="datetime64[ns]"),
+        "시/도": pd.Series(dtype=object),
+        "시/군/구": pd.Series(dtype=object),
+        "행정동": pd.Series(dtype=object),
+        "비용": pd.Series(dtype=np.int64),
+    })
+
+
+# 지역 칸이 비어 있으면 "전체", 날짜는 datetime, 비용은 정수
+def normalize_registry(df):
+    df = df.reindex(columns=REGISTRY_COLUMNS).dropna(subset=["캠페인", "시작일", "종료일"])
+    df = df[df["캠페인"].astype(str).str.strip() != ""].copy()
+    df["시작일"] = pd.to_datetime(df["시작일"])
+    df["종료일"] = pd.to_datetime(df["종료일"])
+    for col in LEVELS:
+        df[col] = df[col].fillna("").astype(str).str.strip().replace("", ALL)
+    df["비용"] = pd.to_numeric(df["비용"], errors="coerce").fillna(0).astype(np.int64)
+    return df.reset_index(drop=True)
+
+
+def load_registry(path):
+    if not os.path.exists(path):
+        return empty_registry()
+    return normalize_registry(pd.read_csv(path, encoding="utf-8-sig", dtype={c: str for c in LEVELS}))
+
+
+def save_registry(df, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    out = normalize_registry(df)
+    out["시작일"] = out["시작일"].dt.strftime("%Y-%m-%d")
+    out["종료일"] = out["종료일"].dt.strftime("%Y-%m-%d")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    out.to_csv(tmp, index=False, encoding="utf-8-sig")
+    os.replace(tmp, path)
+
+
+# 캠페인별 지역코드 구간 [lo, hi) 와 포함된 행정동 수
+# 지역이 "전체"인 캠페인은 트리에 없는 행(-1)까지 포함한다
+def campaign_ranges(registry, tree):
+    lo = np.empty(len(registry), dtype=np.int64)
+    hi = np.empty(len(registry), dtype=np.int64)
+    for i, row in enumerate(registry[list(LEVELS)].itertuples(index=False)):
+        lo[i], hi[i] = tree.code_range(*row)
+        if row[0] == ALL:
+            lo[i] = -1
+    leaf = (tree.nodes["level"].values == len(LEVELS) - 1).astype(np.int64)
+    prefix = np.concatenate([[0], np.cumsum(leaf)])
+    n_dongs = prefix[np.clip(hi, 0, len(leaf))] - prefix[np.clip(lo, 0, len(leaf))]
+    return lo, hi, np.maximum(n_dongs, 1)
+
+
+# 구간 조인: 방문(날짜, 지역코드) × 캠페인(날짜 구간, 지역코드 구간)
+# 방문을 날짜순으로 한 번 정렬하고 캠페인마다 searchsorted 로 날짜 구간의 연속 행 범위를 잘라
+# 이어 붙인 뒤 지역코드 구간으로 거른다. 반환: 맞는 (방문 행, 캠페인) 쌍
+def interval_join(dates, codes, starts, ends, lo, hi):
+    dates = np.asarray(dates).astype("datetime64[D]")
+    codes = np.asarray(codes)
+    order = np.argsort(dates, kind="stable")
+    sorted_dates = dates[order]
+    a = sorted_dates.searchsorted(np.asarray(starts).astype("datetime64[D]"), "left")
+    b = sorted_dates.searchsorted(np.asarray(ends).astype("datetime64[D]"), "right")
+    sizes = np.maximum(b - a, 0)
+    camp = np.repeat(np.arange(len(sizes)), sizes)
+    pos = np.repeat(a - np.concatenate([[0], np.cumsum(sizes)[:-1]]), sizes) + np.arange(sizes.sum())
+    rows = order[pos]
+    hit = (codes[rows] >= lo[camp]) & (codes[rows] < hi[camp])
+    return rows[hit], camp[hit]
+
+
+# 쌍별 기여도 (방문마다 합이 1)
+#   last   : 시작일이 가장 늦은 캠페인 하나에 1
+#   decay  : 캠페인 종료 후 지난 일수에 반감기 half_life 로 감쇠한 가중치
+#   region : 캠페인 대상 행정동 수의 역수 (좁게 겨냥한 캠페인일수록 큰 몫)
+def attribute(rows, camp, rule, dates, starts, ends, n_dongs, half_life=14):
+    if not len(rows):
+        return np.zeros(0)
+    if rule == "last":
+        starts_d = np.asarray(starts).astype("datetime64[D]").astype(np.int64)
+        order = np.lexsort((camp, starts_d[camp], rows))
+        last = np.ones(len(rows), dtype=bool)
+        last[order[:-1]] = rows[order[:-1]] != rows[order[1:]]
+        return last.astype(np.float64)
+    if rule == "decay":
+        visit = np.asarray(dates).astype("datetime64[D]").astype(np.int64)[rows]
+        end = np.asarray(ends).astype("datetime64[D]").astype(np.int64)[camp]
+        weight = 0.5 ** (np.maximum(visit - end, 0) / half_life)
+    else:
+        weight = 1.0 / np.asarray(n_dongs, dtype=np.float64)[camp]
+    _, inv = np.unique(rows, return_inverse=True)
+    return weight / np.bincount(inv, weights=weight)[inv]
+
+
+# 캠페인별 기여 신환 / 단독·공유 신환 / 비용 대비
+def summarize(registry, rows, camp, credit):
+    k = len(registry)
+    _, inv, touches = np.unique(rows, return_inverse=True, return_counts=True)
+    shared = touches[inv] > 1
+    out = registry[["캠페인", "시작일", "종료일", "비용"]].copy()
+    out["대상 신환"] = np.bincount(camp, minlength=k)
+    out["단독 신환"] = np.bincount(camp[~shared], minlength=k)
+    out["공유 신환"] = np.bincount(camp[shared], minlength=k)
+    out["기여 신환"] = np.bincount(camp, weights=credit, minlength=k)
+    out["신환당 비용"] = np.where(out["기여 신환"] > 0, out["비용"] / out["기여 신환"].where(out["기여 신환"] > 0, 1), np.nan)
+    return out
+
+
+# 캠페인 × 캠페인 공유 신환 수 (방문 × 캠페인 0/1 행렬의 곱)
+def overlap_matrix(rows, camp, k):
+    uniq, inv = np.unique(rows, return_inverse=True)
+    hits = np.zeros((len(uniq), k))
+    hits[inv, camp] = 1
+    return (hits.T @ hits).astype(np.int64)
@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.compact import CODE_COL, PATIENT_COL
+
+DATE_COL = "진료일자"
+# 방문 간격 구간 (일, 왼쪽 포함)
+GAP_EDGES = (1, 8, 15, 31, 61, 91, 181, 366)
+NO_COHORT = "기존 환자"
+
+
+def _patient_codes(df):
+    if CODE_COL in df.columns:
+        return df[CODE_COL].values.astype(np.int64), int(df[CODE_COL].max()) + 1 if len(df) else 0
+    codes, uniques = pd.factorize(df[PATIENT_COL])
+    return codes.astype(np.int64), len(uniques)
+
+
+def gap_labels(edges=GAP_EDGES):
+    labels = [f"{a}~{b - 1}일" for a, b in zip(edges[:-1], edges[1:])]
+    return labels + [f"{edges[-1]}일 이상"]
+
+
+# 방문 간격 색인 (스냅샷마다 한 번)
+#   (환자코드, 진료일자) 로 한 번 정렬해 같은 환자의 인접 방문일 차이를 구한다. 같은 날 여러 건은 한 번의 방문이다.
+#   행별 (원본 행 위치)
+#     day      : 방문일 (1970-01-01 기준 일수)
+#     code     : 환자코드 (없으면 -1)
+#     prev_gap : 직전 방문일과의 일수 (첫 방문이면 -1, 같은 날 두 번째 이후 행이면 -2)
+#     next_gap : 다음 방문일까지 일수 (마지막 방문이면 -1)
+#   환자별 (환자코드 위치)
+#     first / last / n_days : 첫·마지막 방문일, 방문일 수
+#     typical  : 방문 간격 중앙값 (방문일이 하나면 -1)
+#     cohort   : 첫 신환 방문 월 (1970-01 기준 개월, 신환 방문이 없으면 -1)
+#
+#   gaps = VisitGaps.build(df)
+#   gaps.revisit_rate(mask, 30)        → 30일 안에 다시 온 방문 비율
+#   gaps.expected_next()               → 환자별 다음 방문 예상일
+class VisitGaps:
+    def __init__(self, day, code, prev_gap, next_gap, first, last, n_days, typical, cohort):
+        self.day = day
+        self.code = code
+        self.prev_gap = prev_gap
+        self.next_gap = next_gap
+        self.first = first
+        self.last = last
+        self.n_days = n_days
+        self.typical = typical
+        self.cohort = cohort
+
+    @classmethod
+    def build(cls, df):
+        codes, n_patients = _patient_codes(df)
+        days = df[DATE_COL].values.astype("datetime64[D]").astype(np.int64)
+        n = len(df)
+
+        valid = np.flatnonzero(codes >= 0)
+        order = valid[np.lexsort((days[valid], codes[valid]))]
+        c, d = codes[order], days[order]
+        new_day = np.ones(len(order), dtype=bool)
+        new_day[1:] = (c[1:] != c[:-1]) | (d[1:] != d[:-1])
+        visit_of = np.cumsum(new_day) - 1                     # 정렬 행 → 방문일 번호
+
+        vc, vd = c[new_day], d[new_day]
+        same = vc[1:] == vc[:-1]
+        step = np.where(same, vd[1:] - vd[:-1], -1)
+        prev_v = np.concatenate([[-1], step])
+        next_v = np.concatenate([step, [-1]])
+
+        prev_gap = np.full(n, -1, dtype=np.int32)
+        prev_gap[order[~new_day]] = -2
+        prev_gap[order[new_day]] = prev_v
+        next_gap = np.full(n, -1, dtype=np.int32)
+        next_gap[order] = next_v[visit_of]
+
+        # 환자별 첫·마지막 방문일과 방문일 수
+        starts = np.flatnonzero(np.concatenate([[True], ~same]))
+        ends = np.append(starts[1:], len(vc))
+        pc = vc[starts]
+        first = np.full(n_patients, -1, dtype=np.int64)
+        last = np.full(n_patients, -1, dtype=np.int64)
+        n_days = np.zeros(n_patients, dtype=np.int32)
+        first[pc], last[pc], n_days[pc] = vd[starts], vd[ends - 1], ends - starts
+
+        # 간격 중앙값: 간격을 (환자, 간격) 순으로 정렬해 환자 구간의 가운데 두 값 평균
+        gp, gv = vc[1:][same], step[same]
+        sorted_gap = gv[np.lexsort((gv, gp))]
+        k = n_days[pc] - 1
+        offset = np.concatenate([[0], np.cumsum(k)[:-1]])
+        has = k > 0
+        lo = sorted_gap[(offset + (k - 1) // 2)[has]]
+        hi = sorted_gap[(offset + k // 2)[has]]
+        typical = np.full(n_patients, -1.0)
+        typical[pc[has]] = (lo + hi) / 2
+
+        # 신환 코호트 (첫 신환 방문 월)
+        cohort = np.full(n_patients, -1, dtype=np.int64)
+        if "초/재진" in df.columns:
+            new = (df["초/재진"] == "신환").values & (codes >= 0)
+            never = np.iinfo(np.int64).max
+            first_new = np.full(n_patients, never, dtype=np.int64)
+            np.minimum.at(first_new, codes[new], days[new])
+            got = first_new != never
+            cohort[got] = first_new[got].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+        return cls(days.astype(np.int32), codes.astype(np.int32), prev_gap, next_gap,
+                   first, last, n_days, typical, cohort)
+
+    def __len__(self):
+        return len(self.day)
+
+    # 행 마스크(또는 원본 행 위치) → 그 방문들의 직전 간격 (간격 없는 행 제외)
+    def gaps(self, rows=None):
+        gap = self.prev_gap if rows is None else self.prev_gap[rows]
+        return gap[gap >= 0]
+
+    # 방문 행별 신환 코호트 이름 (YYYY-MM, 신환 방문이 없는 환자는 "기존 환자")
+    def cohort_labels(self, rows=None):
+        code = self.code if rows is None else self.code[rows]
+        month = np.where(code >= 0, self.cohort[np.maximum(code, 0)], -1)
+        names = np.asarray(month, dtype="datetime64[M]").astype(str).astype(object)
+        names[month < 0] = NO_COHORT
+        return names
+
+    # 그룹별 방문 간격 분포 (행 마스크 안에서 직전 간격이 있는 방문)
+    #   groups: 행별 그룹 값 (rows 로 고른 뒤 길이, category 면 그 순서대로)
+    def distribution(self, groups, rows=None):
+        gap = self.prev_gap if rows is None else self.prev_gap[rows]
+        keep = gap >= 0
+        table = pd.DataFrame({"그룹": pd.Series(groups).values[keep], "간격": gap[keep]})
+        if table.empty:
+            return pd.DataFrame(columns=["그룹", "간격 수", "평균", "25%", "중앙값", "75%", "90%"])
+        g = table.groupby("그룹", observed=True, sort=True)["간격"]
+        out = g.agg(["count", "mean"]).rename(columns={"count": "간격 수", "mean": "평균"})
+        q = g.quantile([0.25, 0.5, 0.75, 0.9]).unstack()
+        q.columns = ["25%", "중앙값", "75%", "90%"]
+        return out.join(q).reset_index()
+
+    # 간격 구간별 건수 (그룹 × 구간 long 프레임)
+    def histogram(self, groups, rows=None, edges=GAP_EDGES):
+        gap = self.prev_gap if rows is None else self.prev_gap[rows]
+        keep = gap >= 0
+        names = gap_labels(edges)
+        band = np.searchsorted(np.asarray(edges), gap[keep], side="right") - 1
+        table = pd.DataFrame({"그룹": pd.Series(groups).values[keep], "구간": np.asarray(names, dtype=object)[band]})
+        return table.groupby(["그룹", "구간"], observed=True).size().rename("건수").reset_index()
+
+    # 방문 중 within 일 안에 다시 온 비율. as_of 가 주어지면 within 일을 다 지켜볼 수 있는 방문만 센다.
+    def revisit_rate(self, rows, within, as_of=None):
+        day, nxt = self.day[rows], self.next_gap[rows]
+        first_of_day = self.prev_gap[rows] != -2
+        if as_of is not None:
+            first_of_day &= day + within <= _day(as_of)
+        total = int(first_of_day.sum())
+        back = int((first_of_day & (nxt > 0) & (nxt <= within)).sum())
+        return back / total if total else float("nan")
+
+    # 기간 [start, end] 에 방문한 환자 중 end 이후 within 일 안에 다시 온 환자 비율
+    #   환자의 기간 내 마지막 방문 = 다음 방문이 end 뒤(또는 없음)인 방문
+    def retention(self, start, end, within, rows=None):
+        start, end = _day(start), _day(end)
+        sel = (self.day >= start) & (self.day <= end) & (self.code >= 0)
+        if rows is not None:
+            sel &= rows
+        nxt = self.next_gap
+        last_in = sel & ((nxt < 0) | (self.day + nxt > end))
+        patients = np.unique(self.code[last_in])
+        back = np.unique(self.code[last_in & (nxt > 0) & (self.day + nxt <= end + within)])
+        return len(back) / len(patients) if len(patients) else float("nan")
+
+    # 환자별 다음 방문 예상일 = 마지막 방문일 + 간격 중앙값 (방문일이 하나면 NaT)
+    def expected_next(self):
+        out = np.full(len(self.last), np.datetime64("NaT"), dtype="datetime64[D]")
+        has = self.typical >= 0
+        out[has] = (self.last[has] + np.round(self.typical[has]).astype(np.int64)).astype("datetime64[D]")
+        return out
+
+    # 휴면 위험: 마지막 방문 후 경과일이 본인 간격 중앙값 × factor 를 넘은 환자
+    #   방문일이 하나인 환자는 fallback 간격을 쓴다 (None 이면 판단하지 않음)
+    #   반환: 환자별 (경과일, 기준 간격, 휴면 여부)
+    def dormancy(self, as_of, factor=1.5, fallback=None):
+        since = _day(as_of) - self.last
+        typical = self.typical.copy()
+        if fallback is not None:
+            typical[(typical < 0) & (self.n_days > 0)] = fallback
+        flag = (self.last >= 0) & (typical > 0) & (since > factor * typical)
+        return since, typical, flag
+
+    # 행 마스크 안에 나오는 환자코드 (중복 없음)
+    def patients(self, rows=None):
+        code = self.code if rows is None else self.code[rows]
+        return np.unique(code[code >= 0])
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (
+            self.day, self.code, self.prev_gap, self.next_gap,
+            self.first, self.last, self.n_days, self.typical, self.cohort,
+        ))
+
+
+def _day(value):
+    return int(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64))
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.regions import CODE_COL, LEVELS
+from dashboard.spatial import haversine
+
+# 감쇠 모형: 장악도 = a·exp(-b·거리) / a·거리^(-b), 모두 log 를 씌워 1차 최소제곱으로 맞춘다
+DECAY_MODELS = {"지수": "exp", "거듭제곱": "power"}
+
+
+# 잎(행정동) 코드별 환자 가중 중심 (좌표 있는 환자 좌표 평균), 좌표가 하나도 없으면 NaN
+def dong_centroids(codes, lat, lon, size):
+    codes = np.asarray(codes)
+    lat = pd.to_numeric(pd.Series(lat), errors="coerce").values.astype(np.float64)
+    lon = pd.to_numeric(pd.Series(lon), errors="coerce").values.astype(np.float64)
+    ok = (codes >= 0) & ~np.isnan(lat) & ~np.isnan(lon)
+    n = np.bincount(codes[ok], minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        c_lat = np.bincount(codes[ok], weights=lat[ok], minlength=size) / n
+        c_lon = np.bincount(codes[ok], weights=lon[ok], minlength=size) / n
+    return c_lat, c_lon, n
+
+
+# 행정동별 인구·환자수·중심·병원까지 거리·장악도 (인구와 좌표가 있는 동만)
+#   codes/lat/lon: 환자당 한 행인 프레임의 지역코드·위도·경도
+def catchment_table(tree, codes, lat, lon, clinic):
+    nodes = tree.nodes
+    c_lat, c_lon, n_coord = dong_centroids(codes, lat, lon, len(nodes))
+    leaf = np.flatnonzero((nodes["level"].values == len(LEVELS) - 1) & (nodes["인구"].values > 0) & (n_coord > 0))
+    table = nodes.iloc[leaf][list(LEVELS) + ["인구", "환자수"]].reset_index(drop=True)
+    table.insert(0, CODE_COL, leaf)
+    table["위도"] = c_lat[leaf]
+    table["경도"] = c_lon[leaf]
+    table["거리(km)"] = haversine(clinic["lat"], clinic["lon"], table["위도"].values, table["경도"].values)
+    table["장악도(%)"] = table["환자수"] / table["인구"] * 100
+    return table.sort_values("거리(km)", ignore_index=True)
+
+
+# log(장악도) 를 거리(지수) 또는 log 거리(거듭제곱)에 1차 회귀 (가중치는 인구)
+# 장악도 0 인 동은 log 를 취할 수 없어 빠진다. 점이 2개 미만이면 None
+def fit_decay(dist, rate, model="exp", weights=None):
+    dist = np.asarray(dist, dtype=np.float64)
+    rate = np.asarray(rate, dtype=np.float64)
+    ok = (rate > 0) & (dist > 0) & np.isfinite(rate) & np.isfinite(dist)
+    if ok.sum() < 2:
+        return None
+    x = dist[ok] if model == "exp" else np.log(dist[ok])
+    y = np.log(rate[ok])
+    w = np.ones(ok.sum()) if weights is None else np.asarray(weights, dtype=np.float64)[ok]
+    slope, intercept = np.polyfit(x, y, 1, w=np.sqrt(w))
+    pred = intercept + slope * x
+    mean = np.average(y, weights=w)
+    ss_tot = np.sum(w * (y - mean) ** 2)
+    r2 = 1 - np.sum(w * (y - pred) ** 2) / ss_tot if ss_tot > 0 else float("nan")
+    return {"model": model, "a": float(np.exp(intercept)), "b": float(-slope), "r2": float(r2), "n": int(ok.sum())}
+
+
+def decay_curve(fit, dist):
+    dist = np.asarray(dist, dtype=np.float64)
+    if fit["model"] == "exp":
+        return fit["a"] * np.exp(-fit["b"] * dist)
+    return fit["a"] * np.power(dist, -fit["b"])
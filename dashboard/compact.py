@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+PATIENT_COL = "환자번호"
+CODE_COL = "환자코드"
+COORD_COLS = ("x", "y")
+
+
+# 적재 직후 컬럼 타입 압축
+#   환자번호      → category (사전 인코딩) + 환자코드 int32
+#   x / y        → float32 (빈 칸은 NaN)
+#   정수/실수     → 가능한 가장 작은 타입
+#   저카디널리티 문자열 → category
+# 환자코드는 이 프레임 안에서만 유효한 번호다. 파티션 모드에서는 조회 기간 프레임마다 따로 압축되므로
+# 같은 환자라도 프레임마다 코드가 다르다. 두 프레임을 합치거나 비교할 때는 환자번호를 써야 한다.
+def compact_visits(df, category_ratio=0.5):
+    if PATIENT_COL in df.columns:
+        ids = df[PATIENT_COL].astype("category")
+        df[PATIENT_COL] = ids
+        df[CODE_COL] = ids.cat.codes.astype(np.int32)
+
+    for col in COORD_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float32)
+
+    for col in df.columns:
+        if col in (PATIENT_COL, CODE_COL) or col in COORD_COLS:
+            continue
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s):
+            continue
+        if pd.api.types.is_integer_dtype(s):
+            df[col] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s):
+            df[col] = pd.to_numeric(s, downcast="float")
+        elif s.dtype == object and len(s):
+            if pd.api.types.infer_dtype(s, skipna=True).startswith("mixed"):
+                continue
+            if s.nunique() <= len(s) * category_ratio:
+                df[col] = s.astype("category")
+    return df
+
+
+# 정수 코드의 고유 개수 (비트셋)
+def count_unique(codes, size=None):
+    codes = np.asarray(codes)
+    codes = codes[codes >= 0]
+    if size is None:
+        size = int(codes.max()) + 1 if len(codes) else 0
+    seen = np.zeros(size, dtype=bool)
+    seen[codes] = True
+    return int(seen.sum())
+
+
+# 고유 환자 수: 환자코드가 있으면 문자열 해시 대신 비트셋으로 센다
+def nunique_patients(df):
+    if CODE_COL in df.columns and isinstance(df[PATIENT_COL].dtype, pd.CategoricalDtype):
+        return count_unique(df[CODE_COL].values, len(df[PATIENT_COL].cat.categories))
+    return df[PATIENT_COL].nunique()
+
+
+# 데이터셋별 메모리 사용량
+#   datasets : {"이름": DataFrame}
+#   by_column=True 면 컬럼 단위로 펼친다
+def memory_report(datasets, by_column=False):
+    rows = []
+    for name, df in datasets.items():
+        usage = df.memory_usage(deep=True, index=True)
+        for col, nbytes in usage.items():
+            rows.append({
+                "데이터셋": name,
+                "컬럼": col,
+                "타입": "index" if col == "Index" else str(df[col].dtype),
+                "MB": nbytes / 2**20,
+            })
+    report = pd.DataFrame(rows, columns=["데이터셋", "컬럼", "타입", "MB"])
+    if by_column:
+        return report
+    summary = report.groupby("데이터셋", sort=False)["MB"].sum().reset_index()
+    summary.insert(1, "행 수", [len(datasets[n]) for n in summary["데이터셋"]])
+    return summary
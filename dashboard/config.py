@@ -0,0 +1,14 @@
+import os
+import tomllib
+
+# Streamlit 이 읽는 것과 같은 파일 (작업 폴더 기준)
+SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+
+
+# 페이지 밖(배치 작업, cron)에서 st.secrets 대신 쓰는 설정 dict
+#   [data_source], [engine], [arrow_cache] … 섹션을 그대로 돌려준다. 파일이 없으면 빈 dict.
+def load_secrets(path=SECRETS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return tomllib.load(f)
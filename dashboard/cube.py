@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.ages import AGE_LIMIT, MAX_AGE
+from dashboard.compact import PATIENT_COL, count_unique
+from dashboard.engine import build_mask
+from dashboard.sketch import DEFAULT_PRECISION, estimate, hash_ids, registers_of
+
+# 일 × 지역 × 연령대 × 성별 셀 단위 사전 집계
+DIMS = ("진료일자", "시/도", "시/군/구", "행정동", "연령대", "성별")
+
+
+# 방문수·신환수·나이 합계처럼 더할 수 있는 값은 셀 표(cells)에,
+# 고유 환자 수는 셀별 HLL 스케치(희소 표: 셀, 레지스터, rank)에 담는다.
+# exact=True 로 만들면 셀별 (셀, 환자코드) 쌍도 보관해 정확한 고유 수를 낼 수 있다.
+#
+#   cube = VisitCube.build(df)
+#   where = [("진료일자", "between", (start, end)), ("연령대", "in", bands)]
+#   cube.sum("방문수", where), cube.distinct(where), cube.distinct(where, exact=True)
+class VisitCube:
+    def __init__(self, cells, sketch, pairs=None, precision=DEFAULT_PRECISION, ages=None):
+        self.cells = cells
+        self.sketch = sketch
+        self.pairs = pairs
+        self.precision = precision
+        self.ages = ages
+
+    @classmethod
+    def build(cls, df, dims=DIMS, precision=DEFAULT_PRECISION, exact=True):
+        dims = [d for d in dims if d in df.columns]
+        cell = df.groupby(dims, observed=True, dropna=False, sort=True).ngroup().values
+        n_cells = int(cell.max()) + 1 if len(cell) else 0
+        first = np.unique(cell, return_index=True)[1]
+
+        cells = df[dims].iloc[first].reset_index(drop=True)
+        cells["방문수"] = np.bincount(cell, minlength=n_cells)
+        if "초/재진" in df.columns:
+            is_new = (df["초/재진"] == "신환").values
+            cells["신환수"] = np.bincount(cell, weights=is_new, minlength=n_cells).astype(np.int64)
+        if "나이" in df.columns:
+            age = pd.to_numeric(df["나이"], errors="coerce").values.astype(np.float64)
+            has_age = ~np.isnan(age)
+            cells["나이합"] = np.bincount(cell, weights=np.where(has_age, age, 0), minlength=n_cells)
+            cells["나이수"] = np.bincount(cell, weights=has_age, minlength=n_cells).astype(np.int64)
+            # 셀별 1세 단위 방문 수 (희소 표: 셀, 나이, 방문수)
+            ok = has_age & (age >= 0) & (age < AGE_LIMIT)
+            key = cell[ok].astype(np.int64) * (MAX_AGE + 1) + np.minimum(age[ok].astype(np.int64), MAX_AGE)
+            uniq, counts = np.unique(key, return_counts=True)
+            ages = {
+                "cell": (uniq // (MAX_AGE + 1)).astype(np.int32),
+                "age": (uniq % (MAX_AGE + 1)).astype(np.uint8),
+                "count": counts,
+            }
+        else:
+            ages = None
+
+        ids = df[PATIENT_COL]
+        valid = ids.notna().values
+        reg, rank = registers_of(hash_ids(ids)[valid], precision)
+        key = cell[valid].astype(np.int64) << precision | reg
+        uniq, inv = np.unique(key, return_inverse=True)
+        best = np.zeros(len(uniq), dtype=np.uint8)
+        np.maximum.at(best, inv, rank)
+        sketch = {
+            "cell": (uniq >> precision).astype(np.int32),
+            "reg": (uniq & ((1 << precision) - 1)).astype(np.uint16),
+            "rank": best,
+        }
+
+        pairs = None
+        if exact:
+            codes, patients = pd.factorize(ids[valid])
+            key = np.unique(cell[valid].astype(np.int64) * len(patients) + codes)
+            pairs = {
+                "cell": (key // max(len(patients), 1)).astype(np.int32),
+                "code": (key % max(len(patients), 1)).astype(np.int32),
+                "size": len(patients),
+            }
+        return cls(cells, sketch, pairs, precision, ages)
+
+    def cell_mask(self, where=()):
+        return build_mask(self.cells, where).values
+
+    def sum(self, col, where=()):
+        return self.cells[col].values[self.cell_mask(where)].sum()
+
+    # 조건에 맞는 셀들의 스케치를 합친 레지스터
+    def registers(self, where=()):
+        keep = self.cell_mask(where)[self.sketch["cell"]]
+        registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        np.maximum.at(registers, self.sketch["reg"][keep], self.sketch["rank"][keep])
+        return registers
+
+    # 고유 환자 수: 기본은 스케치 추정치, exact=True 면 보관한 (셀, 환자) 쌍으로 정확히 센다
+    def distinct(self, where=(), exact=False):
+        if exact:
+            if self.pairs is None:
+                raise ValueError("exact=False 로 만든 큐브는 정확한 고유 수를 낼 수 없습니다.")
+            keep = self.cell_mask(where)[self.pairs["cell"]]
+            return count_unique(self.pairs["code"][keep], self.pairs["size"])
+        return int(round(estimate(self.registers(where))))
+
+    # 조건에 맞는 셀들의 1세 단위 방문 수
+    def age_hist(self, where=()):
+        keep = self.cell_mask(where)[self.ages["cell"]]
+        return np.bincount(self.ages["age"][keep], weights=self.ages["count"][keep],
+                           minlength=MAX_AGE + 1).astype(np.int64)
+
+    def nbytes(self):
+        total = int(self.cells.memory_usage(deep=True).sum())
+        for part in (self.sketch, self.pairs or {}, self.ages or {}):
+            total += sum(v.nbytes for v in part.values() if isinstance(v, np.ndarray))
+        return total
@@ -0,0 +1,195 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from dashboard import partition
+
+VISIT_SHEET = "Sheet1"
+POPULATION_SHEET = "연령별인구현황"
+
+
+# 시트 → DataFrame 공통 인터페이스
+# 모든 구현은 Google Sheets get_all_records() 와 같은 모양(빈 칸은 "")으로 돌려준다.
+class DataSource:
+    def read(self, sheet):
+        raise NotImplementedError
+
+    def write(self, sheet, df):
+        raise NotImplementedError(f"{type(self).__name__} 는 쓰기를 지원하지 않습니다.")
+
+
+def _normalize(df):
+    text_cols = df.select_dtypes(include=["object", "string"]).columns
+    df[text_cols] = df[text_cols].fillna("")
+    return df
+
+
+class GoogleSheetsSource(DataSource):
+    def __init__(self, creds, sheet_id):
+        self.creds = creds
+        self.sheet_id = sheet_id
+
+    def _spreadsheet(self):
+        import gspread
+        client = gspread.service_account_from_dict(dict(self.creds))
+        return client.open_by_key(self.sheet_id)
+
+    def read(self, sheet):
+        ws = self._spreadsheet().worksheet(sheet)
+        return pd.DataFrame(ws.get_all_records())
+
+
+# 로컬 CSV 폴더(<path>/<시트명>.csv) 또는 XLSX 워크북(시트명 = 워크시트)
+class FileSource(DataSource):
+    def __init__(self, path):
+        self.path = path
+
+    def _is_workbook(self):
+        return self.path.lower().endswith((".xlsx", ".xlsm"))
+
+    def read(self, sheet):
+        if self._is_workbook():
+            df = pd.read_excel(self.path, sheet_name=sheet, engine="openpyxl")
+        else:
+            df = pd.read_csv(os.path.join(self.path, f"{sheet}.csv"))
+        return _normalize(df)
+
+    def write(self, sheet, df):
+        if self._is_workbook():
+            mode = "a" if os.path.exists(self.path) else "w"
+            extra = {"if_sheet_exists": "replace"} if mode == "a" else {}
+            with pd.ExcelWriter(self.path, engine="openpyxl", mode=mode, **extra) as writer:
+                df.to_excel(writer, sheet_name=sheet, index=False)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            df.to_csv(os.path.join(self.path, f"{sheet}.csv"), index=False)
+
+
+# 시트별 Parquet 파일(<path>/<시트명>.parquet)
+class ParquetSource(DataSource):
+    def __init__(self, path):
+        self.path = path
+
+    def _file(self, sheet):
+        return os.path.join(self.path, f"{sheet}.parquet")
+
+    def read(self, sheet, columns=None):
+        return _normalize(pd.read_parquet(self._file(sheet), columns=columns))
+
+    def write(self, sheet, df):
+        os.makedirs(self.path, exist_ok=True)
+        df.to_parquet(self._file(sheet), index=False)
+
+
+# 시트명 = 테이블명
+class SQLiteSource(DataSource):
+    def __init__(self, path):
+        self.path = path
+
+    def read(self, sheet):
+        with sqlite3.connect(self.path) as conn:
+            df = pd.read_sql_query(f'SELECT * FROM "{sheet}"', conn)
+        return _normalize(df)
+
+    def write(self, sheet, df):
+        with sqlite3.connect(self.path) as conn:
+            df.to_sql(sheet, conn, if_exists="replace", index=False)
+
+
+# 진료일자가 있는 시트(방문 이력)는 <path>/<시트명>/ym=YYYY-MM/part-*.parquet 로 월 단위 분할,
+# 그 외 시트는 ParquetSource 와 같이 파일 하나로 저장한다.
+class PartitionedSource(ParquetSource):
+    def _root(self, sheet):
+        return os.path.join(self.path, sheet)
+
+    def _is_partitioned(self, sheet):
+        return os.path.isdir(self._root(sheet))
+
+    def read(self, sheet, columns=None):
+        if not self._is_partitioned(sheet):
+            return super().read(sheet, columns)
+        return _normalize(partition.read_partitions(self._root(sheet), columns=columns))
+
+    def read_range(self, sheet, start, end, columns=None):
+        return _normalize(partition.read_partitions(self._root(sheet), start, end, columns))
+
+    def date_bounds(self, sheet):
+        return partition.date_bounds(self._root(sheet))
+
+    def write(self, sheet, df):
+        if partition.DATE_COL not in df.columns:
+            return super().write(sheet, df)
+        partition.write_partitions(df, self._root(sheet))
+
+    # 신규 방문만 해당 월(보통 이번 달) 파티션에 덧붙인다
+    def append(self, sheet, df):
+        return partition.append_partitions(df, self._root(sheet))
+
+
+SOURCES = {
+    "file": FileSource,
+    "parquet": ParquetSource,
+    "partitioned": PartitionedSource,
+    "sqlite": SQLiteSource,
+}
+
+
+# secrets 예시
+#   [data_source]
+#   type = "parquet"          # google_sheets(기본) | file | parquet | partitioned | sqlite
+#   path = "data"
+def get_source(secrets):
+    conf = secrets.get("data_source", {})
+    kind = conf.get("type", "google_sheets")
+    if kind == "google_sheets":
+        return GoogleSheetsSource(
+            secrets["gcp_service_account"],
+            secrets["google_sheets"]["sheet_id"],
+        )
+    if kind not in SOURCES:
+        raise ValueError(f"알 수 없는 데이터 소스: {kind}")
+    return SOURCES[kind](conf["path"])
+
+
+def visit_sheet_name(secrets):
+    if "google_sheets" in secrets and "worksheet_name" in secrets["google_sheets"]:
+        return secrets["google_sheets"]["worksheet_name"]
+    return VISIT_SHEET
+
+
+def load_visits(secrets):
+    return get_source(secrets).read(visit_sheet_name(secrets))
+
+
+def is_partitioned(secrets):
+    return secrets.get("data_source", {}).get("type") == "partitioned"
+
+
+# 월 파티션 저장소에서 [start, end] 와 겹치는 파티션만 읽는다
+def load_visits_range(secrets, start, end):
+    return get_source(secrets).read_range(visit_sheet_name(secrets), start, end)
+
+
+def visit_date_bounds(secrets):
+    return get_source(secrets).date_bounds(visit_sheet_name(secrets))
+
+
+# 방문 시트 전체 기간의 한 컬럼 (필터 선택지처럼 조회 기간과 무관해야 하는 값)
+# parquet/파티션 저장소는 그 컬럼만 읽는다
+def load_visit_column(secrets, column):
+    source = get_source(secrets)
+    sheet = visit_sheet_name(secrets)
+    if isinstance(source, ParquetSource):
+        return source.read(sheet, columns=[column])[column]
+    return source.read(sheet)[column]
+
+
+def load_population(secrets):
+    return get_source(secrets).read(POPULATION_SHEET)
+
+
+# 원격 시트를 로컬 소스로 복사 (오프라인 개발·벤치마크용)
+def snapshot(src, dst, sheets=(VISIT_SHEET, POPULATION_SHEET)):
+    for sheet in sheets:
+        dst.write(sheet, src.read(sheet))
@@ -0,0 +1,207 @@
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+# 집계 엔진 공통 인터페이스
+#
+# aggregate(table, by, metrics, where)
+#   table   : DataFrame 또는 Parquet 경로(glob 가능)
+#   by      : 그룹 컬럼 리스트 ([] 이면 전체 한 줄)
+#   metrics : {"출력컬럼": (함수, 인자)}
+#               ("count", None)              행 수
+#               ("nunique", "환자번호")       고유값 수
+#               ("count_if", ("초/재진", "신환"))  조건 만족 행 수
+#               ("mean", "나이")              평균
+#   where   : [(컬럼, 연산자, 값)]  연산자 = == != >= <= > < in between
+class Engine:
+    def aggregate(self, table, by, metrics, where=()):
+        raise NotImplementedError
+
+
+def _columns(by, metrics, where):
+    cols = list(by)
+    for func, arg in metrics.values():
+        if func == "count_if":
+            cols.append(arg[0])
+        elif arg is not None:
+            cols.append(arg)
+    cols += [c for c, _, _ in where]
+    return list(dict.fromkeys(cols))
+
+
+def condition_mask(s, op, val):
+    if op == "==":
+        return s == val
+    if op == "!=":
+        return s != val
+    if op == ">=":
+        return s >= val
+    if op == "<=":
+        return s <= val
+    if op == ">":
+        return s > val
+    if op == "<":
+        return s < val
+    if op == "in":
+        return s.isin(val)
+    if op == "between":
+        return (s >= val[0]) & (s <= val[1])
+    raise ValueError(f"지원하지 않는 연산자: {op}")
+
+
+def build_mask(df, where):
+    mask = pd.Series(True, index=df.index)
+    for col, op, val in where:
+        mask &= condition_mask(df[col], op, val)
+    return mask
+
+
+class PandasEngine(Engine):
+    def aggregate(self, table, by, metrics, where=()):
+        cols = _columns(by, metrics, where)
+        if isinstance(table, str):
+            df = pd.read_parquet(table, columns=cols)
+        else:
+            df = table
+        mask = build_mask(df, where)
+        sub = df.loc[mask, list(by)] if by else pd.DataFrame(index=df.index[mask])
+
+        # 집계 대상 값만 골라 담는다 (조건식은 불리언 컬럼으로)
+        values = {}
+        for name, (func, arg) in metrics.items():
+            if func == "count_if":
+                values[name] = df.loc[mask, arg[0]] == arg[1]
+            elif func in ("nunique", "mean"):
+                values[name] = df.loc[mask, arg]
+            elif func != "count":
+                raise ValueError(f"지원하지 않는 집계: {func}")
+        sub = sub.assign(**{f"__{i}": v for i, v in enumerate(values.values())})
+        keys = {name: f"__{i}" for i, name in enumerate(values)}
+
+        if not by:
+            row = {}
+            for name, (func, arg) in metrics.items():
+                if func == "count":
+                    row[name] = len(sub)
+                elif func == "nunique":
+                    row[name] = sub[keys[name]].nunique()
+                elif func == "count_if":
+                    row[name] = int(sub[keys[name]].sum())
+                else:
+                    row[name] = sub[keys[name]].mean()
+            return pd.DataFrame([row])
+
+        g = sub.groupby(list(by), observed=True, sort=True)
+        out = {}
+        for name, (func, arg) in metrics.items():
+            if func == "count":
+                out[name] = g.size()
+            elif func == "nunique":
+                out[name] = g[keys[name]].nunique()
+            elif func == "count_if":
+                out[name] = g[keys[name]].sum().astype("int64")
+            else:
+                out[name] = g[keys[name]].mean()
+        return pd.DataFrame(out).reset_index()
+
+
+def _q(col):
+    return '"' + col.replace('"', '""') + '"'
+
+
+# DuckDB 프로세스 내 분석 엔진
+# 필터·그룹 연산을 SQL 로 내려보내 중간 DataFrame 없이 멀티스레드로 실행한다.
+class DuckDBEngine(Engine):
+    def __init__(self, threads=None):
+        if duckdb is None:
+            raise ImportError("duckdb 가 설치되어 있지 않습니다. (pip install duckdb)")
+        self.threads = threads
+
+    def aggregate(self, table, by, metrics, where=()):
+        con = duckdb.connect()
+        if self.threads:
+            con.execute(f"SET threads = {int(self.threads)}")
+        if isinstance(table, str):
+            source = "read_parquet(?)"
+            params = [table]
+        else:
+            con.register("t", table)
+            source = "t"
+            params = []
+
+        select = [_q(c) for c in by]
+        select_params = []
+        for name, (func, arg) in metrics.items():
+            if func == "count":
+                expr = "COUNT(*)"
+            elif func == "nunique":
+                expr = f"COUNT(DISTINCT {_q(arg)})"
+            elif func == "count_if":
+                expr = f"CAST(COUNT(*) FILTER (WHERE {_q(arg[0])} = ?) AS BIGINT)"
+                select_params.append(arg[1])
+            elif func == "mean":
+                expr = f"AVG({_q(arg)})"
+            else:
+                raise ValueError(f"지원하지 않는 집계: {func}")
+            select.append(f"{expr} AS {_q(name)}")
+
+        # pandas groupby 와 같게 빈(NULL) 그룹 키는 제외
+        conds = [f"{_q(c)} IS NOT NULL" for c in by]
+        where_params = []
+        for col, op, val in where:
+            if op == "in":
+                conds.append(f"list_contains(?, {_q(col)})")
+                where_params.append(list(val))
+            elif op == "between":
+                conds.append(f"{_q(col)} BETWEEN ? AND ?")
+                where_params += [val[0], val[1]]
+            elif op in ("==", "!=", ">=", "<=", ">", "<"):
+                sql_op = "=" if op == "==" else op
+                conds.append(f"{_q(col)} {sql_op} ?")
+                where_params.append(val)
+            else:
+                raise ValueError(f"지원하지 않는 연산자: {op}")
+
+        sql = f"SELECT {', '.join(select)} FROM {source}"
+        if conds:
+            sql += " WHERE " + " AND ".join(conds)
+        if by:
+            keys = ", ".join(_q(c) for c in by)
+            sql += f" GROUP BY {keys} ORDER BY {keys}"
+        try:
+            out = con.execute(sql, select_params + params + where_params).df()
+        finally:
+            con.close()
+        # category 그룹 키는 ENUM 을 거쳐 순서 있는 category 로 돌아오므로 원본 타입으로 되돌린다
+        if not isinstance(table, str):
+            for c in by:
+                if isinstance(table[c].dtype, pd.CategoricalDtype):
+                    out[c] = out[c].astype(table[c].dtype)
+        return out
+
+
+ENGINES = {
+    "pandas": PandasEngine,
+    "duckdb": DuckDBEngine,
+}
+
+
+# secrets 예시
+#   [engine]
+#   type = "duckdb"    # pandas(기본) | duckdb
+#   threads = 4
+#
+# 알 수 없는 type 은 ValueError, duckdb 를 지정했는데 설치되어 있지 않으면 ImportError
+# (설정한 엔진이 조용히 pandas 로 바뀌지 않게)
+def get_engine(secrets):
+    conf = secrets.get("engine", {})
+    kind = conf.get("type", "pandas")
+    if kind not in ENGINES:
+        raise ValueError(f"알 수 없는 집계 엔진: {kind}")
+    if kind == "duckdb":
+        return DuckDBEngine(conf.get("threads"))
+    return PandasEngine()
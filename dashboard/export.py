@@ -0,0 +1,193 @@
+import io
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from dashboard.compact import CODE_COL as PATIENT_CODE_COL, PATIENT_COL
+from dashboard.pipeline import Filter
+from dashboard.regions import CODE_COL as REGION_CODE_COL, LEVELS
+
+DATE_COL = "진료일자"
+# 조각 크기 (행) / 엑셀 시트 최대 행 수 (머리글 제외)
+CHUNK_ROWS = 50_000
+XLSX_MAX_ROWS = 1_048_575
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+# 내보낼 때 빼는 내부 정수 코드 컬럼
+INTERNAL_COLS = (PATIENT_CODE_COL, REGION_CODE_COL)
+TABLES = ("방문", "일별 집계", "월별 집계", "지역별 집계")
+
+
+# 프레임(또는 조각 목록)을 chunk_rows 행씩
+def chunks(source, chunk_rows=CHUNK_ROWS):
+    if isinstance(source, pd.DataFrame):
+        for lo in range(0, len(source), chunk_rows):
+            yield source.iloc[lo:lo + chunk_rows]
+    else:
+        yield from source
+
+
+def _rows(source):
+    if isinstance(source, Filter):
+        return source.df, source.mask
+    return source, None
+
+
+# Filter(또는 DataFrame)의 행을 위치 목록에서 조각씩 잘라 낸다 (내부 코드 컬럼 제외)
+def row_chunks(source, chunk_rows=CHUNK_ROWS):
+    df, mask = _rows(source)
+    cols = [c for c in df.columns if c not in INTERNAL_COLS]
+    pos = None if mask is None else np.flatnonzero(mask)
+    n = len(df) if pos is None else len(pos)
+    for lo in range(0, n, chunk_rows):
+        sel = slice(lo, lo + chunk_rows) if pos is None else pos[lo:lo + chunk_rows]
+        yield df.iloc[sel][cols]
+
+
+# 키별 방문수·환자수·신환수
+#   keys: {컬럼 이름: 고른 행 길이의 배열}
+def _counts(source, keys):
+    df, mask = _rows(source)
+    pick = (lambda c: df[c].values) if mask is None else (lambda c: df[c].values[mask])
+    frame = pd.DataFrame({**keys, PATIENT_COL: pick(PATIENT_COL)})
+    if "초/재진" in df.columns:
+        frame["신환"] = pick("초/재진") == "신환"
+    g = frame.groupby(list(keys), observed=True, sort=True)
+    out = g.size().rename("방문수").to_frame()
+    out["환자수"] = g[PATIENT_COL].nunique()
+    if "신환" in frame.columns:
+        out["신환수"] = g["신환"].sum()
+    return out.reset_index()
+
+
+# 일별("D") / 월별("M") 집계
+def period_counts(source, freq="D"):
+    df, mask = _rows(source)
+    dates = df[DATE_COL].values if mask is None else df[DATE_COL].values[mask]
+    if freq == "M":
+        return _counts(source, {"진료월": dates.astype("datetime64[M]").astype(str)})
+    return _counts(source, {"진료일": dates.astype("datetime64[D]")})
+
+
+# 시/도 · 시/군/구 · 행정동별 집계
+def region_counts(source):
+    df, mask = _rows(source)
+    pick = (lambda c: df[c].values) if mask is None else (lambda c: df[c].values[mask])
+    return _counts(source, {col: pick(col) for col in LEVELS})
+
+
+# 기본 표 묶음: {TABLES 이름: 조각을 만드는 인자 없는 함수}
+def table_builders(source):
+    return {
+        "방문": lambda: row_chunks(source),
+        "일별 집계": lambda: period_counts(source, "D"),
+        "월별 집계": lambda: period_counts(source, "M"),
+        "지역별 집계": lambda: region_counts(source),
+    }
+
+
+# 조각마다 바로 파일에 쓰므로 전체를 문자열/셀 객체로 한꺼번에 만들지 않는다.
+# 엑셀에서 한글이 깨지지 않도록 BOM 을 붙인다.
+def write_csv(parts, out):
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+    header = True
+    for part in chunks(parts):
+        part.to_csv(text, index=False, header=header)
+        header = False
+    text.flush()
+    text.detach()
+
+
+# 조각마다 row group 하나. 스키마는 첫 조각 기준 (category 는 같은 사전이라 조각끼리 같다)
+def write_parquet(parts, out):
+    writer = None
+    for part in chunks(parts):
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(out, table.schema)
+        elif table.schema != writer.schema:
+            table = table.cast(writer.schema)
+        writer.write_table(table)
+    if writer is None:
+        pq.write_table(pa.table({}), out)
+    else:
+        writer.close()
+
+
+def _cells(part):
+    # object 로 바꾸면 numpy 정수·실수가 파이썬 값이 되고, 결측은 None(빈 칸)으로
+    values = part.astype(object).where(part.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+# openpyxl write-only 모드: 행을 바로 압축 스트림에 내보내 셀 객체를 쌓지 않는다.
+#   sheets: {시트 이름: 프레임 또는 프레임 조각 iterable}
+# 시트가 엑셀 최대 행 수를 넘으면 "이름 (2)" 시트로 이어 쓴다.
+def write_xlsx(sheets, out):
+    wb = Workbook(write_only=True)
+    for name, parts in sheets.items():
+        ws, used, page, columns = None, 0, 1, None
+        for part in chunks(parts):
+            columns = list(part.columns)
+            for row in _cells(part):
+                if ws is None or used == XLSX_MAX_ROWS:
+                    title = name if page == 1 else f"{name} ({page})"
+                    ws = wb.create_sheet(title=title[:31])
+                    ws.append(columns)
+                    used, page = 0, page + 1
+                ws.append(row)
+                used += 1
+        if ws is None:
+            ws = wb.create_sheet(title=name[:31])
+            if columns:
+                ws.append(columns)
+    wb.save(out)
+
+
+_WRITERS = {"CSV": write_csv, "Parquet": write_parquet}
+
+
+# 임시 파일에 내보낸 뒤 처음으로 되감은 파일 객체 (st.download_button 에 그대로 넘긴다)
+#   XLSX 는 표마다 시트, CSV·Parquet 은 표가 여럿이면 표마다 파일을 담은 ZIP
+def export_file(fmt, sheets):
+    if fmt not in FORMATS:
+        raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
+    out = tempfile.TemporaryFile()
+    if fmt == "XLSX":
+        write_xlsx(sheets, out)
+    elif len(sheets) == 1:
+        _WRITERS[fmt](next(iter(sheets.values())), out)
+    else:
+        ext = FORMATS[fmt][0]
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, parts in sheets.items():
+                with zf.open(f"{name}.{ext}", "w") as member:
+                    _WRITERS[fmt](parts, member)
+    out.seek(0)
+    return out
+
+
+# 다운로드 버튼을 누를 때 만들어지도록 (인자 없는 callable)
+#   make_sheets: 인자 없이 {시트 이름: 프레임/조각} 을 돌려주는 함수
+def deferred(fmt, make_sheets):
+    return lambda: export_file(fmt, make_sheets())
+
+
+def _bundled(fmt, n_tables):
+    return fmt != "XLSX" and n_tables > 1
+
+
+def file_name(stem, fmt, n_tables=1):
+    return f"{stem}.{'zip' if _bundled(fmt, n_tables) else FORMATS[fmt][0]}"
+
+
+def mime(fmt, n_tables=1):
+    return "application/zip" if _bundled(fmt, n_tables) else FORMATS[fmt][1]
@@ -0,0 +1,171 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from dashboard.regions import LEVELS, special_cities, split_address
+
+# 지도 확대 수준 → Douglas-Peucker 허용 오차(도 단위, 해당 확대 수준의 1픽셀 남짓)
+TOLERANCES = {7: 0.004, 9: 0.001, 11: 0.0002}
+# 내보낼 좌표 소수 자릿수 (1e-5도 ≈ 1m)
+DIGITS = 5
+
+
+# "경기도 수원시장안구 파장동" 처럼 붙어 있는 일반구 이름을 "수원시 장안구" 로 띄운다
+def _normalize_name(name):
+    parts = name.split()
+    if len(parts) == 3:
+        for city in special_cities:
+            if parts[1].startswith(city) and parts[1] != city:
+                return " ".join([parts[0], city, parts[1][len(city):], parts[2]])
+    return name
+
+
+# 닫힌 고리(첫 점 == 끝 점) 하나를 Douglas-Peucker 로 줄인다.
+# 구간별 최대 거리는 NumPy 로 한 번에 구하고, 나눌 구간만 스택으로 돈다.
+def simplify_ring(ring, tolerance):
+    n = len(ring)
+    if n <= 4:
+        return ring
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        seg = ring[a + 1:b]
+        p, q = ring[a], ring[b]
+        dx, dy = q - p
+        norm = np.hypot(dx, dy)
+        if norm == 0:
+            dist = np.hypot(seg[:, 0] - p[0], seg[:, 1] - p[1])
+        else:
+            dist = np.abs(dx * (seg[:, 1] - p[1]) - dy * (seg[:, 0] - p[0])) / norm
+        i = int(dist.argmax())
+        if dist[i] > tolerance:
+            mid = a + 1 + i
+            keep[mid] = True
+            stack += [(a, mid), (mid, b)]
+    if keep.sum() < 4:
+        # 허용 오차보다 작은 고리는 삼각형으로 남긴다
+        keep[[n // 3, 2 * n // 3]] = True
+    return ring[keep]
+
+
+def _polygons(geometry):
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+
+# 행정동 경계 (확대 수준별로 단순화해 둔 압축 배열)
+#   keys   : 경계별 시/도, 시/군/구, 행정동
+#   levels : {확대 수준: {"xy": (점, 2) float32, "offsets": 고리 시작 위치(len = 고리 + 1),
+#                         "ring_poly": 고리별 다각형 번호}}
+#   poly_feature : 다각형별 경계 번호 (다각형의 첫 고리가 외곽선)
+#
+#   shapes = DongShapes.from_geojson(json.load(f))
+#   codes = tree.leaf_codes(shapes.keys)         # 경계 → 지역코드
+#   shapes.feature_collection(rows, 9, props)    # folium 에 넘길 GeoJSON
+class DongShapes:
+    def __init__(self, keys, levels, poly_feature):
+        self.keys = keys
+        self.levels = levels
+        self.poly_feature = poly_feature
+
+    @classmethod
+    def from_geojson(cls, collection, name_key="adm_nm", tolerances=TOLERANCES):
+        names = [_normalize_name(f["properties"][name_key]) for f in collection["features"]]
+        keys = pd.DataFrame([split_address(n) for n in names], columns=list(LEVELS)).fillna("")
+
+        rings, ring_poly, poly_feature = [], [], []
+        for i, feature in enumerate(collection["features"]):
+            for polygon in _polygons(feature["geometry"]):
+                for ring in polygon:
+                    rings.append(np.asarray(ring, dtype=np.float64)[:, :2])
+                    ring_poly.append(len(poly_feature))
+                poly_feature.append(i)
+        ring_poly = np.asarray(ring_poly, dtype=np.int32)
+
+        levels = {}
+        for zoom, tolerance in tolerances.items():
+            simple = [simplify_ring(r, tolerance) for r in rings]
+            levels[zoom] = {
+                "xy": np.concatenate(simple).astype(np.float32) if simple else np.empty((0, 2), np.float32),
+                "offsets": np.concatenate([[0], np.cumsum([len(r) for r in simple])]).astype(np.int64),
+                "ring_poly": ring_poly,
+            }
+        return cls(keys, levels, np.asarray(poly_feature, dtype=np.int32))
+
+    @classmethod
+    def load(cls, path, name_key="adm_nm", tolerances=TOLERANCES):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_geojson(json.load(f), name_key, tolerances)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def zoom_for(self, zoom):
+        # 요청한 확대 수준 이하에서 가장 세밀한 단계 (없으면 가장 거친 단계)
+        usable = [z for z in self.levels if z <= zoom]
+        return max(usable) if usable else min(self.levels)
+
+    # 경계 번호 목록 → GeoJSON FeatureCollection
+    #   props: 경계 번호 순서와 같은 행 순서의 속성 프레임 (feature properties 로 들어간다)
+    def feature_collection(self, features, zoom, props=None):
+        level = self.levels[self.zoom_for(zoom)]
+        xy, offsets, ring_poly = level["xy"], level["offsets"], level["ring_poly"]
+        features = np.asarray(features, dtype=np.int64)
+
+        wanted = np.isin(self.poly_feature, features)
+        ring_ids = np.flatnonzero(wanted[ring_poly])
+        coords = {}
+        for r in ring_ids:
+            ring = np.round(xy[offsets[r]:offsets[r + 1]].astype(np.float64), DIGITS).tolist()
+            poly = ring_poly[r]
+            coords.setdefault(self.poly_feature[poly], {}).setdefault(poly, []).append(ring)
+
+        records = [] if props is None else props.to_dict("records")
+        out = []
+        for k, i in enumerate(features):
+            polygons = list(coords.get(i, {}).values())
+            if not polygons:
+                continue
+            out.append({
+                "type": "Feature",
+                "geometry": {"type": "MultiPolygon", "coordinates": polygons},
+                "properties": records[k] if records else {},
+            })
+        return {"type": "FeatureCollection", "features": out}
+
+    # 경계 번호 목록의 [[남, 서], [북, 동]]
+    def bounds(self, features, zoom):
+        level = self.levels[self.zoom_for(zoom)]
+        rings = np.flatnonzero(np.isin(self.poly_feature, features)[level["ring_poly"]])
+        if not len(rings):
+            return None
+        pts = np.concatenate([level["xy"][level["offsets"][r]:level["offsets"][r + 1]] for r in rings])
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        return [[float(lo[1]), float(lo[0])], [float(hi[1]), float(hi[0])]]
+
+    def nbytes(self):
+        total = self.poly_feature.nbytes + int(self.keys.memory_usage(deep=True).sum())
+        for level in self.levels.values():
+            total += level["xy"].nbytes + level["offsets"].nbytes
+        return total
+
+
+# secrets 예시
+#   [geo]
+#   path = "data/hangjeongdong.geojson"   # 행정동 경계 GeoJSON
+#   name_key = "adm_nm"                   # "시/도 시/군/구 행정동" 이름이 든 속성
+#
+# 설정이 없으면 None
+def load_shapes(secrets):
+    conf = secrets.get("geo")
+    if not conf:
+        return None
+    return DongShapes.load(conf["path"], conf.get("name_key", "adm_nm"))
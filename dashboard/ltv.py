@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.compact import CODE_COL, PATIENT_COL
+
+DATE_COL = "진료일자"
+# 한 달 = 첫 방문일부터 30일 단위
+MONTH_DAYS = 30
+MAX_MONTHS = 24
+N_BOOT = 1000
+
+
+def _patient_codes(df):
+    if CODE_COL in df.columns:
+        return df[CODE_COL].values.astype(np.int64), int(df[CODE_COL].max()) + 1 if len(df) else 0
+    codes, uniques = pd.factorize(df[PATIENT_COL])
+    return codes.astype(np.int64), len(uniques)
+
+
+# 신환 코호트 × 경과 월 표
+#   cohort 는 첫 신환 방문 월, 경과 월 m 은 첫 방문일부터 [30m, 30m+30) 일 구간이다.
+#   size[c]        : 코호트 신환 수
+#   active[c, m]   : m 번째 달에 한 번이라도 방문한 환자 수 (m=0 은 첫 방문 포함이라 size 와 같다)
+#   visits[c, m]   : m 번째 달 방문 건수 (m=0 은 첫 방문 포함)
+#   observed[c, m] : 코호트의 모든 환자가 m 번째 달을 다 채웠는지 (데이터 마지막 날 기준)
+#
+#   curves = CohortCurves.build(df)
+#   curves.ltv(6, 50000) → 6개월 환자당 매출 추정과 신뢰구간
+class CohortCurves:
+    def __init__(self, cohorts, size, active, visits, observed):
+        self.cohorts = cohorts
+        self.size = size
+        self.active = active
+        self.visits = visits
+        self.observed = observed
+
+    @classmethod
+    def build(cls, df, max_months=MAX_MONTHS):
+        codes, n_patients = _patient_codes(df)
+        days = df[DATE_COL].values.astype("datetime64[D]").astype(np.int64)
+        new = (df["초/재진"] == "신환").values & (codes >= 0)
+
+        never = np.iinfo(np.int64).max
+        first = np.full(n_patients, never, dtype=np.int64)
+        np.minimum.at(first, codes[new], days[new])
+        acquired = np.flatnonzero(first != never)
+        if not len(acquired):
+            empty = np.zeros((0, max_months), dtype=np.int64)
+            return cls(pd.PeriodIndex([], freq="M"), np.zeros(0, np.int64), empty, empty, empty.astype(bool))
+
+        first_month = first[acquired].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        month0 = first_month.min()
+        n_cohorts = int(first_month.max() - month0) + 1
+        cohort_of = np.full(n_patients, -1, dtype=np.int64)
+        cohort_of[acquired] = first_month - month0
+
+        # 신환 이후 방문만, 경과 월 < max_months
+        ok = codes >= 0
+        ok[ok] = cohort_of[codes[ok]] >= 0
+        pc = codes[ok]
+        m = (days[ok] - first[pc]) // MONTH_DAYS
+        keep = (m >= 0) & (m < max_months)
+        pc, m = pc[keep], m[keep]
+        c = cohort_of[pc]
+
+        cells = n_cohorts * max_months
+        visits = np.bincount(c * max_months + m, minlength=cells).reshape(n_cohorts, max_months)
+        pair = np.unique(pc * max_months + m)
+        active = np.bincount(cohort_of[pair // max_months] * max_months + pair % max_months,
+                             minlength=cells).reshape(n_cohorts, max_months)
+        size = np.bincount(cohort_of[acquired], minlength=n_cohorts)
+
+        # 코호트 마지막 날 신환도 m 번째 달을 다 채웠는지
+        last_day = days.max()
+        month_starts = (np.arange(n_cohorts) + month0).astype("datetime64[M]")
+        cohort_last = ((month_starts + 1).astype("datetime64[D]") - 1).astype(np.int64)
+        observed = cohort_last[:, None] + MONTH_DAYS * (np.arange(max_months) + 1) - 1 <= last_day
+        cohorts = pd.PeriodIndex(month_starts.astype("datetime64[ns]"), freq="M")
+        return cls(cohorts, size, active, visits, observed & (size[:, None] > 0))
+
+    # 어느 한 코호트라도 다 채운 경과 월 수
+    @property
+    def horizon(self):
+        return int(self.observed.any(axis=0).sum())
+
+    def _rates(self, table, months, weights=None):
+        obs = self.observed[:, :months]
+        num = np.where(obs, table[:, :months], 0)
+        den = np.where(obs, self.size[:, None], 0)
+        if weights is None:
+            num, den = num.sum(axis=0), den.sum(axis=0)
+        else:
+            num, den = weights @ num, weights @ den
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return num / den
+
+    # 경과 월별 잔존율(그 달 방문 환자 비율)과 환자당 방문 수 (관측된 코호트만으로)
+    def retention(self, months=None):
+        return self._rates(self.active, months or self.visits.shape[1])
+
+    def visit_rate(self, months=None):
+        return self._rates(self.visits, months or self.visits.shape[1])
+
+    # 환자당 누적 매출 곡선과 신뢰구간 (코호트 단위 부트스트랩)
+    #   반환: months 길이 배열 dict (ltv, low, high, retention, visit_rate)
+    def ltv(self, months, revenue_per_visit=1.0, n_boot=N_BOOT, alpha=0.05, seed=0):
+        months = min(months, self.visits.shape[1])
+        rate = self.visit_rate(months)
+        weights = np.random.default_rng(seed).multinomial(
+            len(self.size), np.full(len(self.size), 1 / max(len(self.size), 1)), size=n_boot
+        ).astype(np.float64)
+        boot = np.cumsum(self._rates(self.visits, months, weights), axis=1) * revenue_per_visit
+        q = np.nanquantile if np.isnan(boot).any() else np.quantile
+        low, high = q(boot, [alpha / 2, 1 - alpha / 2], axis=0)
+        return {
+            "ltv": np.cumsum(rate) * revenue_per_visit,
+            "low": low, "high": high,
+            "retention": self.retention(months), "visit_rate": rate,
+        }
+
+    def nbytes(self):
+        return self.size.nbytes + self.active.nbytes + self.visits.nbytes + self.observed.nbytes
+
+
+# 가정 입력(월 재방문율 r, 재방문 시 월 방문 수 v)의 LTV: Σ_{m<M} r^m · v · 매출 (등비급수)
+def assumed_ltv(months, retention, visits_per_month, revenue_per_visit):
+    r = np.asarray(retention, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        series = np.where(r == 1, months, (1 - r ** months) / (1 - r))
+    return series * visits_per_month * revenue_per_visit
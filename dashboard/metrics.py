@@ -0,0 +1,227 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from dashboard.ages import LABELS_10Y, age_histogram
+from dashboard.compact import compact_visits
+from dashboard.pipeline import Filter
+from dashboard.regions import ALL
+
+# 페이지와 배치 사전 계산(precompute.py)이 함께 쓰는 지표 계산
+# 같은 입력이면 페이지에서 바로 계산한 값과 사전 계산 결과가 같아야 한다.
+
+DATE_COL = "진료일자"
+NEW = ("초/재진", "==", "신환")
+AGE_BINS = list(range(0, 101, 10)) + [999]
+# 마케팅성과분석 페이지의 기본 타겟 지역
+DEFAULT_TARGETS = ["월곶동", "배곧1동", "배곧2동"]
+
+
+def categorize_time(hms):
+    if pd.isna(hms):
+        time_str = '000000'
+    else:
+        try:
+            val = int(hms)
+            time_str = str(val).zfill(6)
+        except (ValueError, TypeError):
+            time_str = str(hms).zfill(6)
+    hour = int(time_str[:2])
+    return f"{hour:02d}"
+
+
+# 환자정보 페이지 전처리 (방문 이력, 진료일자 순)
+def prepare_visits(df):
+    df[DATE_COL] = pd.to_datetime(df[DATE_COL], format='%Y%m%d')
+    df['진료시간대'] = df['진료시간'].apply(categorize_time)
+    df['요일'] = df[DATE_COL].dt.day_name()
+    df['연령대'] = pd.cut(df['나이'], bins=AGE_BINS, labels=LABELS_10Y, right=False, include_lowest=True)
+    df = df.sort_values(DATE_COL, kind='stable', ignore_index=True)
+    return compact_visits(df)
+
+
+def _day(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+# 사전 계산 결과가 지금 데이터로 만든 것인지 확인하는 값 (rows 를 모르면 None)
+def data_stamp(first, last, rows=None):
+    return {"first": _day(first), "last": _day(last), "rows": None if rows is None else int(rows)}
+
+
+# ---- 환자정보 ----
+
+def overview_filters(age_bands, gender):
+    filters = [('연령대', 'in', list(age_bands))]
+    if gender != "전체":
+        filters.append(('성별', '==', gender))
+    return filters
+
+
+def overview_params(start, end, age_bands, gender):
+    return {
+        "start": _day(start), "end": _day(end),
+        "연령대": [b for b in LABELS_10Y if b in set(age_bands)],
+        "성별": gender,
+    }
+
+
+def overview_kpis(filtered):
+    return {
+        "환자수": int(filtered.nunique_patients()),
+        "진료 횟수": len(filtered),
+        "신환수": filtered.count(NEW),
+        "평균 연령": float(filtered.mean('나이')),
+    }
+
+
+# 일별 내원수 + 이동평균
+def daily_trend(filtered):
+    daily = filtered.count_by(DATE_COL, '환자수')
+    for window in (6, 30, 60, 90):
+        daily[f'MA{window}'] = daily['환자수'].rolling(window=window, min_periods=1).mean()
+    return daily
+
+
+# 조회 기간과 전년 동기의 일별 내원수 (전년은 금년 날짜로 옮긴 plot_date)
+def yoy_daily(curr_period, ly_period):
+    curr = curr_period.groupby(DATE_COL).size().reset_index(name='환자수')
+    ly = ly_period.groupby(DATE_COL).size().reset_index(name='환자수')
+    curr['year_group'] = '조회 기간'
+    ly['year_group'] = '전년 동기'
+    curr['plot_date'] = curr[DATE_COL]
+    ly['plot_date'] = ly[DATE_COL] + pd.DateOffset(years=1)
+    cols = ['plot_date', '환자수', 'year_group', DATE_COL]
+    return pd.concat([curr[cols], ly[cols]], ignore_index=True)
+
+
+# 월별 내원수와 전년 동월 대비 성장률
+def monthly_growth(filtered, ly_period):
+    curr_monthly = (
+        filtered.frame([DATE_COL])
+        .groupby(pd.Grouper(key=DATE_COL, freq='ME'))
+        .size()
+        .reset_index(name='환자수')
+    )
+    ly_monthly = (
+        ly_period
+        .groupby(pd.Grouper(key=DATE_COL, freq='ME'))
+        .size()
+        .reset_index(name='환자수')
+    )
+    ly_monthly[DATE_COL] = ly_monthly[DATE_COL] + pd.DateOffset(years=1)
+    monthly = curr_monthly.merge(
+        ly_monthly.rename(columns={'환자수': 'ly_환자수'}),
+        on=DATE_COL, how='left'
+    )
+    monthly['growth_rate'] = (monthly['환자수'] - monthly['ly_환자수']) / monthly['ly_환자수']
+    monthly['ly_환자수'] = monthly['ly_환자수'].fillna(0).astype(int)
+    monthly['count_label'] = (
+        monthly['ly_환자수'].map(lambda x: f"{x:,}명") + "\\n-> " +
+        monthly['환자수'].map(lambda x: f"{x:,}명")
+    )
+    return monthly
+
+
+# 요일 × 시간대 내원수
+def visit_heatmap(engine, visits, filters):
+    return engine.aggregate(visits, ['요일', '진료시간대'], {'count': ('count', None)}, filters)
+
+
+# 환자정보 페이지 기본 보기 전체: (KPI dict, {표 이름: 프레임})
+def overview(engine, curr_period, ly_period, filters):
+    filtered = Filter(curr_period).where(*filters)
+    tables = {
+        "연령": pd.DataFrame({"내원수": age_histogram(filtered.column('나이'))}),
+        "일별": daily_trend(filtered),
+        "전년 비교": yoy_daily(curr_period, ly_period),
+        "월별": monthly_growth(filtered, ly_period),
+        "히트맵": visit_heatmap(engine, curr_period, filters),
+    }
+    return overview_kpis(filtered), tables
+
+
+# ---- 지역장악도 ----
+
+def penetration_params(cutoff_day, province=ALL, city=ALL, dong=ALL):
+    return {"cutoff": _day(cutoff_day), "시/도": province, "시/군/구": city, "행정동": dong}
+
+
+# 선택 지역 KPI 와 1세 단위 인구·활성 환자 히스토그램 (연령 구간은 페이지에서 합산)
+#   patients / active: 환자별 마지막 방문 데이터 (전체 / 기준일 이후)
+def penetration(engine, tree, population, patients, active, province=ALL, city=ALL, dong=ALL):
+    where = tree.where(province, city, dong)
+    by_age = engine.aggregate(active, ["나이"], {"환자수": ("nunique", "환자번호")}, where)
+    scalars = {
+        "인구수": int(tree.value("인구", province, city, dong)),
+        "환자수": int(Filter(patients).where(*where).nunique_patients()),
+        "활성 환자수": int(Filter(active).where(*where).nunique_patients()),
+    }
+    ages = pd.DataFrame({
+        "인구수": population.age_hist(province, city, dong),
+        "환자수": age_histogram(by_age["나이"], by_age["환자수"]),
+    })
+    return scalars, {"나이별": ages}
+
+
+# ---- 마케팅성과분석 ----
+
+# targets: 행정동 이름 목록(v1) 또는 (시/도, 시/군/구, 행정동) 선택값(v2)
+def campaign_params(campaign_start, campaign_end, before_start, before_end, targets):
+    return {
+        "campaign": [_day(campaign_start), _day(campaign_end)],
+        "before": [_day(before_start), _day(before_end)],
+        "targets": sorted(targets) if isinstance(targets, list) else list(targets),
+    }
+
+
+# 비교 기간 (사용자 지정은 페이지에서 직접 고른다)
+COMPARISONS = ("이전 동일 기간", "전년 동기")
+
+
+def comparison_period(campaign_start, campaign_end, option):
+    if option == "이전 동일 기간":
+        campaign_days = (campaign_end - campaign_start).days + 1
+        before_end = campaign_start - timedelta(days=1)
+        return before_end - timedelta(days=campaign_days - 1), before_end
+    if option == "전년 동기":
+        return campaign_start - timedelta(days=365), campaign_end - timedelta(days=365)
+    raise ValueError(f"알 수 없는 비교 기준: {option}")
+
+
+# 캠페인 / 비교 기간 타겟 지역의 신환·방문·환자 수
+def campaign_kpis(campaign_target, before_target):
+    return {
+        "캠페인 신환수": campaign_target.count(NEW),
+        "비교 신환수": before_target.count(NEW),
+        "캠페인 방문수": len(campaign_target),
+        "비교 방문수": len(before_target),
+        "캠페인 환자수": int(campaign_target.nunique_patients()),
+        "비교 환자수": int(before_target.nunique_patients()),
+    }
+
+
+# 캠페인 전후 일별 신환수 + 7일 이동평균
+#   new_visits: 추이 기간의 타겟 지역 신환 Filter
+def daily_new_trend(new_visits):
+    daily_new = new_visits.count_by(DATE_COL, '신환수')
+    daily_new['7일 이동평균'] = daily_new['신환수'].rolling(window=7, min_periods=1).mean()
+    return daily_new
+
+
+# 행정동별 캠페인 / 비교 기간 환자수·신환수와 증가율 (행정동 인덱스)
+def region_performance(engine, visits, campaign_start, campaign_end, before_start, before_end):
+    def by_dong(start, end, suffix):
+        return engine.aggregate(
+            visits, ['행정동'],
+            {f'환자수_{suffix}': ('nunique', '환자번호'), f'신환수_{suffix}': ('count_if', ('초/재진', '신환'))},
+            [(DATE_COL, 'between', (pd.to_datetime(start), pd.to_datetime(end)))]
+        ).set_index('행정동')
+
+    perf = pd.merge(by_dong(campaign_start, campaign_end, '캠페인'), by_dong(before_start, before_end, '이전'),
+                    left_index=True, right_index=True, how='outer').fillna(0)
+    perf['신환_증가'] = perf['신환수_캠페인'] - perf['신환수_이전']
+    perf['신환_증가율'] = (perf['신환_증가'] / perf['신환수_이전'] * 100).replace([np.inf, -np.inf], 0).fillna(0)
+    perf['환자_증가율'] = ((perf['환자수_캠페인'] - perf['환자수_이전']) / perf['환자수_이전'] * 100).replace([np.inf, -np.inf], 0).fillna(0)
+    return perf
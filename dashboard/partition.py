@@ -0,0 +1,113 @@
+import glob
+import os
+import time
+import uuid
+
+import pandas as pd
+
+DATE_COL = "진료일자"
+
+
+# 진료일자(YYYYMMDD 정수/문자열 또는 datetime) → datetime
+def to_dates(s):
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    return pd.to_datetime(s.astype(str), format="%Y%m%d")
+
+
+def month_key(s):
+    return to_dates(s).dt.strftime("%Y-%m")
+
+
+def _partition_dir(root, ym):
+    return os.path.join(root, f"ym={ym}")
+
+
+def list_partitions(root):
+    dirs = sorted(glob.glob(os.path.join(root, "ym=*")))
+    return [os.path.basename(d)[3:] for d in dirs]
+
+
+def _read_partition(root, ym, columns=None):
+    files = sorted(glob.glob(os.path.join(_partition_dir(root, ym), "*.parquet")))
+    return pd.concat([pd.read_parquet(f, columns=columns) for f in files], ignore_index=True)
+
+
+# 월별로 나누어 전체 다시 쓰기
+def write_partitions(df, root):
+    for ym in list_partitions(root):
+        for f in glob.glob(os.path.join(_partition_dir(root, ym), "*.parquet")):
+            os.remove(f)
+        os.rmdir(_partition_dir(root, ym))
+    append_partitions(df, root)
+
+
+# 새 행을 해당 월 파티션에 part 파일로 추가 (다른 월 파티션은 건드리지 않음)
+# 파일 이름은 시각·pid·uuid 로 만들어 동시에 추가해도 겹치지 않고, 임시 파일에 다 쓴 뒤 교체하므로
+# 읽는 쪽은 쓰다 만 파일을 보지 않는다
+def append_partitions(df, root):
+    if df.empty:
+        return []
+    keys = month_key(df[DATE_COL])
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    written = []
+    for ym, part in df.groupby(keys.values, sort=True):
+        d = _partition_dir(root, ym)
+        os.makedirs(d, exist_ok=True)
+        path = os.path.join(d, f"part-{stamp}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet")
+        tmp = f"{path}.tmp"
+        part.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        written.append(path)
+    return written
+
+
+# [start, end] 와 겹치는 파티션만 읽고 경계 월은 행 단위로 자른다
+def read_partitions(root, start=None, end=None, columns=None):
+    parts = list_partitions(root)
+    lo = pd.Timestamp(start).to_period("M") if start is not None else None
+    hi = pd.Timestamp(end).to_period("M") if end is not None else None
+    selected = [
+        ym for ym in parts
+        if (lo is None or pd.Period(ym, "M") >= lo) and (hi is None or pd.Period(ym, "M") <= hi)
+    ]
+
+    if columns is not None and DATE_COL not in columns:
+        read_cols = list(columns) + [DATE_COL]
+    else:
+        read_cols = columns
+
+    if not parts:
+        return pd.DataFrame(columns=columns or [])
+    if not selected:
+        df = _read_partition(root, parts[0], read_cols).iloc[:0]
+    else:
+        df = pd.concat([_read_partition(root, ym, read_cols) for ym in selected], ignore_index=True)
+        dates = to_dates(df[DATE_COL])
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates <= pd.Timestamp(end)
+        df = df[mask.values].reset_index(drop=True)
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+# 첫/마지막 파티션의 날짜 컬럼만 읽어 전체 기간을 구한다
+def date_bounds(root):
+    parts = list_partitions(root)
+    if not parts:
+        return None, None
+    first = to_dates(_read_partition(root, parts[0], [DATE_COL])[DATE_COL])
+    last = to_dates(_read_partition(root, parts[-1], [DATE_COL])[DATE_COL])
+    return first.min(), last.max()
+
+
+# 진료일자로 정렬된 메모리 프레임에서 [start, end] 구간을 이진 탐색으로 잘라낸다
+def slice_dates(df, start, end, col=DATE_COL):
+    dates = df[col].values
+    lo = dates.searchsorted(pd.Timestamp(start).to_datetime64(), side="left")
+    hi = dates.searchsorted(pd.Timestamp(end).to_datetime64(), side="right")
+    return df.iloc[lo:hi]
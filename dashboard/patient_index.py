@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.compact import PATIENT_COL
+from dashboard.pipeline import Filter
+
+DATE_COL = "진료일자"
+
+# 바이트 → 켜진 비트 수
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+# 환자 집합 비트맵
+# 환자 ID 목록(universe)의 위치를 비트 번호로 쓰고 np.packbits 와 같은 순서(상위 비트 먼저)로 담는다.
+# 같은 universe 끼리는 &(교집합) |(합집합) -(차집합) 이 바이트 단위 비트 연산이다.
+class PatientSet:
+    def __init__(self, bits, patients):
+        self.bits = bits
+        self.patients = patients
+
+    def _check(self, other):
+        if other.patients is not self.patients and not other.patients.equals(self.patients):
+            raise ValueError("환자 목록(universe)이 다른 집합끼리는 연산할 수 없습니다.")
+
+    def __and__(self, other):
+        self._check(other)
+        return PatientSet(self.bits & other.bits, self.patients)
+
+    def __or__(self, other):
+        self._check(other)
+        return PatientSet(self.bits | other.bits, self.patients)
+
+    def __sub__(self, other):
+        self._check(other)
+        return PatientSet(self.bits & ~other.bits, self.patients)
+
+    def __len__(self):
+        return int(_POPCOUNT[self.bits].sum())
+
+    def codes(self):
+        return np.flatnonzero(np.unpackbits(self.bits, count=len(self.patients)))
+
+    def ids(self):
+        return self.patients[self.codes()]
+
+
+# 여러 프레임에 나오는 환자 ID 를 하나의 universe 로 묶는다.
+# 같은 방문 데이터에서 잘라낸 프레임들은 category 목록을 공유하므로 그대로 쓴다.
+def universe(*frames):
+    cats = [
+        f[PATIENT_COL].cat.categories if isinstance(f[PATIENT_COL].dtype, pd.CategoricalDtype)
+        else pd.Index(f[PATIENT_COL].dropna().unique())
+        for f in frames
+    ]
+    if all(c is cats[0] for c in cats):
+        return cats[0]
+    return pd.Index(np.concatenate([c.values for c in cats])).unique()
+
+
+# 행별 universe 위치 (없으면 -1)
+def patient_codes(df, patients):
+    ids = df[PATIENT_COL]
+    if isinstance(ids.dtype, pd.CategoricalDtype):
+        cats = ids.cat.categories
+        lookup = np.arange(len(cats)) if cats is patients else patients.get_indexer(cats)
+        codes = ids.cat.codes.values
+        return np.where(codes >= 0, lookup[codes], -1)
+    return patients.get_indexer(ids)
+
+
+def _rows(source):
+    if isinstance(source, Filter):
+        return source.df, source.mask
+    return source, None
+
+
+def _empty(patients):
+    return np.zeros((len(patients) + 7) // 8, dtype=np.uint8)
+
+
+# DataFrame 이나 Filter 의 행에 나오는 환자 집합
+def patient_set(source, patients):
+    df, mask = _rows(source)
+    codes = patient_codes(df, patients)
+    if mask is not None:
+        codes = codes[mask]
+    seen = np.zeros(len(patients), dtype=bool)
+    seen[codes[codes >= 0]] = True
+    return PatientSet(np.packbits(seen), patients)
+
+
+def _week_start(days):
+    # 1970-01-01 은 목요일 → 월요일 기준 주 시작일
+    return days - ((days.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+
+
+# 일(freq="D") 또는 주(freq="W", 월요일 시작) 단위 환자 비트맵
+#   days    : 비트맵이 있는 날짜(주 시작일) 정렬 배열
+#   bitmaps : (len(days), ceil(환자수 / 8)) uint8
+#   visits  : 환자별 방문 건수 (universe 위치 기준)
+# window(start, end) 는 구간의 비트맵을 OR 로 합친 PatientSet 이다.
+class DayBitmaps:
+    def __init__(self, days, bitmaps, visits, patients, freq="D"):
+        self.days = days
+        self.bitmaps = bitmaps
+        self.visits = visits
+        self.patients = patients
+        self.freq = freq
+
+    @classmethod
+    def build(cls, source, patients, freq="D"):
+        df, mask = _rows(source)
+        codes = patient_codes(df, patients)
+        days = df[DATE_COL].values.astype("datetime64[D]")
+        if mask is not None:
+            codes, days = codes[mask], days[mask]
+        valid = codes >= 0
+        codes, days = codes[valid], days[valid]
+        if freq == "W":
+            days = _week_start(days)
+
+        uniq, inv = np.unique(days, return_inverse=True)
+        bitmaps = np.zeros((len(uniq), len(_empty(patients))), dtype=np.uint8)
+        np.bitwise_or.at(bitmaps, (inv, codes >> 3), (0x80 >> (codes & 7)).astype(np.uint8))
+        visits = np.bincount(codes, minlength=len(patients))
+        return cls(uniq, bitmaps, visits, patients, freq)
+
+    def window(self, start, end):
+        start = np.datetime64(pd.Timestamp(start).date(), "D")
+        end = np.datetime64(pd.Timestamp(end).date(), "D")
+        if self.freq == "W":
+            start = _week_start(np.array([start]))[0]
+        lo, hi = self.days.searchsorted(start, "left"), self.days.searchsorted(end, "right")
+        if lo >= hi:
+            return PatientSet(_empty(self.patients), self.patients)
+        return PatientSet(np.bitwise_or.reduce(self.bitmaps[lo:hi], axis=0), self.patients)
+
+    def nbytes(self):
+        return self.bitmaps.nbytes + self.visits.nbytes + self.days.nbytes
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.ages import LABELS_10Y, age_histogram
+from dashboard.compact import compact_visits
+from dashboard.metrics import AGE_BINS
+from dashboard.population import attach_population
+from dashboard.regions import ALL, CODE_COL, LEVELS, RegionTree, province_map
+
+DATE_COL = "진료일자"
+
+
+# 환자별 마지막 방문 기준 데이터
+def prepare_patients(df):
+    df[DATE_COL] = pd.to_datetime(df[DATE_COL], format="%Y%m%d")
+
+    df = df.sort_values(DATE_COL).drop_duplicates("환자번호", keep="last")
+
+    df["연령대"] = pd.cut(df["나이"], bins=AGE_BINS, labels=LABELS_10Y, right=False, include_lowest=True)
+
+    df["시/도"] = df["시/도"].map(province_map).fillna(df["시/도"])
+
+    df["행정기관"] = np.where(
+        df["시/도"]=="세종특별자치시",
+        df["시/도"]+" "+df["행정동"],
+        df["시/도"]+" "+df["시/군/구"]+" "+df["행정동"]
+    )
+    return compact_visits(df)
+
+
+# 인구 시트 + 환자 지역으로 만든 지역 트리 (노드별 인구, 인구 시트 행 수)
+def build_region_tree(pop, patients):
+    pop_regions = pop.index.to_frame(index=False)
+    tree = RegionTree.build(pop_regions, patients)
+    attach_population(tree, pop)
+    return tree
+
+
+# 노드 번호 → (시/도, 시/군/구, 행정동) 선택값. -1 은 전체
+def node_path(tree, code):
+    if code < 0:
+        return (ALL, ALL, ALL)
+    row = tree.nodes.iloc[code]
+    names = [row[col] for col in LEVELS[:row["level"] + 1]]
+    return tuple(names + [ALL] * (len(LEVELS) - len(names)))
+
+
+def region_label(path):
+    names = [name for name in path if name != ALL]
+    return " ".join(names) if names else "전체"
+
+
+def _rate(patients, pop):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(pop > 0, np.asarray(patients) / np.maximum(pop, 1) * 100, np.nan)
+
+
+# 지역 한 곳의 장악도 보고서 표 (지역장악도 페이지의 KPI·연령대 표·하위 지역 표와 같은 기준)
+#   patients: 지역코드 순으로 정렬한 환자별 프레임 (지역코드, 나이, 진료일자=마지막 방문)
+#   code    : 노드 번호 (-1 = 전체), cutoff: 활성 환자 기준일
+# 하위 지역은 [code, end) 연속 구간이라 정렬된 지역코드에서 searchsorted 로 잘라 쓴다.
+def region_tables(tree, population, patients, code, cutoff, banding):
+    path = node_path(tree, code)
+    codes = patients[CODE_COL].values
+    if code < 0:
+        lo, hi = 0, len(tree)
+        rows = slice(0, len(codes))
+    else:
+        lo, hi = code, int(tree.nodes["end"].values[code])
+        rows = slice(codes.searchsorted(lo, "left"), codes.searchsorted(hi, "left"))
+
+    children = tree.child_codes(*path)
+    ages = patients["나이"].values[rows]
+    active = patients[DATE_COL].values[rows] >= np.datetime64(cutoff)
+    total_pop = int(tree.value("인구", *path))
+    total_patients, active_patients = len(ages), int(active.sum())
+
+    summary = pd.DataFrame({
+        "항목": ["지역", "인구수", "환자수", "활성 환자수", "지역 장악도(%)", "기간내 장악도(%)", "활성 기준일"],
+        "값": [
+            region_label(path), total_pop, total_patients, active_patients,
+            round(float(_rate(total_patients, total_pop)), 2), round(float(_rate(active_patients, total_pop)), 2),
+            pd.Timestamp(cutoff).strftime("%Y-%m-%d"),
+        ],
+    })
+
+    by_age = banding.frame(population.age_hist(*path), "인구수")
+    by_age["환자수"] = banding.apply(age_histogram(ages))
+    by_age["활성 환자수"] = banding.apply(age_histogram(ages[active]))
+    by_age["장악도(%)"] = _rate(by_age["환자수"], by_age["인구수"])
+    by_age["기간내 장악도(%)"] = _rate(by_age["활성 환자수"], by_age["인구수"])
+
+    tables = {"요약": summary, "연령대별": by_age}
+    if len(children):
+        # 구간 안 잎 코드별 환자 수 → 누적합 차로 하위 노드별 합계
+        local = codes[rows] - lo
+        keep = (local >= 0) & (local < hi - lo)
+        prefix = np.concatenate([[0], np.cumsum(np.bincount(local[keep], minlength=hi - lo))])
+        prefix_active = np.concatenate([[0], np.cumsum(np.bincount(local[keep & active], minlength=hi - lo))])
+        ends = tree.nodes["end"].values[children]
+        level = int(tree.nodes["level"].values[children[0]])
+        child = pd.DataFrame({
+            LEVELS[level]: tree.nodes["name"].values[children],
+            "인구수": tree.nodes["인구"].values[children],
+            "환자수": prefix[ends - lo] - prefix[children - lo],
+            "활성 환자수": prefix_active[ends - lo] - prefix_active[children - lo],
+        })
+        child["장악도(%)"] = _rate(child["환자수"], child["인구수"])
+        child["기간내 장악도(%)"] = _rate(child["활성 환자수"], child["인구수"])
+        tables["하위 지역"] = child
+    return tables
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.compact import CODE_COL, PATIENT_COL, count_unique
+from dashboard.engine import condition_mask
+
+
+# 복사 없는 필터 파이프라인
+# 원본 프레임은 그대로 두고 불리언 마스크만 누적한다. 행을 꺼내는 것은
+# column()/frame() 을 부를 때 한 번, 그것도 요청한 컬럼만이다.
+#
+#   f = Filter(df).where(("성별", "==", "여"), ("연령대", "in", bands))
+#   len(f), f.count(("초/재진", "==", "신환")), f.nunique_patients(), f.frame(["진료일자"])
+class Filter:
+    def __init__(self, df, mask=None):
+        self.df = df
+        self.mask = np.ones(len(df), dtype=bool) if mask is None else mask
+
+    # 조건: (컬럼, 연산자, 값) 또는 원본과 같은 길이의 불리언 배열/Series
+    def _cond(self, cond):
+        if isinstance(cond, tuple):
+            col, op, val = cond
+            cond = condition_mask(self.df[col], op, val)
+        return np.asarray(cond, dtype=bool)
+
+    def where(self, *conds):
+        mask = self.mask
+        for cond in conds:
+            mask = mask & self._cond(cond)
+        return Filter(self.df, mask)
+
+    def __len__(self):
+        return int(self.mask.sum())
+
+    def count(self, *conds):
+        return len(self.where(*conds))
+
+    @property
+    def positions(self):
+        return np.flatnonzero(self.mask)
+
+    def column(self, col):
+        return self.df[col][self.mask]
+
+    def frame(self, cols):
+        return self.df.loc[self.mask, list(cols)]
+
+    def mean(self, col):
+        return self.column(col).mean()
+
+    def nunique(self, col):
+        return self.column(col).nunique()
+
+    def nunique_patients(self):
+        if CODE_COL in self.df.columns and isinstance(self.df[PATIENT_COL].dtype, pd.CategoricalDtype):
+            codes = self.df[CODE_COL].values[self.mask]
+            return count_unique(codes, len(self.df[PATIENT_COL].cat.categories))
+        return self.nunique(PATIENT_COL)
+
+    # 값별 행 수 (관측된 값만, 값 순 정렬)
+    def count_by(self, col, name="count"):
+        return self.frame([col]).groupby(col, observed=True).size().reset_index(name=name)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.ages import LABELS_10Y, MAX_AGE, spread_bands
+from dashboard.regions import ALL, CODE_COL
+
+# 연령별인구현황 시트의 연령대 컬럼 (10세 단위, 마지막은 100세 이상)
+AGE_BANDS = LABELS_10Y
+
+
+# "1,234" 같은 문자열 → 정수 (읽을 수 없으면 0)
+def parse_counts(s):
+    values = pd.to_numeric(s.astype(str).str.replace(",", ""), errors="coerce")
+    return values.fillna(0).astype(np.int64).values
+
+
+# 지역 트리에 인구 시트 행 수(인구행)와 총 인구(인구)를 붙인다
+#   pop: regions.prepare_population() 결과
+def attach_population(tree, pop):
+    codes = tree.leaf_codes(pop.index.to_frame(index=False))
+    tree.attach("인구행", codes)
+    tree.attach("인구", codes, parse_counts(pop["전체인구"]))
+    return codes
+
+
+# 지역코드 × 연령대 인구 (적재 시 한 번 숫자로 바꿔 둔다)
+#   long   : 지역코드, 연령대, 인구수 (잎 = 행정동 단위, int64)
+#   matrix : (트리 노드 수, 연령대 수) — 시/도·시/군/구 노드는 하위 합계
+#   ages   : (트리 노드 수, MAX_AGE + 1) 1세 단위 인구. 시트에는 10세 구간뿐이라 구간 안에 고르게 나눈 값이다.
+# 어느 지역을 고르든 matrix 의 행 하나(전체면 시/도 행들)를 더하면 된다.
+class PopulationTable:
+    def __init__(self, long, matrix, bands, tree):
+        self.long = long
+        self.matrix = matrix
+        self.bands = bands
+        self.tree = tree
+        starts = [10 * AGE_BANDS.index(b) for b in bands]
+        widths = [min(10, MAX_AGE + 1 - s) for s in starts]
+        self.age_matrix = spread_bands(matrix, starts, widths)
+
+    @classmethod
+    def build(cls, pop, tree, bands=AGE_BANDS):
+        bands = [b for b in bands if b in pop.columns]
+        codes = tree.leaf_codes(pop.index.to_frame(index=False))
+        counts = np.column_stack([parse_counts(pop[b]) for b in bands])
+        keep = codes >= 0
+        codes, counts = codes[keep], counts[keep]
+
+        long = pd.DataFrame({
+            CODE_COL: np.repeat(codes, len(bands)),
+            "연령대": pd.Categorical(np.tile(bands, len(codes)), categories=bands),
+            "인구수": counts.ravel(),
+        })
+        per_code = np.zeros((len(tree), len(bands)), dtype=np.int64)
+        np.add.at(per_code, codes, counts)
+        return cls(long, tree.rollup(per_code), bands, tree)
+
+    def ages(self, province=ALL, city=ALL, dong=ALL):
+        counts = self.matrix[self.tree.select(province, city, dong)].sum(axis=0)
+        return pd.DataFrame({
+            "연령대": pd.Categorical(self.bands, categories=self.bands),
+            "인구수": counts,
+        })
+
+    def age_hist(self, province=ALL, city=ALL, dong=ALL):
+        return self.age_matrix[self.tree.select(province, city, dong)].sum(axis=0)
+
+    def total(self, province=ALL, city=ALL, dong=ALL):
+        return int(self.ages(province, city, dong)["인구수"].sum())
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+LEVELS = ("시/도", "시/군/구", "행정동")
+CODE_COL = "지역코드"
+ALL = "전체"
+
+province_map = {
+    '서울': '서울특별시', '인천': '인천광역시', '경기': '경기도', '광주': '광주광역시',
+    '부산': '부산광역시', '대구': '대구광역시', '대전': '대전광역시', '울산': '울산광역시',
+    '경남': '경상남도', '경북': '경상북도', '전남': '전라남도', '충북': '충청북도', '충남': '충청남도'
+}
+
+special_cities = {
+    "수원시","성남시","안양시","부천시","안산시",
+    "고양시","용인시","청주시","천안시",
+    "전주시","포항시","창원시"
+}
+
+
+# "경기도 시흥시 월곶동" / "경기도 수원시 장안구 파장동" / "세종특별자치시 조치원읍" → 시/도, 시/군/구, 행정동
+def split_address(addr: str):
+    parts = addr.split()
+    if parts[0]=="세종특별자치시" and len(parts)==2:
+        return pd.Series({"시/도":parts[0],"시/군/구":"","행정동":parts[1]})
+    elif len(parts)==4 and parts[1] in special_cities:
+        return pd.Series({
+            "시/도":parts[0],
+            "시/군/구":f"{parts[1]} {parts[2]}",
+            "행정동":parts[3]
+        })
+    elif len(parts)==3 and parts[1] not in special_cities:
+        return pd.Series({
+            "시/도":parts[0],
+            "시/군/구":parts[1],
+            "행정동":parts[2]
+        })
+    else:
+        return pd.Series({"시/도":None,"시/군/구":None,"행정동":None})
+
+
+# 연령별인구현황 시트 → (시/도, 시/군/구, 행정동) 인덱스 프레임
+def prepare_population(pop):
+    split_df = pop["행정기관"].apply(split_address)
+    split_df.columns = ["시/도","시/군/구","행정동"]
+
+    df = pd.concat([pop, split_df], axis=1).dropna(subset=["시/도"])
+
+    if "총 인구수" in df.columns:
+        df = df.rename(columns={"총 인구수":"전체인구"})
+    return df.set_index(["시/도","시/군/구","행정동"])
+
+
+def _region_keys(df):
+    return df[list(LEVELS)].astype(object).fillna("")
+
+
+# 시/도 → 시/군/구 → 행정동 트리
+# 노드 번호는 이름순 전위 순회 번호라서 한 노드의 하위 지역은 [code, end) 연속 구간이다.
+# 방문 행에는 행정동(잎) 번호만 지역코드로 달아 두면, 어느 단계의 지역 선택이든
+# 문자열 비교 대신 정수 구간 비교 한 번으로 마스크를 만들 수 있다.
+#
+#   nodes 컬럼: level(0/1/2), name, parent, end, 시/도, 시/군/구, 행정동, + attach() 로 붙인 값
+class RegionTree:
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self._index = {}
+        self._children = {(): []}
+        for code, row in enumerate(nodes[["level", "시/도", "시/군/구", "행정동"]].itertuples(index=False)):
+            path = tuple(row[1:row[0] + 2])
+            self._index[path] = code
+            self._children[path] = []
+            self._children[path[:-1]].append(code)
+        leaves = nodes[nodes["level"] == len(LEVELS) - 1]
+        self._leaf_index = pd.MultiIndex.from_frame(leaves[list(LEVELS)])
+        self._leaf_codes = leaves.index.values
+
+    # regions: 시/도·시/군/구·행정동 컬럼이 있는 프레임들 (중복 무관)
+    @classmethod
+    def build(cls, *regions):
+        keys = pd.concat([_region_keys(r) for r in regions], ignore_index=True)
+        keys = keys[keys["시/도"] != ""].drop_duplicates().sort_values(list(LEVELS))
+
+        rows = []
+        prev = (None, None)
+        for province, city, dong in keys.itertuples(index=False):
+            if province != prev[0]:
+                rows.append((0, province, province, "", ""))
+            if (province, city) != prev:
+                rows.append((1, city, province, city, ""))
+            rows.append((2, dong, province, city, dong))
+            prev = (province, city)
+        nodes = pd.DataFrame(rows, columns=["level", "name", "시/도", "시/군/구", "행정동"])
+
+        # 부모 / 하위 구간 끝: 뒤에서부터 같은 단계 이하가 처음 나오는 위치
+        level = nodes["level"].values
+        parent = np.full(len(nodes), -1)
+        end = np.empty(len(nodes), dtype=np.int64)
+        last = [-1] * len(LEVELS)
+        for code, lv in enumerate(level):
+            last[lv] = code
+            if lv:
+                parent[code] = last[lv - 1]
+        nxt = [len(nodes)] * len(LEVELS)
+        for code in range(len(nodes) - 1, -1, -1):
+            lv = level[code]
+            end[code] = min(nxt[: lv + 1])
+            nxt[lv] = code
+        nodes["parent"] = parent
+        nodes["end"] = end
+        return cls(nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _path(self, province=ALL, city=ALL, dong=ALL):
+        path = ()
+        for name in (province, city, dong):
+            if name == ALL:
+                break
+            path += (name,)
+        return path
+
+    # 선택 지역의 코드 구간 [lo, hi). 모두 "전체"면 전체 구간, 없는 지역이면 빈 구간
+    def code_range(self, province=ALL, city=ALL, dong=ALL):
+        path = self._path(province, city, dong)
+        if not path:
+            return 0, len(self.nodes)
+        code = self._index.get(path)
+        if code is None:
+            return 0, 0
+        return code, int(self.nodes["end"].values[code])
+
+    # 바로 아래 단계 노드 번호 (모두 "전체"면 시/도 노드들)
+    def child_codes(self, province=ALL, city=ALL, dong=ALL):
+        return np.asarray(self._children.get(self._path(province, city, dong), []), dtype=np.int64)
+
+    # 바로 아래 단계 이름 목록 (having 컬럼이 주어지면 그 값이 0 보다 큰 노드만)
+    def children(self, province=ALL, city=ALL, having=None):
+        codes = self._children.get(self._path(province, city), [])
+        if having is not None:
+            values = self.nodes[having].values
+            codes = [c for c in codes if values[c] > 0]
+        return self.nodes["name"].values[codes].tolist()
+
+    def node(self, province=ALL, city=ALL, dong=ALL):
+        code = self._index.get(self._path(province, city, dong))
+        return None if code is None else self.nodes.iloc[code]
+
+    # 선택 지역 값을 더할 노드 번호: 모두 "전체"면 시/도 노드 전부, 없는 지역이면 빈 목록
+    def select(self, province=ALL, city=ALL, dong=ALL):
+        path = self._path(province, city, dong)
+        if not path:
+            return np.flatnonzero(self.nodes["level"].values == 0)
+        code = self._index.get(path)
+        return np.array([] if code is None else [code], dtype=np.int64)
+
+    # 행별 잎(행정동) 코드, 트리에 없는 지역은 -1
+    def leaf_codes(self, df):
+        keys = df[list(LEVELS)]
+        groups = keys.groupby(list(LEVELS), observed=True, dropna=False, sort=False)
+        group_id = groups.ngroup().values
+        first = np.unique(group_id, return_index=True)[1]
+        uniq = _region_keys(keys.iloc[first])
+        hit = self._leaf_index.get_indexer(pd.MultiIndex.from_frame(uniq))
+        lookup = np.where(hit >= 0, self._leaf_codes[hit], -1).astype(np.int32)
+        return lookup[group_id]
+
+    def value(self, col, province=ALL, city=ALL, dong=ALL):
+        return self.nodes[col].values[self.select(province, city, dong)].sum()
+
+    # 선택 지역에 속한 행정동 이름
+    def dongs(self, province=ALL, city=ALL, dong=ALL):
+        lo, hi = self.code_range(province, city, dong)
+        sub = self.nodes.iloc[lo:hi]
+        return sub.loc[sub["level"] == len(LEVELS) - 1, "행정동"].unique().tolist()
+
+    # 모두 "전체"면 트리에 없는 행(-1)까지 포함한다
+    def mask(self, codes, province=ALL, city=ALL, dong=ALL):
+        if not self._path(province, city, dong):
+            return np.ones(len(codes), dtype=bool)
+        lo, hi = self.code_range(province, city, dong)
+        return (codes >= lo) & (codes < hi)
+
+    # 집계 엔진/Filter 조건 (전체면 조건 없음)
+    def where(self, province=ALL, city=ALL, dong=ALL, col=CODE_COL):
+        if not self._path(province, city, dong):
+            return []
+        lo, hi = self.code_range(province, city, dong)
+        return [(col, "between", (lo, hi - 1))]
+
+    # 노드별 값(잎에만 값이 있는 1차원/2차원 배열) → 하위 구간 합 (전위 순서 누적합의 차)
+    def rollup(self, per_code):
+        per_code = np.asarray(per_code)
+        zero = np.zeros((1,) + per_code.shape[1:], dtype=per_code.dtype)
+        prefix = np.concatenate([zero, np.cumsum(per_code, axis=0)])
+        return prefix[self.nodes["end"].values] - prefix[np.arange(len(self.nodes))]
+
+    # 잎 코드별 값(또는 행 수)을 모든 노드로 합산해 nodes[name] 에 붙인다
+    def attach(self, name, codes, weights=None):
+        codes = np.asarray(codes)
+        keep = codes >= 0
+        w = None if weights is None else np.asarray(weights, dtype=np.float64)[keep]
+        per_code = np.bincount(codes[keep], weights=w, minlength=len(self.nodes))
+        total = self.rollup(per_code)
+        self.nodes[name] = total if weights is not None else total.astype(np.int64)
+        return self
@@ -0,0 +1,53 @@
+import html
+import os
+import re
+
+import pandas as pd
+
+from dashboard import export
+
+REPORT_FORMATS = ("xlsx", "html")
+
+_STYLE = """
+body { font-family: sans-serif; margin: 24px; }
+table { border-collapse: collapse; margin-bottom: 24px; }
+th, td { border: 1px solid #ccc; padding: 4px 8px; text-align: right; }
+th { background: #f0f0f0; }
+td:first-child, th:first-child { text-align: left; }
+"""
+
+
+# 파일 이름에 쓸 수 없는 문자 → "_"
+def safe_name(name):
+    return re.sub(r'[\\/:*?"<>|]+', "_", str(name)).strip() or "_"
+
+
+def _format(df):
+    return df.to_html(index=False, na_rep="-", float_format=lambda x: f"{x:,.2f}", border=0)
+
+
+# 표 묶음 {시트 이름: 프레임} → 시트별 XLSX 한 파일, 또는 표별 절이 있는 HTML 한 파일
+def write_bundle(tables, path, fmt, title=""):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if fmt == "xlsx":
+        export.write_xlsx(tables, tmp)
+    elif fmt == "html":
+        body = "".join(f"<h2>{html.escape(name)}</h2>{_format(df)}" for name, df in tables.items())
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(
+                f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+                f"<style>{_STYLE}</style></head><body><h1>{html.escape(title)}</h1>{body}</body></html>"
+            )
+    else:
+        raise ValueError(f"지원하지 않는 보고서 형식입니다: {fmt}")
+    os.replace(tmp, path)
+    return path
+
+
+# 지역별 요약 행 목록 → 전체 목록 표 (파일 경로는 출력 폴더 기준 상대 경로)
+def index_frame(rows, out_dir):
+    index = pd.DataFrame(rows)
+    if "파일" in index.columns:
+        index["파일"] = [os.path.relpath(p, out_dir) for p in index["파일"]]
+    return index
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.ltv import assumed_ltv
+
+# 시나리오 축 (이름 → 단위 표시 형식)
+AXES = {
+    "LTV 기간(개월)": "{:.0f}",
+    "월 재방문율(%)": "{:.0f}",
+    "월 방문 횟수": "{:.0f}",
+    "방문당 매출(원)": "{:,.0f}",
+}
+METRICS = ("ROI(%)", "예상 총 수익(원)", "손익분기 신환수")
+
+
+def default_axes(revenue_per_visit):
+    return {
+        "LTV 기간(개월)": np.arange(1, 13),
+        "월 재방문율(%)": np.arange(0, 101, 10),
+        "월 방문 횟수": np.arange(1, 11),
+        "방문당 매출(원)": np.round(revenue_per_visit * np.linspace(0.5, 1.5, 11), -2),
+    }
+
+
+# 축 조합 전체의 LTV·총 수익·ROI·손익분기 신환수를 브로드캐스트 한 번으로 계산한다.
+#   axes: AXES 순서의 1차원 배열 dict → 각 지표는 (기간, 재방문율, 방문 횟수, 매출) 모양 배열
+class ScenarioGrid:
+    def __init__(self, axes, values):
+        self.axes = axes
+        self.values = values
+
+    @classmethod
+    def build(cls, axes, new_patients, marketing_cost):
+        months, retention, visits, revenue = (np.asarray(axes[name], dtype=np.float64) for name in AXES)
+        ltv = assumed_ltv(
+            months[:, None, None, None],
+            retention[None, :, None, None] / 100,
+            visits[None, None, :, None],
+            revenue[None, None, None, :],
+        )
+        total = new_patients * ltv
+        with np.errstate(invalid="ignore", divide="ignore"):
+            roi = (total - marketing_cost) / marketing_cost * 100 if marketing_cost > 0 else np.full_like(ltv, np.nan)
+            breakeven = np.where(ltv > 0, marketing_cost / ltv, np.inf)
+        return cls(axes, {"LTV(원)": ltv, "예상 총 수익(원)": total, "ROI(%)": roi, "손익분기 신환수": breakeven})
+
+    # 기준값에 가장 가까운 축 위치
+    def index_of(self, base):
+        return {name: int(np.abs(np.asarray(self.axes[name], dtype=np.float64) - base[name]).argmin()) for name in AXES}
+
+    # 두 축을 남기고 나머지는 기준값에 고정한 long 프레임 (히트맵용)
+    def slice(self, metric, x, y, base):
+        at = self.index_of(base)
+        names = list(AXES)
+        index = tuple(slice(None) if name in (x, y) else at[name] for name in names)
+        table = self.values[metric][index]
+        if names.index(x) < names.index(y):
+            table = table.T                                  # (y, x)
+        return pd.DataFrame({
+            x: np.tile(self.axes[x], len(self.axes[y])),
+            y: np.repeat(self.axes[y], len(self.axes[x])),
+            metric: table.ravel(),
+        })
+
+    # 축마다 최솟값·최댓값으로 바꿨을 때의 지표 (나머지는 기준값), 변동 폭 큰 순
+    def sensitivity(self, metric, base):
+        at = self.index_of(base)
+        names = list(AXES)
+        center = self.values[metric][tuple(at[n] for n in names)]
+        rows = []
+        for name in names:
+            lo, hi = (tuple(pos if n == name else at[n] for n in names) for pos in (0, -1))
+            low, high = self.values[metric][lo], self.values[metric][hi]
+            rows.append({
+                "변수": name,
+                "최솟값": AXES[name].format(self.axes[name][0]),
+                "최댓값": AXES[name].format(self.axes[name][-1]),
+                "최솟값일 때": low,
+                "기준": center,
+                "최댓값일 때": high,
+                "변동 폭": abs(high - low),
+            })
+        return pd.DataFrame(rows).sort_values("변동 폭", ascending=False, ignore_index=True)
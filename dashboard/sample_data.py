@@ -0,0 +1,107 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from dashboard import datasource
+from dashboard.population import AGE_BANDS
+from dashboard.regions import province_map
+
+# 부하 시험·개발용 합성 데이터
+# 방문 시트(Sheet1)와 연령별인구현황 시트를 Google Sheets get_all_records() 결과와 같은 모양으로 만든다.
+#   방문: 진료일자(YYYYMMDD 정수), 진료시간(HHMMSS 정수), 환자번호, 나이, 성별, 초/재진, 시/도(약칭), 시/군/구, 행정동, x, y
+#   인구: 행정기관("경기도 시흥시 월곶동"), 총 인구수, 연령대별 인구("1,234" 문자열)
+
+# 실제 지역 몇 곳 (마케팅성과분석 기본 타겟 행정동 포함) + 가상 지역
+BASE_REGIONS = [
+    ("경기", "시흥시", "월곶동", 37.390, 126.740),
+    ("경기", "시흥시", "배곧1동", 37.370, 126.730),
+    ("경기", "시흥시", "배곧2동", 37.360, 126.720),
+    ("경기", "시흥시", "정왕1동", 37.340, 126.740),
+    ("인천", "연수구", "송도1동", 37.380, 126.650),
+    ("인천", "연수구", "옥련1동", 37.420, 126.670),
+    ("경기", "안산시 단원구", "초지동", 37.310, 126.800),
+    ("서울", "강남구", "역삼1동", 37.500, 127.030),
+]
+# 시/군/구 하나에 넣을 가상 행정동 수
+DONGS_PER_CITY = 8
+
+
+# 행정동 목록: (시/도 약칭, 시/군/구, 행정동, 위도, 경도). 병원(첫 지역)에서 멀어질수록 방문이 줄어든다.
+def sample_regions(n_dongs, rng):
+    regions = list(BASE_REGIONS[:n_dongs])
+    provinces = list(province_map)
+    k = 0
+    while len(regions) < n_dongs:
+        province = provinces[k // DONGS_PER_CITY % len(provinces)]
+        city = f"가상{k // DONGS_PER_CITY + 1}시"
+        lat, lon = 37.39 + rng.normal(0, 0.3), 126.74 + rng.normal(0, 0.3)
+        regions.append((province, city, f"가상{k % DONGS_PER_CITY + 1}동", round(lat, 4), round(lon, 4)))
+        k += 1
+    return regions
+
+
+# n_visits 건의 방문 이력과 그 지역들의 인구 시트
+#   end: 마지막 진료일 (기본 오늘), days: 기간 일수
+#   missing: 행정동·좌표가 빈 방문 비율 (주소를 못 읽은 환자)
+def generate(n_visits, n_patients=None, n_dongs=40, days=3 * 365, end=None, missing=0.02, seed=0):
+    rng = np.random.default_rng(seed)
+    n_patients = n_patients or max(n_visits // 4, 1)
+    end = end or date.today()
+    regions = sample_regions(n_dongs, rng)
+
+    # 환자 속성: 지역(병원과 가까운 지역일수록 많이), 나이, 성별, 방문 빈도(긴 꼬리)
+    lat = np.array([r[3] for r in regions])
+    lon = np.array([r[4] for r in regions])
+    dist = np.hypot(lat - lat[0], (lon - lon[0]) * 0.8)
+    weight = np.exp(-dist / 0.15)
+    home = rng.choice(len(regions), n_patients, p=weight / weight.sum())
+    age = np.clip(rng.gamma(4.0, 11.0, n_patients), 0, 105).astype(np.int64)
+    sex = rng.choice(np.array(["남", "여"]), n_patients)
+    freq = rng.pareto(1.5, n_patients) + 1
+    unknown = rng.random(n_patients) < missing
+
+    # 방문: 환자는 빈도에 비례해 뽑고, 날짜는 일요일이 적게
+    pid = rng.choice(n_patients, n_visits, p=freq / freq.sum())
+    calendar = pd.date_range(end=pd.Timestamp(end), periods=days, freq="D")
+    day_weight = np.where(calendar.dayofweek == 6, 0.2, np.where(calendar.dayofweek == 5, 0.7, 1.0))
+    day = np.sort(rng.choice(days, n_visits, p=day_weight / day_weight.sum()))
+    first = ~pd.Series(pid).duplicated().values
+
+    region = home[pid]
+    blank = unknown[pid]
+    names = np.array([[r[0], r[1], r[2]] for r in regions], dtype=object)[region]
+    names[blank, 2] = ""
+    visits = pd.DataFrame({
+        "진료일자": calendar[day].strftime("%Y%m%d").astype(np.int64),
+        "진료시간": rng.integers(9, 19, n_visits) * 10000 + rng.integers(0, 60, n_visits) * 100,
+        "환자번호": np.char.add("P", np.char.zfill(pid.astype(str), 7)),
+        "나이": age[pid],
+        "성별": sex[pid],
+        "초/재진": np.where(first, "신환", "재진"),
+        "시/도": names[:, 0],
+        "시/군/구": names[:, 1],
+        "행정동": names[:, 2],
+        "x": np.where(blank, np.nan, np.round(lon[region] + rng.normal(0, 0.01, n_visits), 6)),
+        "y": np.where(blank, np.nan, np.round(lat[region] + rng.normal(0, 0.01, n_visits), 6)),
+    })
+
+    # 인구: 행정동마다 1~3만 명, 연령대 비중은 지역마다 조금씩 다르게
+    rows = []
+    for province, city, dong, *_ in regions:
+        share = rng.dirichlet(np.full(len(AGE_BANDS), 4.0))
+        counts = np.round(share * rng.integers(10_000, 30_000)).astype(np.int64)
+        rows.append({
+            "행정기관": f"{province_map[province]} {city} {dong}",
+            "총 인구수": int(counts.sum()),
+            **{band: f"{int(n):,}" for band, n in zip(AGE_BANDS, counts)},
+        })
+    return visits, pd.DataFrame(rows)
+
+
+# 데이터 소스 형식으로 저장 (kind: datasource.SOURCES 이름, 예: "parquet", "partitioned", "file")
+def write(visits, population, kind, path):
+    source = datasource.SOURCES[kind](path)
+    source.write(datasource.VISIT_SHEET, visits)
+    source.write(datasource.POPULATION_SHEET, population)
+    return {"type": kind, "path": path}
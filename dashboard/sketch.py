@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# HyperLogLog 고유 개수 스케치 (NumPy)
+#   precision p → 레지스터 2**p 개, 상대 오차 ≈ 1.04 / sqrt(2**p)  (p=12 이면 약 1.6%)
+#   스케치끼리는 레지스터별 최댓값으로 합쳐지므로 일·지역 단위로 만들어 두고 아무 구간이나 합칠 수 있다.
+DEFAULT_PRECISION = 12
+
+
+# 환자 ID → 64비트 해시 (데이터셋마다 다른 category 코드가 아니라 ID 값 자체를 해시)
+# 결측 ID 행의 값은 의미가 없으므로 호출하는 쪽에서 notna() 로 걸러 쓴다
+def hash_ids(ids):
+    if isinstance(ids.dtype, pd.CategoricalDtype):
+        table = pd.util.hash_array(np.asarray(ids.cat.categories, dtype=object))
+        return table[ids.cat.codes.values]
+    return pd.util.hash_array(np.asarray(ids, dtype=object))
+
+
+def _bit_length(w):
+    n = np.zeros(len(w), dtype=np.uint8)
+    w = w.copy()
+    for s in (32, 16, 8, 4, 2, 1):
+        big = w >= (np.uint64(1) << np.uint64(s))
+        n[big] += s
+        w[big] >>= np.uint64(s)
+    return n + (w > 0)
+
+
+# 해시 → (레지스터 번호, rank)
+# rank = 남은 64-p 비트에서 첫 1 비트의 위치 (앞의 0 개수 + 1)
+def registers_of(hashes, precision=DEFAULT_PRECISION):
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    tail_bits = 64 - precision
+    reg = (hashes >> np.uint64(tail_bits)).astype(np.uint16)
+    tail = hashes & np.uint64((1 << tail_bits) - 1)
+    rank = (tail_bits + 1 - _bit_length(tail)).astype(np.uint8)
+    return reg, rank
+
+
+def estimate(registers):
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    # 작은 구간은 선형 계수(linear counting)로 보정
+    if raw <= 2.5 * m and zeros:
+        return m * np.log(m / zeros)
+    return raw
+
+
+class HLL:
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add_hashes(self, hashes):
+        reg, rank = registers_of(hashes, self.precision)
+        np.maximum.at(self.registers, reg, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("precision 이 다른 스케치는 합칠 수 없습니다.")
+        return HLL(self.precision, np.maximum(self.registers, other.registers))
+
+    def count(self):
+        return int(round(estimate(self.registers)))
+
+    def __len__(self):
+        return self.count()
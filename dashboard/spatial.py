@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+EARTH_KM = 6371.0088
+KM_PER_DEG = np.pi * EARTH_KM / 180
+# 좌표 중복 제거 단위 (1e-6도 ≈ 0.1m)
+_SCALE = 1_000_000
+# 거리 구간 기본값 (km, 마지막은 열린 구간)
+DISTANCE_BANDS = [0, 1, 3, 5, 10, 20]
+
+
+# 위경도 배열 간 대원 거리(km). 한쪽이 스칼라면 브로드캐스트한다.
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def band_labels(edges=DISTANCE_BANDS):
+    labels = [f"{a}~{b}km" for a, b in zip(edges[:-1], edges[1:])]
+    return labels + [f"{edges[-1]}km 이상"]
+
+
+# 거리 → 구간 번호 (NaN 은 -1)
+def distance_band(dist, edges=DISTANCE_BANDS):
+    dist = np.asarray(dist, dtype=np.float64)
+    band = np.searchsorted(np.asarray(edges[1:], dtype=np.float64), dist, side="right")
+    return np.where(np.isnan(dist), -1, band)
+
+
+# 환자 좌표 격자 색인
+# 방문 행의 좌표(y=위도, x=경도)를 중복 없는 위치 목록으로 줄이고, 위치를 cell_km 크기
+# 격자 칸 순서로 정렬해 둔다. 반경 질의는 원에 걸치는 격자 행마다 searchsorted 로
+# 연속 구간을 잘라 후보만 haversine 으로 재는 방식이라 전체 이력에서도 밀리초 단위다.
+#
+#   index = LocationIndex.build(df["y"], df["x"])
+#   near = index.within(lat, lon, 3)            # 위치별 불리언
+#   rows = index.rows(near)                     # 방문 행별 불리언 (row_loc 기준)
+#   index.nearest(lat, lon) → 가장 가까운 위치 번호, index.first_row[...] 로 원본 행
+class LocationIndex:
+    def __init__(self, lat, lon, row_loc, first_row, cell_km, origin, step, keys, width):
+        self.lat = lat
+        self.lon = lon
+        self.row_loc = row_loc
+        self.first_row = first_row
+        self.cell_km = cell_km
+        self.origin = origin
+        self.step = step
+        self.keys = keys
+        self.width = width
+
+    @classmethod
+    def build(cls, lat, lon, cell_km=1.0):
+        lat = pd.to_numeric(pd.Series(lat), errors="coerce").values.astype(np.float64)
+        lon = pd.to_numeric(pd.Series(lon), errors="coerce").values.astype(np.float64)
+        ok = ~np.isnan(lat) & ~np.isnan(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        rows = np.flatnonzero(ok)
+
+        # (위도, 경도) → 정수 키 하나로 중복 제거
+        qlat = np.round((lat[ok] + 90) * _SCALE).astype(np.int64)
+        qlon = np.round((lon[ok] + 180) * _SCALE).astype(np.int64)
+        uniq, first, inv = np.unique(qlat << 32 | qlon, return_index=True, return_inverse=True)
+        u_lat = (uniq >> 32) / _SCALE - 90
+        u_lon = (uniq & 0xFFFFFFFF) / _SCALE - 180
+
+        # 격자 칸: 경도 폭은 데이터 중앙 위도 기준으로 km 에 맞춘다
+        ref = np.cos(np.radians(np.median(u_lat))) if len(u_lat) else 1.0
+        step = np.array([cell_km / KM_PER_DEG, cell_km / (KM_PER_DEG * ref)])
+        origin = np.array([u_lat.min(), u_lon.min()]) if len(u_lat) else np.zeros(2)
+        iy = np.floor((u_lat - origin[0]) / step[0]).astype(np.int64)
+        ix = np.floor((u_lon - origin[1]) / step[1]).astype(np.int64)
+        width = int(ix.max()) + 1 if len(ix) else 1
+        keys = iy * width + ix
+
+        order = np.argsort(keys, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        row_loc = np.full(len(lat), -1, dtype=np.int32)
+        row_loc[rows] = rank[inv]
+        return cls(u_lat[order], u_lon[order], row_loc, rows[first[order]], cell_km, origin, step, keys[order], width)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def distances(self, lat, lon):
+        return haversine(lat, lon, self.lat, self.lon)
+
+    # 반경 km 안의 위치 (위치별 불리언)
+    def within(self, lat, lon, km):
+        (lat0, lon0), (dlat, dlon) = self.origin, self.step
+        out = np.zeros(len(self), dtype=bool)
+        if not len(self):
+            return out
+        # 원에 걸치는 격자 범위 (경도 폭은 원의 가장 높은 위도에서 가장 넓다)
+        span_lat = km / KM_PER_DEG
+        widest = np.cos(np.radians(min(abs(lat) + span_lat, 89.9)))
+        span_lon = km / (KM_PER_DEG * widest)
+        y_lo = int(np.floor((lat - span_lat - lat0) / dlat))
+        y_hi = int(np.floor((lat + span_lat - lat0) / dlat))
+        x_lo = max(int(np.floor((lon - span_lon - lon0) / dlon)), 0)
+        x_hi = min(int(np.floor((lon + span_lon - lon0) / dlon)), self.width - 1)
+        if x_lo > x_hi:
+            return out
+        iy = np.arange(max(y_lo, 0), max(y_hi + 1, 0))
+        lo = self.keys.searchsorted(iy * self.width + x_lo, "left")
+        hi = self.keys.searchsorted(iy * self.width + x_hi, "right")
+        sizes = hi - lo
+        if not sizes.sum():
+            return out
+        # 구간들을 이어 붙인 후보 위치 번호
+        cand = np.repeat(lo - np.concatenate([[0], np.cumsum(sizes)[:-1]]), sizes) + np.arange(sizes.sum())
+        out[cand[haversine(lat, lon, self.lat[cand], self.lon[cand]) <= km]] = True
+        return out
+
+    # 가장 가까운 위치 번호 (반경을 두 배씩 넓혀 찾고, 못 찾으면 전체에서)
+    def nearest(self, lat, lon):
+        if not len(self):
+            return -1
+        km = self.cell_km
+        while km < 200:
+            cand = np.flatnonzero(self.within(lat, lon, km))
+            if len(cand):
+                return int(cand[np.argmin(haversine(lat, lon, self.lat[cand], self.lon[cand]))])
+            km *= 2
+        return int(np.argmin(self.distances(lat, lon)))
+
+    # 위치별 값 → 방문 행별 값 (rows 가 주어지면 그 행들만, 좌표 없는 행은 fill)
+    def rows(self, per_loc, rows=None, fill=False):
+        loc = self.row_loc if rows is None else self.row_loc[rows]
+        per_loc = np.asarray(per_loc)
+        return np.where(loc >= 0, per_loc[np.maximum(loc, 0)], fill)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.lat, self.lon, self.row_loc, self.first_row, self.keys))
+
+
+# secrets 예시
+#   [clinic]
+#   name = "OO의원"
+#   lat = 37.3799
+#   lon = 126.8030
+#
+# 설정이 없으면 None
+def clinic_location(secrets):
+    conf = secrets.get("clinic")
+    if not conf or "lat" not in conf or "lon" not in conf:
+        return None
+    return {"name": conf.get("name", "병원"), "lat": float(conf["lat"]), "lon": float(conf["lon"])}
@@ -0,0 +1,76 @@
+import numpy as np
+
+# 합성 대조군에 쓸 최대 기여 지역 수 (학습 기간 신환이 많은 순)
+MAX_DONORS = 150
+
+
+# 여러 목표 열을 한 번에 푸는 비음수 최소제곱
+#   min ||A w_j - b_j||²  (w_j >= 0, mask 가 0 인 칸은 0 으로 고정)
+#   A: (T, K), B: (T, J) → W: (K, J)
+# 가속 투영 경사법(FISTA): 한 번의 반복이 행렬곱 두 번이라 열 수가 늘어도 거의 그대로다.
+def nnls_batch(A, B, mask=None, n_iter=500, tol=1e-7):
+    A = np.asarray(A, dtype=np.float64)
+    B = np.asarray(B, dtype=np.float64)
+    if B.ndim == 1:
+        B = B[:, None]
+    mask = np.ones((A.shape[1], B.shape[1])) if mask is None else np.asarray(mask, dtype=np.float64)
+    gram, rhs = A.T @ A, A.T @ B
+    step = 1.0 / max(np.linalg.norm(gram, 2), 1e-12)
+
+    W = np.zeros_like(rhs)
+    Y, t = W, 1.0
+    for _ in range(n_iter):
+        W_next = np.maximum(Y - step * (gram @ Y - rhs), 0) * mask
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        Y = W_next + ((t - 1) / t_next) * (W_next - W)
+        done = np.abs(W_next - W).max() <= tol * max(np.abs(W_next).max(), 1.0)
+        W, t = W_next, t_next
+        if done:
+            break
+    return W
+
+
+def _rmspe(err, axis=0):
+    return np.sqrt(np.mean(err ** 2, axis=axis))
+
+
+# 타겟 지역 일별 신환을 비타겟 지역들의 비음수 가중합으로 학습 기간에 맞춘다.
+# 같은 행렬 배치로 기여 지역 하나하나를 가짜 타겟으로 둔 합성 대조(자기 자신 제외)도 풀어
+# (캠페인 RMSPE / 학습 RMSPE) 순위로 p값을 낸다.
+#
+#   matrix: 지역 × 일 신환 행렬, target: 지역별 불리언
+#   fit_days / post_days: 학습 구간과 캠페인 구간의 열 범위 (slice)
+def synthetic_control(matrix, target, fit_days, post_days, max_donors=MAX_DONORS):
+    target = np.asarray(target, dtype=bool)
+    y = matrix[target].sum(axis=0).astype(np.float64)
+
+    pre_volume = matrix[:, fit_days].sum(axis=1)
+    candidates = np.flatnonzero(~target & (pre_volume > 0))
+    donors = candidates[np.argsort(-pre_volume[candidates], kind="stable")[:max_donors]]
+    if not len(donors) or y[fit_days].sum() == 0:
+        return None
+
+    X = matrix[donors].astype(np.float64)                     # (K, 일)
+    # 열 0: 타겟, 열 1..K: 기여 지역 k 를 가짜 타겟으로 (자기 자신 가중치는 0)
+    goals = np.vstack([y, X]).T
+    mask = np.ones((len(donors), len(donors) + 1))
+    mask[np.arange(len(donors)), np.arange(len(donors)) + 1] = 0
+    W = nnls_batch(X[:, fit_days].T, goals[fit_days], mask)
+    synth = X.T @ W                                           # (일, 1 + K)
+
+    gap = goals - synth
+    pre_rmspe = _rmspe(gap[fit_days])
+    post_rmspe = _rmspe(gap[post_days])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = post_rmspe / pre_rmspe
+    placebo = ratio[1:][np.isfinite(ratio[1:])]
+    p_value = (1 + np.sum(placebo >= ratio[0])) / (1 + len(placebo)) if np.isfinite(ratio[0]) else np.nan
+
+    return {
+        "actual": y, "synthetic": synth[:, 0],
+        "donors": donors, "weights": W[:, 0],
+        "pre_rmspe": float(pre_rmspe[0]), "post_rmspe": float(post_rmspe[0]),
+        "effect": float(gap[post_days, 0].sum()),
+        "expected": float(synth[post_days, 0].sum()),
+        "p_value": float(p_value), "n_placebo": int(len(placebo)),
+    }
@@ -0,0 +1,128 @@
+import numpy as np
+
+DATE_COL = "진료일자"
+N_BOOT = 2000
+
+
+# 지역 × 일 건수 행렬 (R, 기간 일수). 지역코드 -1 이나 기간 밖 행은 빠진다.
+#   codes: 행별 지역코드, dates: 행별 날짜
+#   end 가 start 보다 앞이면 (R, 0) 빈 행렬
+def region_day_matrix(codes, dates, n_regions, start, end):
+    start = np.datetime64(start, "D")
+    n_days = int((np.datetime64(end, "D") - start).astype(np.int64)) + 1
+    if n_days <= 0:
+        return np.zeros((n_regions, 0), dtype=np.int64)
+    day = (np.asarray(dates).astype("datetime64[D]") - start).astype(np.int64)
+    codes = np.asarray(codes)
+    ok = (codes >= 0) & (codes < n_regions) & (day >= 0) & (day < n_days)
+    flat = np.bincount(codes[ok].astype(np.int64) * n_days + day[ok], minlength=n_regions * n_days)
+    return flat.reshape(n_regions, n_days)
+
+
+# Filter(행 마스크 포함) → 지역 × 일 행렬
+def filter_matrix(rows, n_regions, start, end, code_col):
+    return region_day_matrix(rows.column(code_col).values, rows.column(DATE_COL).values, n_regions, start, end)
+
+
+# 날짜 부트스트랩 가중치 (B, 일수): 각 날짜가 몇 번 뽑혔는지. 모든 지역이 같은 날짜 표본을 쓴다.
+def bootstrap_weights(n_days, n_boot=N_BOOT, rng=None):
+    rng = np.random.default_rng(0) if rng is None else rng
+    if n_days <= 0:
+        return np.zeros((n_boot, 0), dtype=np.int64)
+    return rng.multinomial(n_days, np.full(n_days, 1 / n_days), size=n_boot)
+
+
+def _quantiles(samples, alpha, axis=-1):
+    # nanquantile 은 느리므로 NaN 이 있을 때만 쓴다
+    q = np.nanquantile if np.isnan(samples).any() else np.quantile
+    return q(samples, [alpha / 2, 1 - alpha / 2], axis=axis)
+
+
+# 비율형 이중차분
+#   기대치 = 타겟 이전 일평균 × (대조 캠페인 일평균 / 대조 이전 일평균)
+#   추가 증가율 = 타겟 캠페인 일평균 / 기대치 - 1, 추가 건수 = (타겟 캠페인 일평균 - 기대치) × 캠페인 일수
+def _did(t_pre, t_post, c_pre, c_post, post_days):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected = t_pre * c_post / c_pre
+        return t_post / expected - 1, (t_post - expected) * post_days
+
+
+# 이전 또는 캠페인 기간이 0 일이면 추정할 수 없다 (값은 모두 NaN)
+def _empty_did():
+    return {
+        "target_pre": np.nan, "target_post": np.nan,
+        "control_pre": np.nan, "control_post": np.nan,
+        "uplift": np.nan, "uplift_ci": np.full(2, np.nan),
+        "excess": np.nan, "excess_ci": np.full(2, np.nan),
+        "p_value": np.nan, "n_target": 0, "n_regions": 0,
+    }
+
+
+# 타겟 지역 묶음 vs 나머지 지역의 이중차분 추정과 신뢰구간
+#   pre, post: 지역 × 일 행렬 (이전/캠페인 기간), target: 지역별 불리언
+#   - 신뢰구간: 이전·캠페인 기간의 날짜를 각각 복원추출 (타겟·대조가 같은 날짜를 공유)
+#   - p값: 활동이 있는 지역 중 타겟과 같은 수를 무작위로 골라 만든 가짜 타겟의 추정치 분포
+def did_test(pre, post, target, n_boot=N_BOOT, alpha=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    pre, post = pre.astype(np.float64), post.astype(np.float64)
+    target = np.asarray(target, dtype=bool)
+    n_pre, n_post = pre.shape[1], post.shape[1]
+    if not n_pre or not n_post:
+        return _empty_did()
+
+    t_pre_d, c_pre_d = pre[target].sum(axis=0), pre[~target].sum(axis=0)
+    t_post_d, c_post_d = post[target].sum(axis=0), post[~target].sum(axis=0)
+    uplift, excess = _did(t_pre_d.mean(), t_post_d.mean(), c_pre_d.mean(), c_post_d.mean(), n_post)
+
+    w_pre = bootstrap_weights(n_pre, n_boot, rng) / n_pre
+    w_post = bootstrap_weights(n_post, n_boot, rng) / n_post
+    boot_uplift, boot_excess = _did(w_pre @ t_pre_d, w_post @ t_post_d, w_pre @ c_pre_d, w_post @ c_post_d, n_post)
+
+    # 가짜 타겟: 무작위 순위에서 앞 k 개 (B, 지역) 배정 행렬 → 행렬곱으로 묶음 합계
+    active = np.flatnonzero((pre.sum(axis=1) + post.sum(axis=1)) > 0)
+    k = int(target[active].sum())
+    p_value = np.nan
+    if 0 < k < len(active):
+        pre_tot = pre[active].sum(axis=1) / n_pre
+        post_tot = post[active].sum(axis=1) / n_post
+        picks = np.argpartition(rng.random((n_boot, len(active))), k - 1, axis=1)[:, :k]
+        assign = np.zeros((n_boot, len(active)))
+        assign[np.arange(n_boot)[:, None], picks] = 1
+        fake_t_pre, fake_t_post = assign @ pre_tot, assign @ post_tot
+        fake, _ = _did(fake_t_pre, fake_t_post, pre_tot.sum() - fake_t_pre, post_tot.sum() - fake_t_post, n_post)
+        fake = fake[np.isfinite(fake)]
+        if len(fake) and np.isfinite(uplift):
+            p_value = (1 + np.sum(np.abs(fake) >= abs(uplift))) / (1 + len(fake))
+
+    return {
+        "target_pre": t_pre_d.mean(), "target_post": t_post_d.mean(),
+        "control_pre": c_pre_d.mean(), "control_post": c_post_d.mean(),
+        "uplift": uplift, "uplift_ci": _quantiles(boot_uplift, alpha),
+        "excess": excess, "excess_ci": _quantiles(boot_excess, alpha),
+        "p_value": p_value, "n_target": k, "n_regions": len(active),
+    }
+
+
+# 지역별 이중차분 (대조 = 그 지역을 뺀 나머지 전체), 날짜 부트스트랩 신뢰구간
+#   반환: 지역별 (이전 합계, 캠페인 합계, 추가 건수, 하한, 상한) 배열 dict
+def region_uplift(pre, post, n_boot=N_BOOT, alpha=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    pre, post = pre.astype(np.float64), post.astype(np.float64)
+    n_pre, n_post = pre.shape[1], post.shape[1]
+    if not n_pre or not n_post:
+        empty = np.full(len(pre), np.nan)
+        return {"pre": pre.sum(axis=1), "post": post.sum(axis=1), "excess": empty, "low": empty, "high": empty}
+    w_pre = bootstrap_weights(n_pre, n_boot, rng).T / n_pre      # (일수, B)
+    w_post = bootstrap_weights(n_post, n_boot, rng).T / n_post
+
+    r_pre, r_post = pre.mean(axis=1), post.mean(axis=1)
+    all_pre, all_post = r_pre.sum(), r_post.sum()
+    _, excess = _did(r_pre, r_post, all_pre - r_pre, all_post - r_post, n_post)
+
+    b_pre, b_post = pre @ w_pre, post @ w_post                   # (지역, B)
+    _, boot = _did(b_pre, b_post, b_pre.sum(axis=0) - b_pre, b_post.sum(axis=0) - b_post, n_post)
+    low, high = _quantiles(boot, alpha, axis=1)
+    return {
+        "pre": pre.sum(axis=1), "post": post.sum(axis=1),
+        "excess": excess, "low": low, "high": high,
+    }
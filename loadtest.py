@@ -0,0 +1,393 @@
+import argparse
+import gc
+import glob
+import json
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+import unicodedata
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from dashboard import sample_data
+from dashboard.config import SECRETS_PATH, load_secrets
+
+# 대시보드 동시 접속 부하 시험
+#
+#   python loadtest.py --sessions 1 4 16 --rows 200000
+#   python loadtest.py --pages 지역장악도 --source partitioned --secrets .streamlit/secrets.toml --csv load.csv
+#
+# 합성 데이터(dashboard.sample_data)를 임시 폴더에 쓰고, Streamlit 헤드리스 테스트 도구(AppTest)로
+# 페이지마다 N개 세션을 한 프로세스에서 동시에 띄운다. 세션마다 로그인 후 날짜·지역·연령 구간·탭 안
+# 위젯을 바꾸는 조작을 --rounds 번 반복하고, 재실행(rerun) 한 번씩의 시간을 잰다.
+# 결과: 페이지 × 동시 세션 수별 재실행 지연 분위수, 처리량, 프로세스 메모리(RSS) 증가.
+#
+# 참고
+#   - 세션들은 실제 서버처럼 한 프로세스의 st.cache_data / st.cache_resource 를 함께 쓴다.
+#     측정 전에 페이지마다 세션 하나를 먼저 돌려 데이터 적재 시간은 빼고 잰다.
+#   - st.tabs 는 매번 모든 탭을 그리고 탭 전환만으로는 재실행되지 않으므로, 탭 조작은 탭 안 위젯 변경으로 흉내 낸다.
+#   - AppTest 는 실행마다 전역 st.secrets 를 바꿔 끼워서 세션별 secrets 를 쓰면 스레드끼리 충돌한다.
+#     그래서 작업 폴더에 .streamlit/secrets.toml 을 쓰고 그 폴더에서 실행한다.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PAGES = ("환자정보", "지역장악도", "마케팅성과분석", "마케팅성과분석_v2")
+PASSWORD = "loadtest"
+# RSS 표본 간격 (초)
+SAMPLE_EVERY = 0.05
+
+
+# 페이지 이름 → 스크립트 절대 경로 (파일 이름이 NFD 로 저장된 경우도 있어 정규화해 비교)
+def page_file(name):
+    for path in glob.glob(os.path.join(ROOT, "*.py")) + glob.glob(os.path.join(ROOT, "pages", "*.py")):
+        if unicodedata.normalize("NFC", os.path.basename(path)) == f"{name}.py":
+            return path
+    raise FileNotFoundError(f"페이지를 찾을 수 없습니다: {name}")
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # /proc 가 없으면 최대 RSS (Linux 는 KB 단위)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# 측정 중 최대 RSS
+class RssSampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = rss_bytes()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(SAMPLE_EVERY):
+            self.peak = max(self.peak, rss_bytes())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, rss_bytes())
+        return self.peak
+
+
+# ---- 위젯 조작 ----
+
+# 라벨로 위젯 찾기 (조건에 따라 안 그려진 위젯은 None)
+def widget(at, kind, label):
+    for w in at.get(kind):
+        if w.label == label:
+            return w
+    return None
+
+
+def choose(rng, options):
+    return options[int(rng.integers(len(options)))]
+
+
+def pick_option(kind, label, skip=()):
+    def step(at, rng, ctx):
+        w = widget(at, kind, label)
+        options = [o for o in w.options if o not in skip] if w else []
+        if not options:
+            return False
+        w.set_value(choose(rng, options))
+        return True
+    return step
+
+
+def pick_many(label, low, high=None):
+    def step(at, rng, ctx):
+        w = widget(at, "multiselect", label)
+        if w is None or not w.options:
+            return False
+        n = int(rng.integers(min(low, len(w.options)), min(high or len(w.options), len(w.options)) + 1))
+        w.set_value(list(rng.choice(w.options, n, replace=False)))
+        return True
+    return step
+
+
+def pick_number(kind, label, values):
+    def step(at, rng, ctx):
+        w = widget(at, kind, label)
+        if w is None:
+            return False
+        w.set_value(choose(rng, values))
+        return True
+    return step
+
+
+def toggle(label):
+    def step(at, rng, ctx):
+        w = widget(at, "checkbox", label)
+        if w is None:
+            return False
+        w.set_value(not w.value)
+        return True
+    return step
+
+
+# 환자정보: 데이터 마지막 날까지 최근 30일~3년
+def overview_dates(at, rng, ctx):
+    start, end = widget(at, "date_input", "시작 진료일자"), widget(at, "date_input", "종료 진료일자")
+    days = choose(rng, (30, 90, 180, 365, 3 * 365))
+    start.set_value(max(ctx["first"], ctx["last"] - timedelta(days=days - 1)))
+    end.set_value(ctx["last"])
+    return True
+
+
+# 환자정보 기본 보기로 (사전 계산 결과가 있으면 그걸 쓰는 경로)
+def overview_reset(at, rng, ctx):
+    widget(at, "date_input", "시작 진료일자").set_value(ctx["first"])
+    widget(at, "date_input", "종료 진료일자").set_value(ctx["last"])
+    age_band = widget(at, "multiselect", "연령대")
+    age_band.set_value(list(age_band.options))
+    widget(at, "selectbox", "성별").set_value("전체")
+    return True
+
+
+# 마케팅: 어제 이전에 끝나는 7~90일 캠페인
+def campaign_dates(at, rng, ctx):
+    end = date.today() - timedelta(days=int(rng.integers(1, 61)))
+    start = end - timedelta(days=choose(rng, (7, 14, 30, 60, 90)) - 1)
+    widget(at, "date_input", "시작일").set_value(start)
+    widget(at, "date_input", "종료일").set_value(end)
+    return True
+
+
+# 페이지별 조작 순서 (한 단계 = 위젯 변경 후 재실행 한 번)
+SCRIPTS = {
+    "환자정보": [
+        overview_dates,
+        pick_many("연령대", 3),
+        pick_option("selectbox", "성별"),
+        pick_option("radio", "간격 분포 기준"),
+        pick_number("slider", "반경 (km)", (1, 3, 5, 10, 20)),
+        overview_reset,
+    ],
+    "지역장악도": [
+        pick_number("slider", "최근 몇 개월 활성", (3, 6, 12, 24)),
+        pick_option("selectbox", "시/도"),
+        pick_option("selectbox", "시/군/구"),
+        pick_option("selectbox", "행정동"),
+        pick_option("selectbox", "구간", skip=("직접 입력",)),
+        pick_number("slider", "평소 방문 간격의 몇 배 초과", (1.0, 1.5, 2.0, 3.0)),
+        pick_number("slider", "최소 경과일", (0, 30, 60, 180)),
+        toggle("1회 방문 환자 포함"),
+    ],
+    "마케팅성과분석": [
+        campaign_dates,
+        pick_option("radio", "비교 기준", skip=("사용자 지정",)),
+        pick_many("타겟 지역 선택", 1, 4),
+        pick_option("selectbox", "연령 구간", skip=("직접 입력",)),
+    ],
+    "마케팅성과분석_v2": [
+        campaign_dates,
+        pick_option("radio", "비교 기준", skip=("사용자 지정",)),
+        pick_option("selectbox", "시/도"),
+        pick_option("selectbox", "시/군/구"),
+        pick_option("selectbox", "행정동"),
+        pick_number("number_input", "마케팅 비용 (원)", (0, 1_000_000, 5_000_000)),
+        pick_number("slider", "학습 기간 (캠페인 전 일수)", (28, 91, 182)),
+        pick_option("radio", "기여 규칙"),
+    ],
+}
+
+
+# ---- 세션 ----
+
+# 세션 하나: 페이지 열기 → 로그인 → 조작 rounds 번. 재실행마다 (초, 예외 수) 를 samples 에 쌓는다.
+def session(app_test, path, steps, rounds, ctx, seed, samples, start=None):
+    if start is not None:
+        start.wait()
+    rng = np.random.default_rng(seed)
+    at = app_test.from_file(path, default_timeout=ctx["timeout"])
+
+    def rerun():
+        t0 = time.perf_counter()
+        at.run()
+        samples.append((time.perf_counter() - t0, len(at.exception)))
+
+    rerun()
+    widget(at, "text_input", "대시보드 비밀번호").input(PASSWORD)
+    rerun()
+    for _ in range(rounds):
+        for step in steps:
+            if step(at, rng, ctx):
+                rerun()
+
+
+# 동시 세션 n 개를 한꺼번에 시작해 끝날 때까지 잰다
+def run_level(app_test, page, n, rounds, ctx, seed):
+    path, steps = page_file(page), SCRIPTS[page]
+    samples, failures = [], []
+    start = threading.Barrier(n + 1)
+
+    # 조작 도중 죽은 세션은 따로 센다 (재실행 수가 조용히 줄지 않게)
+    def worker(i):
+        try:
+            session(app_test, path, steps, rounds, ctx, seed + i, samples, start)
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    gc.collect()
+    rss_start = rss_bytes()
+    sampler = RssSampler()
+    for t in threads:
+        t.start()
+    sampler.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    peak = sampler.stop()
+    gc.collect()
+    rss_end = rss_bytes()
+
+    for message in sorted(set(failures)):
+        print(f"  실패: {message}")
+    ms = np.array([s for s, _ in samples] or [np.nan]) * 1000
+    mb = 1024 * 1024
+    return {
+        "페이지": page,
+        "세션": n,
+        "재실행": len(samples),
+        "오류": int(sum(e for _, e in samples)),
+        "실패 세션": len(failures),
+        "p50 (ms)": np.percentile(ms, 50),
+        "p90 (ms)": np.percentile(ms, 90),
+        "p99 (ms)": np.percentile(ms, 99),
+        "최대 (ms)": ms.max(),
+        "처리량 (회/초)": len(samples) / wall,
+        "시작 RSS (MB)": rss_start / mb,
+        "최대 RSS (MB)": peak / mb,
+        "종료 RSS (MB)": rss_end / mb,
+        "세션당 (MB)": (peak - rss_start) / mb / n,
+    }
+
+
+# ---- 준비 ----
+
+# 서버는 프로세스 하나가 ScriptCache 하나로 페이지를 한 번만 컴파일하는데, AppTest 는 실행마다 새로 만든다.
+# 그대로 두면 서버에 없는 파싱 시간이 재실행마다 잡히고, 동시에 파싱하면 깨지기도 해서(Python 3.11 ast)
+# 모든 세션이 캐시 하나를 함께 쓰게 한다.
+# 공개 API 가 아닌 내부 모듈을 바꿔 끼우는 것이라 Streamlit 버전이 바뀌어 이름이 없어지면
+# 조용히 캐시 없이 재는 대신 멈춘다 (1.66 에서 확인).
+def load_app_test():
+    import streamlit
+    from streamlit import config, logger
+    from streamlit.testing.v1 import AppTest, local_script_runner
+
+    try:
+        from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    except ImportError:
+        ScriptCache = None
+    if ScriptCache is None or not hasattr(local_script_runner, "ScriptCache"):
+        raise RuntimeError(
+            f"Streamlit {streamlit.__version__} 에서는 AppTest 의 ScriptCache 를 공유할 수 없습니다. "
+            "loadtest.py 는 streamlit.testing.v1.local_script_runner.ScriptCache 가 있는 버전"
+            "(1.66 에서 확인)이 필요합니다."
+        )
+
+    config.set_option("logger.level", "error")
+    logger.set_log_level("error")
+    shared = ScriptCache()
+    local_script_runner.ScriptCache = lambda: shared
+    return AppTest
+
+
+# secrets dict → TOML (문자열·숫자·불리언·목록 값과 중첩 표만)
+def dump_toml(secrets, prefix=""):
+    lines, tables = [], []
+    for key, value in secrets.items():
+        if isinstance(value, dict):
+            tables.append((key, value))
+        else:
+            lines.append(f"{key} = {json.dumps(value, ensure_ascii=False)}")
+    for key, value in tables:
+        name = f"{prefix}.{key}" if prefix else key
+        lines += ["", f"[{name}]", dump_toml(value, name)]
+    return "\n".join(lines).strip()
+
+
+# 작업 폴더에 합성 데이터와 .streamlit/secrets.toml 을 쓰고, 데이터 기간을 돌려준다
+def prepare(workdir, args):
+    started = time.time()
+    visits, population = sample_data.generate(args.rows, n_dongs=args.dongs, days=args.days, seed=args.seed)
+    source = sample_data.write(visits, population, args.source, os.path.join(workdir, "data"))
+
+    # 엔진·캐시 설정 등은 --secrets 에서 가져오고 데이터 소스와 비밀번호만 바꾼다
+    secrets = load_secrets(args.secrets) if args.secrets else {}
+    secrets["general"] = {**secrets.get("general", {}), "APP_PASSWORD": PASSWORD}
+    secrets["data_source"] = source
+    os.makedirs(os.path.join(workdir, ".streamlit"), exist_ok=True)
+    with open(os.path.join(workdir, SECRETS_PATH), "w", encoding="utf-8") as f:
+        f.write(dump_toml(secrets) + "\n")
+
+    days = pd.to_datetime(visits["진료일자"], format="%Y%m%d")
+    print(f"합성 데이터: 방문 {len(visits):,}건, 환자 {visits['환자번호'].nunique():,}명, "
+          f"행정동 {len(population):,}곳 → {source['type']} ({time.time() - started:.1f}초)")
+    return {"first": days.min().date(), "last": days.max().date(), "timeout": args.timeout}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="대시보드 동시 접속 부하 시험")
+    parser.add_argument("--pages", nargs="+", choices=PAGES, default=list(PAGES))
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 2, 4, 8], help="동시 세션 수 (차례로)")
+    parser.add_argument("--rounds", type=int, default=3, help="세션마다 조작 순서를 반복할 횟수")
+    parser.add_argument("--rows", type=int, default=100_000, help="합성 방문 건수")
+    parser.add_argument("--dongs", type=int, default=40, help="합성 행정동 수")
+    parser.add_argument("--days", type=int, default=3 * 365, help="합성 데이터 기간 (오늘까지 일수)")
+    parser.add_argument("--source", choices=("parquet", "partitioned", "file"), default="parquet")
+    parser.add_argument("--secrets", help="엔진·캐시 등 설정을 가져올 secrets 파일 (데이터 소스는 합성 데이터로 바꾼다)")
+    parser.add_argument("--workdir", help="합성 데이터·설정 폴더 (기본: 임시 폴더, 끝나면 지움)")
+    parser.add_argument("--timeout", type=float, default=300, help="재실행 한 번의 제한 시간 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="결과를 저장할 CSV 파일")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.secrets:
+        args.secrets = os.path.abspath(args.secrets)
+    csv_path = os.path.abspath(args.csv) if args.csv else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="loadtest-")
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    try:
+        ctx = prepare(workdir, args)
+        # st.secrets 는 현재 폴더의 .streamlit/secrets.toml 을 읽는다
+        os.chdir(workdir)
+        AppTest = load_app_test()
+
+        rows = []
+        for page in args.pages:
+            t0 = time.time()
+            session(AppTest, page_file(page), SCRIPTS[page], 1, ctx, args.seed, [])
+            print(f"{page}: 캐시 준비 {time.time() - t0:.1f}초")
+            for n in args.sessions:
+                rows.append(run_level(AppTest, page, n, args.rounds, ctx, args.seed))
+                print(f"  세션 {n}: p50 {rows[-1]['p50 (ms)']:.0f}ms, 처리량 {rows[-1]['처리량 (회/초)']:.2f}회/초")
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = pd.DataFrame(rows).round(1)
+    print()
+    print(report.to_string(index=False, float_format=lambda x: f"{x:,.1f}"))
+    if csv_path:
+        report.to_csv(csv_path, index=False, encoding="utf-8-sig")
+        print(f"→ {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,26 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import gspread
 import numpy as np
+import folium
+from branca.colormap import LinearColormap
+from streamlit_folium import folium_static
 from datetime import datetime, timedelta
 
+from dashboard import arrow_store, artifacts, datasource, export, geo, metrics
+from dashboard.ages import BANDINGS, CUSTOM, parse_edges
+from dashboard.cadence import VisitGaps
+from dashboard.catchment import DECAY_MODELS, catchment_table, decay_curve, fit_decay
+from dashboard.compact import compact_visits, memory_report
+from dashboard.engine import get_engine
+from dashboard.partition import slice_dates
+from dashboard.patient_index import patient_codes
+from dashboard.penetration import build_region_tree, prepare_patients
+from dashboard.pipeline import Filter
+from dashboard.population import PopulationTable
+from dashboard.regions import CODE_COL, prepare_population
+from dashboard.spatial import DISTANCE_BANDS, band_labels, clinic_location, distance_band
+
 def authenticate():
     if "authenticated" not in st.session_state:
         st.session_state.authenticated = False
@@ -29,167 +45,176 @@ st.set_page_config(page_title="행정동·연령대별 장악도 분석", layout
 
 authenticate()
 
-province_map = {
-    '서울': '서울특별시', '인천': '인천광역시', '경기': '경기도', '광주': '광주광역시',
-    '부산': '부산광역시', '대구': '대구광역시', '대전': '대전광역시', '울산': '울산광역시',
-    '경남': '경상남도', '경북': '경상북도', '전남': '전라남도', '충북': '충청북도', '충남': '충청남도'
-}
-
-special_cities = {
-    "수원시","성남시","안양시","부천시","안산시",
-    "고양시","용인시","청주시","천안시",
-    "전주시","포항시","창원시"
-}
-
-def build_mask(df, province, city, dong):
-    mask = pd.Series(True, index=df.index)
-    if province != "전체":
-        mask &= df["시/도"] == province
-    if city != "전체":
-        mask &= df["시/군/구"] == city
-    if dong != "전체":
-        mask &= df["행정동"] == dong
-    return mask
-
-def split_address(addr: str):
-    parts = addr.split()
-    if parts[0]=="세종특별자치시" and len(parts)==2:
-        return pd.Series({"시/도":parts[0],"시/군/구":"","행정동":parts[1]})
-    elif len(parts)==4 and parts[1] in special_cities:
-        return pd.Series({
-            "시/도":parts[0],
-            "시/군/구":f"{parts[1]} {parts[2]}",
-            "행정동":parts[3]
-        })
-    elif len(parts)==3 and parts[1] not in special_cities:
-        return pd.Series({
-            "시/도":parts[0],
-            "시/군/구":parts[1],
-            "행정동":parts[2]
-        })
-    else:
-        return pd.Series({"시/도":None,"시/군/구":None,"행정동":None})
-
-@st.cache_data
+# 공유 Arrow 파일이 설정되어 있으면 워커 프로세스들이 같은 파일을 메모리 매핑한다
+@st.cache_resource
 def load_population():
-    creds = st.secrets["gcp_service_account"]
-    client = gspread.service_account_from_dict(creds)
-    ws = client.open_by_key(st.secrets["google_sheets"]["sheet_id"]).worksheet("연령별인구현황")
-    pop = pd.DataFrame(ws.get_all_records())
-
-    split_df = pop["행정기관"].apply(split_address)
-    split_df.columns = ["시/도","시/군/구","행정동"]
-
-    df = pd.concat([pop, split_df], axis=1).dropna(subset=["시/도"])
-
-    if "총 인구수" in df.columns:
-        df = df.rename(columns={"총 인구수":"전체인구"})
-    return df.set_index(["시/도","시/군/구","행정동"])
-
-@st.cache_data
-def load_patient_data():
-    creds = st.secrets["gcp_service_account"]
-    client = gspread.service_account_from_dict(creds)
-    ws = client.open_by_key(st.secrets["google_sheets"]["sheet_id"]).worksheet("Sheet1")
-    df = pd.DataFrame(ws.get_all_records())
-
-    df["진료일자"] = pd.to_datetime(df["진료일자"], format="%Y%m%d")
-
-    df = df.sort_values("진료일자").drop_duplicates("환자번호", keep="last")
+    return arrow_store.load_shared(
+        st.secrets, "지역장악도_population",
+        lambda: prepare_population(datasource.load_population(st.secrets))
+    )
 
-    bins = list(range(0,101,10)) + [999]
-    labels = ["9세이하"] + [f"{i}대" for i in range(10,100,10)] + ["100세이상"]
-    df["연령대"] = pd.cut(df["나이"], bins=bins, labels=labels, right=False, include_lowest=True)
+def prepare_patient_data(visits):
+    df = prepare_patients(visits)
+    df[CODE_COL] = build_region_tree(load_population(), df).leaf_codes(df)
+    return df
+
+# 전체 방문 이력은 한 번만 읽어 환자별 마지막 방문 데이터와 방문 간격 색인(휴면 판단용)을 함께 만든다
+# 장악도·지도·거리·휴면 모두 전체 기간 환자가 필요해서 월 파티션 저장소여도 기간만 읽을 수 없다
+# (활성 환자는 이 데이터를 날짜로 잘라 쓰므로 파티션을 따로 더 읽지 않는다)
+@st.cache_resource
+def load_visit_history():
+    visits = datasource.load_visits(st.secrets)
+    history = compact_visits(pd.DataFrame({
+        "진료일자": pd.to_datetime(visits["진료일자"], format="%Y%m%d"),
+        "환자번호": visits["환자번호"],
+        "초/재진": visits["초/재진"],
+    }))
+    gaps = VisitGaps.build(history), history["환자번호"].cat.categories
+    # 지역코드는 인구 시트로 만든 트리 번호라 파일 이름에 인구 데이터 지문을 붙인다
+    # (인구 파일이 ttl 로 따로 다시 만들어져도 이 페이지의 트리와 코드가 어긋나지 않게)
+    name = f"지역장악도_patients_{arrow_store.fingerprint(load_population())}"
+    df = arrow_store.load_shared(st.secrets, name, lambda: prepare_patient_data(visits))
     acc = len(df[df["행정동"]!=""]) / len(df)
+    return (df, acc), gaps
 
-    df["시/도"] = df["시/도"].map(province_map).fillna(df["시/도"])
-
-    df["행정기관"] = np.where(
-        df["시/도"]=="세종특별자치시",
-        df["시/도"]+" "+df["행정동"],
-        df["시/도"]+" "+df["시/군/구"]+" "+df["행정동"]
-    )
-    return df, acc
+def load_patient_data():
+    return load_visit_history()[0]
+
+# 전체 방문 이력의 방문 간격 색인과 환자 ID 목록 (데이터가 바뀔 때만 다시 계산)
+def load_visit_gaps():
+    return load_visit_history()[1]
+
+# 트리는 이름순으로 번호를 매기므로 같은 인구·환자 데이터면 환자 데이터에 붙인 지역코드와 번호가 같다
+@st.cache_resource
+def load_region_tree():
+    df, _ = load_patient_data()
+    tree = build_region_tree(load_population(), df)
+    tree.attach("환자수", df[CODE_COL].values)
+    return tree
+
+# 행정동 경계 (확대 수준별 단순화) + 경계별 지역코드. [geo] 설정이 없으면 (None, None)
+@st.cache_resource
+def load_dong_shapes():
+    shapes = geo.load_shapes(st.secrets)
+    if shapes is None:
+        return None, None
+    return shapes, load_region_tree().leaf_codes(shapes.keys)
+
+# 행정동별 환자 가중 중심·병원까지 거리·장악도 (데이터가 바뀔 때만 다시 계산)
+# 병원 위치는 [clinic] 설정, 없으면 환자 좌표의 중앙값
+@st.cache_resource
+def load_catchment():
+    df, _ = load_patient_data()
+    clinic = clinic_location(st.secrets)
+    if clinic is None:
+        clinic = {"name": "환자 위치 중앙", "lat": float(np.nanmedian(df["y"])), "lon": float(np.nanmedian(df["x"]))}
+    return clinic, catchment_table(load_region_tree(), df[CODE_COL].values, df["y"], df["x"], clinic)
+
+# 지역코드 × 연령대 인구 (숫자 변환·melt 는 여기서 한 번만)
+@st.cache_resource
+def load_population_table():
+    return PopulationTable.build(load_population(), load_region_tree())
+
+# 배치 사전 계산(precompute.py) 실행 하나 (LATEST 가 바뀌면 새 실행을 연다)
+@st.cache_resource
+def load_artifact_run(root, run):
+    return artifacts.ArtifactRun.open(root, run)
 
 pop_df = load_population()
 patient_df, acc = load_patient_data()
+tree = load_region_tree()
+population = load_population_table()
+shapes, shape_codes = load_dong_shapes()
+engine = get_engine(st.secrets)
+
+with st.sidebar.expander("메모리 사용량", False):
+    st.dataframe(memory_report({"환자": patient_df, "인구": pop_df, "연령별 인구": population.long}), hide_index=True)
 
 # 사이드바 필터
 with st.sidebar.expander("활성 환자 기간", True):
     months = st.slider("최근 몇 개월 활성", 1,24,12)
     cutoff = datetime.now() - timedelta(days=30*months)
+    cutoff_day = pd.Timestamp(cutoff).ceil("D")
     st.write(f"{cutoff.date()} 이후")
 
 with st.sidebar.expander("지역 선택", True):
-    provinces = ["전체"] + pop_df.index.get_level_values(0).unique().tolist()
+    # 인구 시트에 있는 지역만 선택지로
+    provinces = ["전체"] + tree.children(having="인구행")
     province = st.selectbox("시/도", provinces, index=0)
     if province=="전체":
         cities=["전체"]
     else:
-        cities = ["전체"] + pop_df.loc[province].index.get_level_values(0).unique().tolist()
+        cities = ["전체"] + tree.children(province, having="인구행")
     city = st.selectbox("시/군/구", cities)
     if province=="전체" or city=="전체":
         dongs=["전체"]
     else:
-        dongs = ["전체"] + pop_df.loc[(province,city)].index.get_level_values(0).unique().tolist()
+        dongs = ["전체"] + tree.children(province, city, having="인구행")
     dong = st.selectbox("행정동", dongs)
 
-# 활성 환자 데이터
-active = patient_df[patient_df["진료일자"]>=cutoff].copy()
-
-# --- pop_sel 슬라이스 & 컬럼 보강 ---
-if dong!="전체":
-    # single-row => DataFrame
-    pop_sel = pop_df.loc[[(province,city,dong)]].reset_index()
-elif city!="전체":
-    pop_sel = pop_df.loc[(province,city)].reset_index()
-elif province!="전체":
-    pop_sel = pop_df.loc[province].reset_index()
-else:
-    pop_sel = pop_df.reset_index()
-
-# ensure id_vars exist
-pop_sel["시/도"]    = province if province!="전체" else pop_sel.get("시/도","")
-pop_sel["시/군/구"] = city if city!="전체" else pop_sel.get("시/군/구","")
-pop_sel["행정동"]   = dong if dong!="전체" else pop_sel.get("행정동","")
-pop_sel["전체인구"] = pop_sel["전체인구"].fillna(0)
-
-# 환자수 집계
-mask_act = build_mask(active, province, city, dong)
-grouped_pat = (
-    active[mask_act]
-    .groupby("연령대")["환자번호"]
-    .nunique()
-    .reset_index(name="환자수")
-)
-
-# melt → merge → calc
-age_cols = [c for c in pop_sel.columns if c in grouped_pat["연령대"].tolist()]
-pop_melt = pop_sel.melt(
-    id_vars=["시/도","시/군/구","행정동","전체인구"],
-    value_vars=age_cols,
-    var_name="연령대", value_name="인구수"
-)
-
-pop_melt["인구수"] = (
-    pop_melt["인구수"].astype(str).str.replace(",","")
-      .pipe(pd.to_numeric, errors="coerce")
+with st.sidebar.expander("연령 구간", False):
+    band_name = st.selectbox("구간", list(BANDINGS) + [CUSTOM])
+    banding = BANDINGS.get(band_name, BANDINGS["10세 단위"])
+    if band_name == CUSTOM:
+        edges = st.text_input("구간 시작 나이 (쉼표 구분)", "0, 7, 13, 19, 30, 65")
+        try:
+            banding = parse_edges(edges)
+        except ValueError as e:
+            st.error(str(e))
+
+# 활성 환자 데이터 (환자별 마지막 방문이 cutoff 이후)
+active = slice_dates(patient_df, cutoff_day, patient_df["진료일자"].max())
+
+# 선택 지역 KPI 와 1세 단위 인구·활성 환자 히스토그램
+# (기본 보기처럼 배치로 미리 계산한 프리셋과 조건·데이터가 같으면 그 결과를 그대로 쓴다)
+where = tree.where(province, city, dong)
+stamp = metrics.data_stamp(patient_df["진료일자"].min(), patient_df["진료일자"].max(), len(patient_df))
+precomputed = artifacts.lookup(
+    st.secrets, "지역장악도", metrics.penetration_params(cutoff_day, province, city, dong), stamp, load_artifact_run
 )
+if precomputed is not None:
+    kpi, by_age = precomputed.scalars, precomputed.table("나이별")
+else:
+    kpi, tables = metrics.penetration(engine, tree, population, patient_df, active, province, city, dong)
+    by_age = tables["나이별"]
 
-grouped_pop = pop_melt.groupby('연령대')['인구수'].sum().reset_index(name='인구수')
+# 1세 단위 인구 (시트의 10세 구간을 고르게 나눈 값)·환자수 → 선택한 연령 구간으로 합산
+grouped_pop = banding.frame(by_age["인구수"].values, "인구수")
+grouped_pat = banding.frame(by_age["환자수"].values, "환자수")
 
-merge_sel = (
-    pd.merge(grouped_pop, grouped_pat, on="연령대", how="left")
-      .fillna({"환자수":0})
-)
+merge_sel = pd.merge(grouped_pop, grouped_pat, on="연령대")
 merge_sel["장악도(%)"] = (
     merge_sel["환자수"]/merge_sel["인구수"]*100
 )
 
+# 데이터 내보내기 (버튼을 누를 때 조각 단위로 임시 파일에 써서 내려준다)
+# 이 페이지의 행은 환자별 마지막 방문이고, 지역 표는 선택 지역 행정동별 인구·환자수·장악도다
+with st.sidebar.expander("데이터 내보내기", False):
+    export_rows = Filter(patient_df).where(*where)
+    export_lo, export_hi = tree.code_range(province, city, dong)
+    export_catchment = load_catchment()[1]
+    export_builders = {
+        "환자": lambda: export.row_chunks(export_rows),
+        "일별 집계": lambda: export.period_counts(export_rows, "D"),
+        "월별 집계": lambda: export.period_counts(export_rows, "M"),
+        "지역별 집계": lambda: export_catchment[
+            (export_catchment[CODE_COL] >= export_lo) & (export_catchment[CODE_COL] < export_hi)
+        ].drop(columns=[CODE_COL]),
+    }
+    export_tables = st.multiselect("내보낼 표", list(export_builders), default=list(export_builders)[:1])
+    export_fmt = st.radio("파일 형식", list(export.FORMATS), horizontal=True)
+    if export_tables:
+        st.download_button(
+            "내려받기",
+            data=export.deferred(export_fmt, lambda: {name: export_builders[name]() for name in export_tables}),
+            file_name=export.file_name(f"지역장악도_{province}_{city}_{dong}", export_fmt, len(export_tables)),
+            mime=export.mime(export_fmt, len(export_tables)),
+        )
+
 # KPI 카드
-total_pop       = int(pop_sel["전체인구"].sum())
-total_patients  = patient_df[build_mask(patient_df,province,city,dong)]["환자번호"].nunique()
-active_patients = active[mask_act]["환자번호"].nunique()
+total_pop       = kpi["인구수"]
+total_patients  = kpi["환자수"]
+active_patients = kpi["활성 환자수"]
 region_pen      = total_patients/total_pop*100 if total_pop else 0
 period_pen      = active_patients/total_pop*100 if total_pop else 0
 
@@ -204,7 +229,7 @@ c3.metric("정확도",f"{acc*100:.0f}%")
 st.markdown("---")
 
 # 차트
-custom_order = ["9세이하"]+[f"{i}대" for i in range(10,100,10)]+["100세이상"]
+custom_order = banding.labels
 title = (
     f"{province} {city} {dong} 연령대 장악도" if dong!="전체" else
     f"{province} {city} 연령대 장악도" if city!="전체" else
@@ -295,9 +320,228 @@ label_count = (
 final = bar + label_rate + label_count
 st.altair_chart(final, use_container_width=True)
 
-df_t = merge_sel.set_index('연령대').T[custom_order].copy()
-df_t.loc['인구수']     = df_t.loc['인구수'].astype(int).map("{:,}".format)
-df_t.loc['환자수']     = df_t.loc['환자수'].astype(int).map("{:,}".format)
-df_t.loc['장악도(%)']  = df_t.loc['장악도(%)'].map(lambda x: f"{x:.1f}%")
-df_t = df_t.astype(str)
+# 표시용 문자열을 연령대 단위로 만든 뒤 전치 (복사본 수정 없음)
+table = merge_sel.set_index('연령대').loc[custom_order]
+df_t = pd.DataFrame({
+    '인구수':    table['인구수'].astype(int).map("{:,}".format),
+    '환자수':    table['환자수'].astype(int).map("{:,}".format),
+    '장악도(%)': table['장악도(%)'].map(lambda x: f"{x:.1f}%"),
+}).T
 st.dataframe(df_t)
+
+# 행정동별 장악도 지도
+if shapes is not None:
+    st.markdown("---")
+    st.subheader("행정동별 장악도 지도")
+    basis = st.radio("환자 기준", ["전체 환자", "활성 환자"], horizontal=True)
+
+    # 잎(행정동) 코드별 환자 수: 환자 데이터는 환자당 한 행이다
+    if basis == "전체 환자":
+        dong_patients = tree.nodes["환자수"].values
+    else:
+        codes = active[CODE_COL].values
+        dong_patients = np.bincount(codes[codes >= 0], minlength=len(tree))
+    dong_pop = tree.nodes["인구"].values
+
+    # 행정동을 고르면 같은 시/군/구를 함께 보여 주고 고른 동만 굵게 표시한다
+    lo, hi = tree.code_range(province, city)
+    in_area = (shape_codes >= lo) & (shape_codes < hi)
+    features = np.flatnonzero(in_area)
+    zoom = 7 if province == "전체" else 9 if city == "전체" else 11
+
+    codes = shape_codes[features]
+    pop = dong_pop[codes]
+    pat = dong_patients[codes]
+    props = pd.DataFrame({
+        "행정기관": (shapes.keys["시/도"] + " " + shapes.keys["시/군/구"] + " " + shapes.keys["행정동"]).values[features],
+        "인구수": pop.astype(int),
+        "환자수": pat.astype(int),
+        "장악도(%)": np.round(np.divide(pat * 100, pop, out=np.full(len(pop), np.nan), where=pop > 0), 2),
+        "선택": (tree.nodes["행정동"].values[codes] == dong) if dong != "전체" else np.zeros(len(codes), dtype=bool),
+    })
+    # 인구가 없는 동은 장악도를 비워 둔다 (지도에서 회색)
+    props["장악도(%)"] = props["장악도(%)"].astype(object).where(props["장악도(%)"].notna(), None)
+
+    if not len(features):
+        st.info("선택한 지역의 행정동 경계가 없습니다.")
+    else:
+        rates = props["장악도(%)"].dropna()
+        vmax = float(rates.quantile(0.95)) if len(rates) and rates.max() > 0 else 1.0
+        colormap = LinearColormap(["#f7fbff", "#6baed6", "#08306b"], vmin=0, vmax=vmax, caption="장악도(%)")
+
+        def style(feature):
+            rate = feature["properties"]["장악도(%)"]
+            return {
+                "fillColor": "#d9d9d9" if rate is None else colormap(min(rate, vmax)),
+                "color": "#e6550d" if feature["properties"]["선택"] else "#636363",
+                "weight": 3 if feature["properties"]["선택"] else 0.5,
+                "fillOpacity": 0.75,
+            }
+
+        collection = shapes.feature_collection(features, zoom, props)
+        m = folium.Map(tiles="cartodbpositron")
+        folium.GeoJson(
+            collection,
+            style_function=style,
+            tooltip=folium.GeoJsonTooltip(fields=["행정기관", "인구수", "환자수", "장악도(%)"]),
+        ).add_to(m)
+        colormap.add_to(m)
+        m.fit_bounds(shapes.bounds(features, zoom))
+        folium_static(m, width=900, height=600)
+
+# 거리별 장악도 (행정동 중심과 병원 사이 거리에 따른 감쇠)
+st.markdown("---")
+st.subheader("거리별 장악도")
+clinic, catchment = load_catchment()
+lo, hi = tree.code_range(province, city)
+area = catchment[(catchment[CODE_COL] >= lo) & (catchment[CODE_COL] < hi)]
+if clinic_location(st.secrets) is None:
+    st.caption("[clinic] 설정이 없어 환자 위치의 중앙값을 기준점으로 씁니다.")
+
+if len(area) < 2:
+    st.info("거리별 장악도를 그릴 행정동이 부족합니다.")
+else:
+    fits = {name: fit_decay(area["거리(km)"], area["장악도(%)"], model, area["인구"]) for name, model in DECAY_MODELS.items()}
+    fits = {name: fit for name, fit in fits.items() if fit is not None}
+
+    k1, k2, k3 = st.columns(3)
+    k1.metric("행정동 수", f"{len(area):,}개")
+    if "지수" in fits and fits["지수"]["b"] > 0:
+        k2.metric("장악도 반감 거리", f"{np.log(2) / fits['지수']['b']:.1f}km")
+    if fits:
+        best = max(fits, key=lambda name: fits[name]["r2"])
+        k3.metric("설명력 높은 모형", f"{best} (R²={fits[best]['r2']:.2f})")
+
+    area = area.assign(행정기관=area["시/도"] + " " + area["시/군/구"] + " " + area["행정동"])
+    points = alt.Chart(area).mark_circle(opacity=0.7).encode(
+        x=alt.X("거리(km):Q", title=f"{clinic['name']}까지 거리 (km)"),
+        y=alt.Y("장악도(%):Q", title="장악도(%)"),
+        size=alt.Size("인구:Q", title="인구", legend=None),
+        color=alt.Color("시/군/구:N", title="시/군/구"),
+        tooltip=[
+            "행정기관",
+            alt.Tooltip("거리(km):Q", format=".2f"),
+            alt.Tooltip("인구:Q", format=","),
+            alt.Tooltip("환자수:Q", format=","),
+            alt.Tooltip("장악도(%):Q", format=".2f"),
+        ],
+    )
+    layers = [points]
+    if fits:
+        grid = np.linspace(max(area["거리(km)"].min(), 0.1), area["거리(km)"].max(), 60)
+        curves = pd.concat([
+            pd.DataFrame({"거리(km)": grid, "장악도(%)": decay_curve(fit, grid), "모형": f"{name} (R²={fit['r2']:.2f})"})
+            for name, fit in fits.items()
+        ])
+        layers.append(
+            alt.Chart(curves).mark_line(strokeDash=[4, 3]).encode(
+                x="거리(km):Q", y="장악도(%):Q", strokeDash=alt.StrokeDash("모형:N", title="감쇠 모형")
+            )
+        )
+    st.altair_chart(alt.layer(*layers).properties(height=400).interactive(), use_container_width=True)
+
+    # 거리 구간별 인구 가중 장악도
+    band_names = band_labels()
+    band = distance_band(area["거리(km)"].values)
+    by_band = pd.DataFrame({
+        "거리": band_names,
+        "행정동 수": np.bincount(band, minlength=len(DISTANCE_BANDS)),
+        "인구수": np.bincount(band, weights=area["인구"], minlength=len(DISTANCE_BANDS)).astype(int),
+        "환자수": np.bincount(band, weights=area["환자수"], minlength=len(DISTANCE_BANDS)).astype(int),
+    })
+    by_band["장악도(%)"] = np.where(by_band["인구수"] > 0, by_band["환자수"] / by_band["인구수"].clip(lower=1) * 100, np.nan)
+    st.dataframe(
+        by_band.style.format({"인구수": "{:,}", "환자수": "{:,}", "장악도(%)": "{:.2f}"}),
+        hide_index=True,
+    )
+
+# 휴면 환자: 마지막 방문 후 경과일이 본인 평소 방문 간격(중앙값)의 몇 배를 넘은 환자
+# 환자 데이터(환자별 마지막 방문 행)에 간격 색인의 환자별 값을 붙여 마스크만 만든다
+st.markdown("---")
+st.subheader("휴면 환자 (재방문 안내 대상)")
+gaps, gap_ids = load_visit_gaps()
+as_of = patient_df["진료일자"].max()
+st.caption(f"기준일 {as_of:%Y-%m-%d} (데이터 마지막 진료일). 선택한 지역과 연령 구간에만 적용됩니다.")
+
+d1, d2, d3 = st.columns(3)
+factor = d1.slider("평소 방문 간격의 몇 배 초과", 1.0, 5.0, 1.5, 0.5)
+min_since = d2.slider("최소 경과일", 0, 365, 60, 15)
+include_single = d3.checkbox("1회 방문 환자 포함", value=False, help="방문일이 하나인 환자는 전체 방문 간격 중앙값을 평소 간격으로 씁니다.")
+dormant_bands = st.multiselect("휴면 환자 연령 구간", banding.labels, default=banding.labels)
+
+all_gaps = gaps.gaps()
+fallback = float(np.median(all_gaps)) if include_single and len(all_gaps) else None
+since, usual, flag = gaps.dormancy(as_of, factor, fallback)
+
+gap_code = patient_codes(patient_df, gap_ids)
+known = gap_code >= 0
+is_dormant = np.zeros(len(patient_df), dtype=bool)
+is_dormant[known] = flag[gap_code[known]] & (since[gap_code[known]] >= min_since)
+band_of = banding.index(patient_df["나이"].values)
+in_band = np.isin(band_of, [banding.labels.index(b) for b in dormant_bands])
+
+scope = Filter(patient_df).where(*where).where(in_band)
+dormant = scope.where(is_dormant)
+dormant_rows = dormant.positions
+
+e1, e2, e3 = st.columns(3)
+e1.metric("휴면 환자수", f"{len(dormant):,}명")
+e2.metric("대상 환자 중 비중", f"{len(dormant) / len(scope):.1%}" if len(scope) else "-")
+e3.metric("평균 경과일", f"{since[gap_code[dormant_rows]].mean():.0f}일" if len(dormant_rows) else "-")
+
+if not len(dormant_rows):
+    st.info("조건에 맞는 휴면 환자가 없습니다.")
+else:
+    band_names = np.asarray(banding.labels + ["미상"], dtype=object)
+    by_band = pd.DataFrame({
+        "연령대": banding.labels,
+        "휴면 환자수": np.bincount(band_of[dormant_rows][band_of[dormant_rows] >= 0], minlength=len(banding.labels)),
+        "대상 환자수": np.bincount(band_of[scope.positions][band_of[scope.positions] >= 0], minlength=len(banding.labels)),
+    })
+    by_band["휴면 비중"] = np.where(by_band["대상 환자수"] > 0, by_band["휴면 환자수"] / by_band["대상 환자수"].clip(lower=1), 0.0)
+    dormant_chart = alt.Chart(by_band).mark_bar(color="#9e9ac8").encode(
+        x=alt.X("연령대:O", sort=banding.labels, axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("휴면 환자수:Q"),
+        tooltip=["연령대", alt.Tooltip("휴면 환자수:Q", format=","), alt.Tooltip("대상 환자수:Q", format=","),
+                 alt.Tooltip("휴면 비중:Q", format=".1%")]
+    ).properties(height=300)
+    st.altair_chart(dormant_chart, use_container_width=True)
+
+    # 위치 목록 → 내보낼 표 (조각 단위로 만들어 전체를 한 번에 들고 있지 않는다)
+    def recall_frame(pos):
+        rows = patient_df.iloc[pos]
+        code = gap_code[pos]
+        return pd.DataFrame({
+            "환자번호": rows["환자번호"].astype(str).values,
+            "성별": rows["성별"].values,
+            "나이": rows["나이"].values,
+            "연령대": band_names[band_of[pos]],
+            "시/도": rows["시/도"].values,
+            "시/군/구": rows["시/군/구"].values,
+            "행정동": rows["행정동"].values,
+            "마지막 방문": rows["진료일자"].values.astype("datetime64[D]"),
+            "방문일 수": gaps.n_days[code],
+            "평소 간격(일)": usual[code],
+            "경과일": since[code],
+            "경과 배수": np.round(since[code] / usual[code], 2),
+        })
+
+    # 평소 간격 대비 오래 안 온 순 (미리보기는 앞 200명)
+    overdue = since[gap_code[dormant_rows]] / usual[gap_code[dormant_rows]]
+    dormant_rows = dormant_rows[np.argsort(-overdue, kind="stable")]
+    st.dataframe(
+        recall_frame(dormant_rows[:200]).style.format({"평소 간격(일)": "{:.0f}", "경과 배수": "{:.2f}"}),
+        hide_index=True,
+    )
+
+    def recall_chunks(positions=dormant_rows):
+        for lo in range(0, len(positions), export.CHUNK_ROWS):
+            yield recall_frame(positions[lo:lo + export.CHUNK_ROWS])
+
+    fmt = st.radio("내보내기 형식", list(export.FORMATS), horizontal=True)
+    st.download_button(
+        f"휴면 환자 {len(dormant_rows):,}명 내려받기",
+        data=export.deferred(fmt, lambda: {"휴면 환자": recall_chunks()}),
+        file_name=export.file_name(f"휴면환자_{as_of:%Y%m%d}", fmt),
+        mime=export.mime(fmt),
+    )
@@ -1,9 +1,16 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import gspread
 from datetime import datetime, timedelta
-import numpy as np
+
+from dashboard import arrow_store, artifacts, datasource, export, metrics
+from dashboard.ages import BANDINGS, CUSTOM, LABELS_10Y, age_histogram, parse_edges
+from dashboard.compact import compact_visits, memory_report
+from dashboard.engine import get_engine
+from dashboard.patient_index import DayBitmaps, patient_set, universe
+from dashboard.pipeline import Filter
+from dashboard.population import parse_counts
+from dashboard.regions import prepare_population
 
 def authenticate():
     if "authenticated" not in st.session_state:
@@ -30,37 +37,55 @@ authenticate()
 
 st.title("마케팅 성과 분석")
 
-# 데이터 로드
-@st.cache_data
+# 데이터 전처리
+bins = metrics.AGE_BINS
+labels = LABELS_10Y
+
+def prepare(df):
+    df['진료일자'] = pd.to_datetime(df['진료일자'], format='%Y%m%d')
+    # 나이대 카테고리
+    df['연령대'] = pd.cut(df['나이'], bins=bins, labels=labels, right=False, include_lowest=True)
+    return compact_visits(df)
+
+# 데이터 로드 (프로세스 간 공유 Arrow 파일이 설정되어 있으면 메모리 매핑)
+@st.cache_resource
 def load_data():
-    creds_dict = st.secrets["gcp_service_account"]
-    client = gspread.service_account_from_dict(creds_dict)
-    sheet_id = st.secrets["google_sheets"]["sheet_id"]
-    worksheet_name = st.secrets["google_sheets"]["worksheet_name"]
-    sheet = client.open_by_key(sheet_id).worksheet(worksheet_name)
-    records = sheet.get_all_records()
-    return pd.DataFrame(records)
+    return arrow_store.load_shared(
+        st.secrets, "마케팅성과분석_visits",
+        lambda: prepare(datasource.load_visits(st.secrets))
+    )
 
-@st.cache_data
+@st.cache_resource
 def load_population_data():
-    creds_dict = st.secrets["gcp_service_account"]
-    client = gspread.service_account_from_dict(creds_dict)
-    sheet_id = st.secrets["google_sheets"]["sheet_id"]
-    worksheet_name = "연령별인구현황"
-    sheet = client.open_by_key(sheet_id).worksheet(worksheet_name)
-    records = sheet.get_all_records()
-    return pd.DataFrame(records)
+    return arrow_store.load_shared(
+        st.secrets, "연령별인구현황",
+        lambda: datasource.load_population(st.secrets)
+    )
+
+# 행정동별 인구 합계 (인구 시트 주소 분해·숫자 변환은 데이터가 바뀔 때만 한 번)
+@st.cache_resource
+def load_dong_population():
+    pop = load_population_data()
+    if pop.empty:
+        return pd.DataFrame({'행정동': pd.Series(dtype=object), '전체인구': pd.Series(dtype='int64')})
+    pop = prepare_population(pop)
+    return (
+        pd.DataFrame({'행정동': pop.index.get_level_values('행정동'), '전체인구': parse_counts(pop['전체인구'])})
+        .groupby('행정동')['전체인구'].sum()
+        .reset_index()
+    )
+
+# 배치 사전 계산(precompute.py) 실행 하나 (LATEST 가 바뀌면 새 실행을 연다)
+@st.cache_resource
+def load_artifact_run(root, run):
+    return artifacts.ArtifactRun.open(root, run)
 
 df = load_data()
 pop_df = load_population_data()
+engine = get_engine(st.secrets)
 
-# 데이터 전처리
-df['진료일자'] = pd.to_datetime(df['진료일자'], format='%Y%m%d')
-
-# 나이대 카테고리
-bins = list(range(0, 101, 10)) + [999]
-labels = ["9세이하"] + [f"{i}대" for i in range(10, 100, 10)] + ["100세이상"]
-df['연령대'] = pd.cut(df['나이'], bins=bins, labels=labels, right=False, include_lowest=True)
+with st.sidebar.expander("메모리 사용량", False):
+    st.dataframe(memory_report({"방문": df, "인구": pop_df}), hide_index=True)
 
 # 사이드바 - 캠페인 설정
 st.sidebar.header("🎯 캠페인 설정")
@@ -91,15 +116,11 @@ comparison_option = st.sidebar.radio(
     ["이전 동일 기간", "전년 동기", "사용자 지정"]
 )
 
-if comparison_option == "이전 동일 기간":
-    before_end = campaign_start - timedelta(days=1)
-    before_start = before_end - timedelta(days=campaign_days-1)
-elif comparison_option == "전년 동기":
-    before_start = campaign_start - timedelta(days=365)
-    before_end = campaign_end - timedelta(days=365)
-else:
+if comparison_option == "사용자 지정":
     before_start = st.sidebar.date_input("비교 시작일")
     before_end = st.sidebar.date_input("비교 종료일")
+else:
+    before_start, before_end = metrics.comparison_period(campaign_start, campaign_end, comparison_option)
 
 # 타겟 지역 선택
 st.sidebar.subheader("타겟 지역")
@@ -107,27 +128,46 @@ all_regions = df['행정동'].dropna().unique().tolist()
 target_regions = st.sidebar.multiselect(
     "타겟 지역 선택",
     options=all_regions,
-    default=['월곶동', '배곧1동', '배곧2동']
+    default=metrics.DEFAULT_TARGETS
 )
 
-# 데이터 필터링
-campaign_data = df[
-    (df['진료일자'] >= pd.to_datetime(campaign_start)) & 
-    (df['진료일자'] <= pd.to_datetime(campaign_end))
-]
+# 데이터 필터링 (행을 복사하지 않고 날짜 마스크만 만든다)
+def period(start, end):
+    return Filter(df).where(('진료일자', 'between', (pd.to_datetime(start), pd.to_datetime(end))))
+
+campaign_data = period(campaign_start, campaign_end)
 
-before_data = df[
-    (df['진료일자'] >= pd.to_datetime(before_start)) & 
-    (df['진료일자'] <= pd.to_datetime(before_end))
-]
+before_data = period(before_start, before_end)
 
 # 캠페인 후 30일 데이터
 after_start = campaign_end + timedelta(days=1)
 after_end = campaign_end + timedelta(days=30)
-after_data = df[
-    (df['진료일자'] >= pd.to_datetime(after_start)) & 
-    (df['진료일자'] <= pd.to_datetime(after_end))
-]
+after_data = period(after_start, after_end)
+
+# 타겟 지역 조건 (선택이 없으면 전체)
+target_cond = [('행정동', 'in', target_regions)] if target_regions else []
+NEW = metrics.NEW
+
+# 기본 보기처럼 배치로 미리 계산한 프리셋과 조건·데이터가 같으면 그 결과를 그대로 쓴다
+stamp = metrics.data_stamp(df['진료일자'].min(), df['진료일자'].max(), len(df))
+precomputed = artifacts.lookup(
+    st.secrets, "마케팅성과분석",
+    metrics.campaign_params(campaign_start, campaign_end, before_start, before_end, target_regions),
+    stamp, load_artifact_run
+)
+
+# 데이터 내보내기 (버튼을 누를 때 조각 단위로 임시 파일에 써서 내려준다)
+with st.sidebar.expander("데이터 내보내기", False):
+    export_builders = export.table_builders(campaign_data)
+    export_tables = st.multiselect("내보낼 표", list(export_builders), default=list(export_builders)[:1])
+    export_fmt = st.radio("파일 형식", list(export.FORMATS), horizontal=True)
+    if export_tables:
+        st.download_button(
+            "내려받기",
+            data=export.deferred(export_fmt, lambda: {name: export_builders[name]() for name in export_tables}),
+            file_name=export.file_name(f"마케팅성과_{campaign_start:%Y%m%d}_{campaign_end:%Y%m%d}", export_fmt, len(export_tables)),
+            mime=export.mime(export_fmt, len(export_tables)),
+        )
 
 # 메인 탭 구성
 tab1, tab2, tab3 = st.tabs([
@@ -154,24 +194,17 @@ with tab1:
     # 핵심 KPI - 캠페인 기간
     st.subheader("캠페인 기간 성과 지표")
     
-    # 타겟 지역 필터링
-    if target_regions:
-        campaign_target = campaign_data[campaign_data['행정동'].isin(target_regions)]
-        before_target = before_data[before_data['행정동'].isin(target_regions)]
-        campaign_non_target = campaign_data[~campaign_data['행정동'].isin(target_regions)]
-        before_non_target = before_data[~before_data['행정동'].isin(target_regions)]
+    # KPI 계산 (타겟 지역 필터링)
+    if precomputed is not None:
+        kpi = precomputed.scalars
     else:
-        campaign_target = campaign_data
-        before_target = before_data
-        campaign_non_target = pd.DataFrame()
-        before_non_target = pd.DataFrame()
+        kpi = metrics.campaign_kpis(campaign_data.where(*target_cond), before_data.where(*target_cond))
     
-    # KPI 계산
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        new_patients_campaign = len(campaign_target[campaign_target['초/재진'] == '신환'])
-        new_patients_before = len(before_target[before_target['초/재진'] == '신환'])
+        new_patients_campaign = kpi["캠페인 신환수"]
+        new_patients_before = kpi["비교 신환수"]
         new_patient_growth = ((new_patients_campaign - new_patients_before) / new_patients_before * 100) if new_patients_before > 0 else 0
         
         st.metric(
@@ -182,8 +215,8 @@ with tab1:
         )
     
     with col2:
-        total_visits_campaign = len(campaign_target)
-        total_visits_before = len(before_target)
+        total_visits_campaign = kpi["캠페인 방문수"]
+        total_visits_before = kpi["비교 방문수"]
         visit_growth = ((total_visits_campaign - total_visits_before) / total_visits_before * 100) if total_visits_before > 0 else 0
         
         st.metric(
@@ -194,8 +227,8 @@ with tab1:
         )
     
     with col3:
-        unique_patients_campaign = campaign_target['환자번호'].nunique()
-        unique_patients_before = before_target['환자번호'].nunique()
+        unique_patients_campaign = kpi["캠페인 환자수"]
+        unique_patients_before = kpi["비교 환자수"]
         patient_growth = ((unique_patients_campaign - unique_patients_before) / unique_patients_before * 100) if unique_patients_before > 0 else 0
         
         st.metric(
@@ -258,13 +291,10 @@ with tab1:
     # 캠페인 전후 60일 데이터
     trend_start = campaign_start - timedelta(days=30)
     trend_end = campaign_end + timedelta(days=30)
-    trend_data = df[(df['진료일자'] >= pd.to_datetime(trend_start)) & (df['진료일자'] <= pd.to_datetime(trend_end))]
-
-    if target_regions:
-        trend_data = trend_data[trend_data['행정동'].isin(target_regions)]
-
-    daily_new = trend_data[trend_data['초/재진'] == '신환'].groupby('진료일자').size().reset_index(name='신환수')
-    daily_new['7일 이동평균'] = daily_new['신환수'].rolling(window=7, min_periods=1).mean()
+    if precomputed is not None:
+        daily_new = precomputed.table('일별 신환')
+    else:
+        daily_new = metrics.daily_new_trend(period(trend_start, trend_end).where(*target_cond, NEW))
     
     base = alt.Chart(daily_new).encode(
         x=alt.X('진료일자:T', title='날짜')
@@ -303,22 +333,10 @@ with tab2:
         st.info("타겟 지역을 선택하면 더 상세한 분석을 볼 수 있습니다.")
     
     # 지역별 성과 계산
-    region_campaign = campaign_data.groupby('행정동').agg({
-        '환자번호': 'nunique',
-        '초/재진': lambda x: (x == '신환').sum()
-    }).rename(columns={'환자번호': '환자수_캠페인', '초/재진': '신환수_캠페인'})
-    
-    region_before = before_data.groupby('행정동').agg({
-        '환자번호': 'nunique',
-        '초/재진': lambda x: (x == '신환').sum()
-    }).rename(columns={'환자번호': '환자수_이전', '초/재진': '신환수_이전'})
-    
-    region_performance = pd.merge(region_campaign, region_before, 
-                                 left_index=True, right_index=True, how='outer').fillna(0)
-    
-    region_performance['신환_증가'] = region_performance['신환수_캠페인'] - region_performance['신환수_이전']
-    region_performance['신환_증가율'] = (region_performance['신환_증가'] / region_performance['신환수_이전'] * 100).replace([np.inf, -np.inf], 0).fillna(0)
-    region_performance['환자_증가율'] = ((region_performance['환자수_캠페인'] - region_performance['환자수_이전']) / region_performance['환자수_이전'] * 100).replace([np.inf, -np.inf], 0).fillna(0)
+    if precomputed is not None:
+        region_performance = precomputed.table('지역별 성과').copy()
+    else:
+        region_performance = metrics.region_performance(engine, df, campaign_start, campaign_end, before_start, before_end)
     
     # 타겟 지역 표시
     region_performance['타겟여부'] = region_performance.index.isin(target_regions)
@@ -365,28 +383,8 @@ with tab2:
     if not pop_df.empty:
         st.subheader("🎯 지역별 시장 침투율 변화")
         
-        # 인구 데이터 전처리 (지역장악도 페이지와 동일한 방식)
-        def split_address(addr: str):
-            parts = addr.split()
-            special_cities = {"수원시","성남시","안양시","부천시","안산시","고양시","용인시","청주시","천안시","전주시","포항시","창원시"}
-            if parts[0]=="세종특별자치시" and len(parts)==2:
-                return pd.Series({"시/도":parts[0],"시/군/구":"","행정동":parts[1]})
-            elif len(parts)==4 and parts[1] in special_cities:
-                return pd.Series({"시/도":parts[0],"시/군/구":f"{parts[1]} {parts[2]}","행정동":parts[3]})
-            elif len(parts)==3 and parts[1] not in special_cities:
-                return pd.Series({"시/도":parts[0],"시/군/구":parts[1],"행정동":parts[2]})
-            else:
-                return pd.Series({"시/도":None,"시/군/구":None,"행정동":None})
-        
-        split_df = pop_df["행정기관"].apply(split_address)
-        pop_processed = pd.concat([pop_df, split_df], axis=1).dropna(subset=["시/도"])
-        
-        # 총 인구수 컬럼명 확인
-        if "총 인구수" in pop_processed.columns:
-            pop_processed = pop_processed.rename(columns={"총 인구수":"전체인구"})
-        
-        # 행정동별 인구 합계
-        pop_summary = pop_processed.groupby('행정동')['전체인구'].sum().reset_index()
+        # 행정동별 인구 합계 (적재 시 한 번 계산해 둔 값)
+        pop_summary = load_dong_population()
         
         penetration_data = region_performance.reset_index()
         penetration_data = pd.merge(penetration_data, pop_summary, on='행정동', how='left')
@@ -421,34 +419,34 @@ with tab3:
         st.header("👥 신환 분석 (전체 지역)")
     
     # 신환 상세 분석 - 타겟 지역 필터 적용
-    if target_regions:
-        new_patients_campaign = campaign_data[
-            (campaign_data['초/재진'] == '신환') & 
-            (campaign_data['행정동'].isin(target_regions))
-        ]
-        new_patients_before = before_data[
-            (before_data['초/재진'] == '신환') & 
-            (before_data['행정동'].isin(target_regions))
-        ]
-    else:
-        new_patients_campaign = campaign_data[campaign_data['초/재진'] == '신환']
-        new_patients_before = before_data[before_data['초/재진'] == '신환']
+    new_patients_campaign = campaign_data.where(*target_cond, NEW).frame(['환자번호', '나이', '연령대', '성별'])
+    new_patients_before = before_data.where(*target_cond, NEW).frame(['나이', '연령대', '성별'])
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("연령대별 신환 분포")
         
-        age_campaign = new_patients_campaign.groupby('연령대', observed=True).size().reset_index(name='캠페인')
-        age_before = new_patients_before.groupby('연령대', observed=True).size().reset_index(name='이전')
-        
-        age_comparison = pd.merge(age_campaign, age_before, on='연령대', how='outer')
-        age_comparison['캠페인'] = age_comparison['캠페인'].fillna(0)
-        age_comparison['이전'] = age_comparison['이전'].fillna(0)
+        band_name = st.selectbox("연령 구간", list(BANDINGS) + [CUSTOM])
+        banding = BANDINGS.get(band_name, BANDINGS["10세 단위"])
+        if band_name == CUSTOM:
+            edges = st.text_input("구간 시작 나이 (쉼표 구분)", "0, 7, 13, 19, 30, 65")
+            try:
+                banding = parse_edges(edges)
+            except ValueError as e:
+                st.error(str(e))
+        
+        # 1세 단위 신환 히스토그램을 선택한 구간으로 합산
+        age_comparison = pd.merge(
+            banding.frame(age_histogram(new_patients_campaign['나이']), '캠페인'),
+            banding.frame(age_histogram(new_patients_before['나이']), '이전'),
+            on='연령대'
+        )
+        age_comparison = age_comparison[(age_comparison['캠페인'] > 0) | (age_comparison['이전'] > 0)]
         age_comparison = age_comparison.melt(id_vars='연령대', var_name='기간', value_name='신환수')
         
         chart = alt.Chart(age_comparison).mark_bar().encode(
-            x=alt.X('연령대:N', title='연령대', sort=labels),
+            x=alt.X('연령대:N', title='연령대', sort=banding.labels),
             y=alt.Y('신환수:Q', title='신환 수'),
             color=alt.Color('기간:N', scale=alt.Scale(scheme='category10')),
             xOffset='기간:N',
@@ -460,8 +458,8 @@ with tab3:
     with col2:
         st.subheader("성별 신환 분포")
         
-        gender_campaign = new_patients_campaign.groupby('성별').size().reset_index(name='캠페인')
-        gender_before = new_patients_before.groupby('성별').size().reset_index(name='이전')
+        gender_campaign = new_patients_campaign.groupby('성별', observed=True).size().reset_index(name='캠페인')
+        gender_before = new_patients_before.groupby('성별', observed=True).size().reset_index(name='이전')
         
         gender_comparison = pd.merge(gender_campaign, gender_before, on='성별', how='outer')
         gender_comparison['캠페인'] = gender_comparison['캠페인'].fillna(0)
@@ -481,21 +479,20 @@ with tab3:
     # 신환 재방문 분석
     st.subheader("📊 신환 재방문 분석")
     
-    # 캠페인 기간 신환의 환자번호 추출
-    new_patient_ids = new_patients_campaign['환자번호'].unique()
+    # 캠페인 기간 신환 집합 (환자 비트맵)
+    patients = universe(df)
+    new_patient_ids = patient_set(campaign_data.where(*target_cond, NEW), patients)
     
     # 이후 30일간 재방문 확인
     if len(after_data) > 0:
-        # 타겟 지역 필터 적용
-        if target_regions:
-            revisits = after_data[
-                (after_data['환자번호'].isin(new_patient_ids)) & 
-                (after_data['행정동'].isin(target_regions))
-            ]
-        else:
-            revisits = after_data[after_data['환자번호'].isin(new_patient_ids)]
+        # 타겟 지역 방문의 일별 비트맵 → 구간 OR 후 신환 집합과 AND
+        after_days = DayBitmaps.build(after_data.where(*target_cond), patients)
+        returned = (new_patient_ids & after_days.window(after_start, after_end)).codes()
         
-        revisit_count = revisits.groupby('환자번호').size().reset_index(name='재방문횟수')
+        revisit_count = pd.DataFrame({
+            '환자번호': patients[returned],
+            '재방문횟수': after_days.visits[returned],
+        })
         
         col1, col2, col3 = st.columns(3)
         
@@ -509,18 +506,7 @@ with tab3:
         
         with col3:
             # 타겟 지역 필터 적용한 7일 내 재방문율
-            if target_regions:
-                retention_7d_data = after_data[
-                    (after_data['환자번호'].isin(new_patient_ids)) & 
-                    (after_data['진료일자'] <= pd.to_datetime(campaign_end + timedelta(days=7))) &
-                    (after_data['행정동'].isin(target_regions))
-                ]
-            else:
-                retention_7d_data = after_data[
-                    (after_data['환자번호'].isin(new_patient_ids)) & 
-                    (after_data['진료일자'] <= pd.to_datetime(campaign_end + timedelta(days=7)))
-                ]
-            retention_7d = len(retention_7d_data['환자번호'].unique())
+            retention_7d = len(new_patient_ids & after_days.window(after_start, campaign_end + timedelta(days=7)))
             retention_7d_rate = retention_7d / len(new_patient_ids) * 100 if len(new_patient_ids) > 0 else 0
             st.metric("7일 내 재방문율", f"{retention_7d_rate:.1f}%")
         
@@ -1,10 +1,27 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import gspread
 from datetime import datetime, timedelta
 import numpy as np
 
+from dashboard import arrow_store, artifacts, datasource, export, metrics
+from dashboard.attribution import (
+    RULES, attribute, campaign_ranges, interval_join, load_registry, normalize_registry,
+    overlap_matrix, registry_path, save_registry, summarize,
+)
+from dashboard.ages import BANDINGS, CUSTOM, LABELS_10Y, age_histogram, parse_edges
+from dashboard.compact import compact_visits, memory_report, nunique_patients
+from dashboard.engine import get_engine
+from dashboard.ltv import MAX_MONTHS, CohortCurves, assumed_ltv
+from dashboard.patient_index import DayBitmaps, patient_set, universe
+from dashboard.partition import slice_dates
+from dashboard.pipeline import Filter
+from dashboard.population import attach_population
+from dashboard.roi import AXES, METRICS, ScenarioGrid, default_axes
+from dashboard.regions import CODE_COL, LEVELS, RegionTree, prepare_population, province_map
+from dashboard.synth import synthetic_control
+from dashboard.uplift import N_BOOT, did_test, filter_matrix, region_uplift
+
 def authenticate():
     if "authenticated" not in st.session_state:
         st.session_state.authenticated = False
@@ -30,53 +47,116 @@ authenticate()
 
 st.title("마케팅 성과 분석")
 
-# 지역 매핑 정의
-province_map = {
-    '서울': '서울특별시', '인천': '인천광역시', '경기': '경기도', '광주': '광주광역시',
-    '부산': '부산광역시', '대구': '대구광역시', '대전': '대전광역시', '울산': '울산광역시',
-    '경남': '경상남도', '경북': '경상북도', '전남': '전라남도', '충북': '충청북도', '충남': '충청남도'
-}
+# 데이터 전처리
+bins = metrics.AGE_BINS
+labels = LABELS_10Y
 
-special_cities = {
-    "수원시","성남시","안양시","부천시","안산시",
-    "고양시","용인시","청주시","천안시",
-    "전주시","포항시","창원시"
-}
+def prepare(df):
+    df['진료일자'] = pd.to_datetime(df['진료일자'], format='%Y%m%d')
+    # 나이대 카테고리
+    df['연령대'] = pd.cut(df['나이'], bins=bins, labels=labels, right=False, include_lowest=True)
+    # 시/도 매핑 적용
+    df['시/도'] = df['시/도'].map(province_map).fillna(df['시/도'])
+    df = df.sort_values('진료일자', kind='stable', ignore_index=True)
+    return compact_visits(df)
 
-# 데이터 로드
-@st.cache_data
+# 데이터 로드 (프로세스 간 공유 Arrow 파일이 설정되어 있으면 메모리 매핑)
+# 방문 지역 + 인구 시트 지역으로 만든 트리 (노드별 인구)
+def build_region_tree(data, pop):
+    if pop.empty:
+        return RegionTree.build(data)
+    pop = prepare_population(pop)
+    tree = RegionTree.build(data, pop.index.to_frame(index=False))
+    attach_population(tree, pop)
+    return tree
+
+def prepare_visits():
+    data = prepare(datasource.load_visits(st.secrets))
+    data[CODE_COL] = build_region_tree(data, load_population_data()).leaf_codes(data)
+    return data
+
+# 지역코드는 인구 시트로 만든 트리 번호라 파일 이름에 인구 데이터 지문을 붙인다
+# (인구 파일이 ttl 로 따로 다시 만들어져도 load_region_tree() 의 트리와 코드가 어긋나지 않게)
+@st.cache_resource
 def load_data():
-    creds_dict = st.secrets["gcp_service_account"]
-    client = gspread.service_account_from_dict(creds_dict)
-    sheet_id = st.secrets["google_sheets"]["sheet_id"]
-    worksheet_name = st.secrets["google_sheets"]["worksheet_name"]
-    sheet = client.open_by_key(sheet_id).worksheet(worksheet_name)
-    records = sheet.get_all_records()
-    return pd.DataFrame(records)
+    name = f"마케팅성과분석_v2_visits_{arrow_store.fingerprint(load_population_data())}"
+    return arrow_store.load_shared(st.secrets, name, prepare_visits)
 
-@st.cache_data
+@st.cache_resource
 def load_population_data():
-    creds_dict = st.secrets["gcp_service_account"]
-    client = gspread.service_account_from_dict(creds_dict)
-    sheet_id = st.secrets["google_sheets"]["sheet_id"]
-    worksheet_name = "연령별인구현황"
-    sheet = client.open_by_key(sheet_id).worksheet(worksheet_name)
-    records = sheet.get_all_records()
-    return pd.DataFrame(records)
-
-df = load_data()
+    return arrow_store.load_shared(
+        st.secrets, "연령별인구현황",
+        lambda: datasource.load_population(st.secrets)
+    )
+
+# 월 파티션 저장소면 전체 이력을 읽지 않고 기간마다 겹치는 파티션만 읽는다
+partitioned = datasource.is_partitioned(st.secrets)
+
+# 노드별 방문 수, 환자 수(마지막 방문 지역 기준), 인구
+# 트리는 이름순으로 번호를 매기므로 같은 인구 데이터로 prepare_visits() 에서 붙인 지역코드와 번호가 같다
+# 월 파티션 저장소면 인구 시트 지역만으로 만든다 (인구 시트에 없는 지역의 방문은 "전체"에만 들어간다)
+@st.cache_resource
+def load_region_tree():
+    if partitioned:
+        return build_region_tree(pd.DataFrame(columns=list(LEVELS)), load_population_data())
+    data = load_data()
+    tree = build_region_tree(data, load_population_data())
+    codes = data[CODE_COL].values
+    latest = ~data['환자번호'].duplicated(keep='last').values
+    tree.attach('방문수', codes)
+    tree.attach('환자수', codes[latest])
+    return tree
+
+# 신환 코호트 × 경과 월 방문 표 (전체 이력, 데이터가 바뀔 때만 다시 계산)
+@st.cache_resource
+def load_cohort_curves():
+    return CohortCurves.build(load_data())
+
+@st.cache_data
+def load_period(start, end):
+    data = prepare(datasource.load_visits_range(st.secrets, start, end))
+    data[CODE_COL] = load_region_tree().leaf_codes(data)
+    return data
+
+# 월 파티션 저장소: 최근 COHORT_MONTHS 개월만 읽어 그 안에서 시작한 코호트로 만든다
+# (코호트는 신환 방문부터 MAX_MONTHS 개월을 보므로 그보다 1년 더 읽어 다 채운 코호트를 남긴다)
+COHORT_MONTHS = MAX_MONTHS + 12
+
+@st.cache_resource
+def load_period_cohort_curves(start, end):
+    return CohortCurves.build(load_period(start, end))
+
+@st.cache_data
+def load_date_bounds():
+    return datasource.visit_date_bounds(st.secrets)
+
+# 배치 사전 계산(precompute.py) 실행 하나 (LATEST 가 바뀌면 새 실행을 연다)
+@st.cache_resource
+def load_artifact_run(root, run):
+    return artifacts.ArtifactRun.open(root, run)
+
+df = None if partitioned else load_data()
 pop_df = load_population_data()
+tree = load_region_tree()
+engine = get_engine(st.secrets)
 
-# 데이터 전처리
-df['진료일자'] = pd.to_datetime(df['진료일자'], format='%Y%m%d')
+if partitioned:
+    min_date, max_date = load_date_bounds()
+else:
+    min_date, max_date = df['진료일자'].min(), df['진료일자'].max()
+
+# 지역 선택지: 방문이 있는 지역 (월 파티션 저장소면 인구 시트에 있는 지역)
+having = '인구행' if partitioned else '방문수'
 
-# 나이대 카테고리
-bins = list(range(0, 101, 10)) + [999]
-labels = ["9세이하"] + [f"{i}대" for i in range(10, 100, 10)] + ["100세이상"]
-df['연령대'] = pd.cut(df['나이'], bins=bins, labels=labels, right=False, include_lowest=True)
+with st.sidebar.expander("메모리 사용량", False):
+    st.dataframe(memory_report({"인구": pop_df} if partitioned else {"방문": df, "인구": pop_df}), hide_index=True)
 
-# 시/도 매핑 적용
-df['시/도'] = df['시/도'].map(province_map).fillna(df['시/도'])
+# 기간 데이터: 월 파티션 저장소면 겹치는 파티션만 읽고, 아니면 메모리 데이터를 날짜로 잘라 쓴다
+def period(start, end):
+    start, end = pd.to_datetime(start), pd.to_datetime(end)
+    if partitioned:
+        return load_period(start, end)
+    return slice_dates(df, start, end)
 
 # 사이드바 - 캠페인 설정
 st.sidebar.header("🎯 캠페인 설정")
@@ -107,21 +187,20 @@ comparison_option = st.sidebar.radio(
     ["이전 동일 기간", "전년 동기", "사용자 지정"]
 )
 
-if comparison_option == "이전 동일 기간":
-    before_end = campaign_start - timedelta(days=1)
-    before_start = before_end - timedelta(days=campaign_days-1)
-elif comparison_option == "전년 동기":
-    before_start = campaign_start - timedelta(days=365)
-    before_end = campaign_end - timedelta(days=365)
-else:
+if comparison_option == "사용자 지정":
     before_start = st.sidebar.date_input("비교 시작일")
     before_end = st.sidebar.date_input("비교 종료일")
+    if before_start > before_end:
+        st.sidebar.error("비교 종료일은 비교 시작일보다 이후여야 합니다.")
+        st.stop()
+else:
+    before_start, before_end = metrics.comparison_period(campaign_start, campaign_end, comparison_option)
 
 # 타겟 지역 선택 (계층적 필터링)
 st.sidebar.subheader("타겟 지역")
 
 # 시/도 선택
-provinces = ["전체"] + df['시/도'].dropna().unique().tolist()
+provinces = ["전체"] + tree.children(having=having)
 target_province = st.sidebar.selectbox("시/도", provinces, index=0)
 
 # 시/군/구 선택
@@ -129,7 +208,7 @@ if target_province == "전체":
     cities = ["전체"]
     target_city = "전체"
 else:
-    cities = ["전체"] + df[df['시/도'] == target_province]['시/군/구'].dropna().unique().tolist()
+    cities = ["전체"] + tree.children(target_province, having=having)
     target_city = st.sidebar.selectbox("시/군/구", cities, index=0)
 
 # 행정동 선택
@@ -137,8 +216,7 @@ if target_province == "전체" or target_city == "전체":
     dongs = ["전체"]
     target_dong = "전체"
 else:
-    dongs = ["전체"] + df[(df['시/도'] == target_province) & 
-                          (df['시/군/구'] == target_city)]['행정동'].dropna().unique().tolist()
+    dongs = ["전체"] + tree.children(target_province, target_city, having=having)
     target_dong = st.sidebar.selectbox("행정동", dongs, index=0)
 
 # 마케팅 비용 입력 (선택사항)
@@ -151,45 +229,84 @@ marketing_cost = st.sidebar.number_input(
     help="ROI 계산을 위한 마케팅 비용을 입력하세요"
 )
 
-# 지역 필터 적용을 위한 마스크 생성
-def create_location_mask(data, province, city, dong):
-    mask = pd.Series(True, index=data.index)
-    if province != "전체":
-        mask &= data['시/도'] == province
-    if city != "전체":
-        mask &= data['시/군/구'] == city
-    if dong != "전체":
-        mask &= data['행정동'] == dong
-    return mask
+# 타겟 지역 마스크 (지역코드 정수 구간 비교)
+def in_target(data):
+    return tree.mask(data[CODE_COL].values, target_province, target_city, target_dong)
 
-# 타겟 지역 마스크
-target_mask = create_location_mask(df, target_province, target_city, target_dong)
+NEW = metrics.NEW
+
+# 기본 보기처럼 배치로 미리 계산한 프리셋과 조건·데이터가 같으면 그 결과를 그대로 쓴다
+stamp = metrics.data_stamp(min_date, max_date, None if partitioned else len(df))
+precomputed = artifacts.lookup(
+    st.secrets, "마케팅성과분석_v2",
+    metrics.campaign_params(campaign_start, campaign_end, before_start, before_end,
+                            (target_province, target_city, target_dong)),
+    stamp, load_artifact_run
+)
+
+# 기간 데이터를 타겟/비타겟 Filter 로 나눈다 (행은 복사하지 않음)
+def split_target(data):
+    hit = in_target(data)
+    return Filter(data).where(hit), Filter(data).where(~hit)
+
+# 행정동 × 일 신환 행렬 (전체 이력, 합성 대조군 학습용)
+@st.cache_resource
+def load_daily_new_matrix():
+    data = load_data()
+    first_day, last_day = data['진료일자'].min(), data['진료일자'].max()
+    return first_day, filter_matrix(Filter(data).where(NEW), len(tree), first_day, last_day, CODE_COL)
+
+# 월 파티션 저장소면 [start, end] 만 읽어 만든다: (첫날, 행렬)
+def daily_new_matrix(start, end):
+    if not partitioned:
+        return load_daily_new_matrix()
+    start = max(pd.Timestamp(start), pd.Timestamp(min_date))
+    data = period(start, end)
+    return start, filter_matrix(Filter(data).where(NEW), len(tree), start, pd.Timestamp(end), CODE_COL)
+
+def cohort_curves():
+    if partitioned:
+        return load_period_cohort_curves(pd.Timestamp(max_date) - pd.DateOffset(months=COHORT_MONTHS), pd.Timestamp(max_date))
+    return load_cohort_curves()
 
 # 데이터 필터링
-campaign_data = df[
-    (df['진료일자'] >= pd.to_datetime(campaign_start)) & 
-    (df['진료일자'] <= pd.to_datetime(campaign_end))
-]
+campaign_data = period(campaign_start, campaign_end)
 
-before_data = df[
-    (df['진료일자'] >= pd.to_datetime(before_start)) & 
-    (df['진료일자'] <= pd.to_datetime(before_end))
-]
+before_data = period(before_start, before_end)
 
 # 캠페인 후 30일 데이터
 after_start = campaign_end + timedelta(days=1)
 after_end = campaign_end + timedelta(days=30)
-after_data = df[
-    (df['진료일자'] >= pd.to_datetime(after_start)) & 
-    (df['진료일자'] <= pd.to_datetime(after_end))
-]
+after_data = period(after_start, after_end)
+
+# 신환 지역 × 일 행렬 (이전 / 캠페인 기간) → 이중차분 추정
+pre_matrix = filter_matrix(Filter(before_data).where(NEW), len(tree), before_start, before_end, CODE_COL)
+post_matrix = filter_matrix(Filter(campaign_data).where(NEW), len(tree), campaign_start, campaign_end, CODE_COL)
+target_codes = tree.mask(np.arange(len(tree)), target_province, target_city, target_dong)
+
+# 환자 비트맵의 공통 환자 목록 (메모리 데이터에서 잘라 쓰면 category 목록을 그대로 공유)
+patients = universe(campaign_data, before_data, after_data)
+
+# 데이터 내보내기 (버튼을 누를 때 조각 단위로 임시 파일에 써서 내려준다)
+with st.sidebar.expander("데이터 내보내기", False):
+    export_builders = export.table_builders(Filter(campaign_data))
+    export_tables = st.multiselect("내보낼 표", list(export_builders), default=list(export_builders)[:1])
+    export_fmt = st.radio("파일 형식", list(export.FORMATS), horizontal=True)
+    if export_tables:
+        st.download_button(
+            "내려받기",
+            data=export.deferred(export_fmt, lambda: {name: export_builders[name]() for name in export_tables}),
+            file_name=export.file_name(f"마케팅성과_v2_{campaign_start:%Y%m%d}_{campaign_end:%Y%m%d}", export_fmt, len(export_tables)),
+            mime=export.mime(export_fmt, len(export_tables)),
+        )
 
 # 메인 탭 구성
-tab1, tab2, tab3, tab4 = st.tabs([
+tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "📊 Overview", 
     "🗺️ 지역별 성과", 
     "👥 신환 분석", 
-    "💰 ROI 분석"
+    "💰 ROI 분석",
+    "🧩 캠페인 기여"
 ])
 
 with tab1:
@@ -215,23 +332,21 @@ with tab1:
     st.subheader("핵심 성과 지표")
     
     # 타겟 지역 필터링
-    if target_province != "전체":
-        campaign_target = campaign_data[target_mask[campaign_data.index]]
-        before_target = before_data[target_mask[before_data.index]]
-        campaign_non_target = campaign_data[~target_mask[campaign_data.index]]
-        before_non_target = before_data[~target_mask[before_data.index]]
-    else:
-        campaign_target = campaign_data
-        before_target = before_data
-        campaign_non_target = pd.DataFrame()
-        before_non_target = pd.DataFrame()
+    # 타겟이 "전체"면 비타겟은 빈 Filter
+    campaign_target, campaign_non_target = split_target(campaign_data)
+    before_target, before_non_target = split_target(before_data)
     
     # KPI 계산
+    if precomputed is not None:
+        kpi = precomputed.scalars
+    else:
+        kpi = metrics.campaign_kpis(campaign_target, before_target)
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        new_patients_campaign = len(campaign_target[campaign_target['초/재진'] == '신환'])
-        new_patients_before = len(before_target[before_target['초/재진'] == '신환'])
+        new_patients_campaign = kpi["캠페인 신환수"]
+        new_patients_before = kpi["비교 신환수"]
         new_patient_growth = ((new_patients_campaign - new_patients_before) / new_patients_before * 100) if new_patients_before > 0 else 0
         
         st.metric(
@@ -242,8 +357,8 @@ with tab1:
         )
     
     with col2:
-        total_visits_campaign = len(campaign_target)
-        total_visits_before = len(before_target)
+        total_visits_campaign = kpi["캠페인 방문수"]
+        total_visits_before = kpi["비교 방문수"]
         visit_growth = ((total_visits_campaign - total_visits_before) / total_visits_before * 100) if total_visits_before > 0 else 0
         
         st.metric(
@@ -254,8 +369,8 @@ with tab1:
         )
     
     with col3:
-        unique_patients_campaign = campaign_target['환자번호'].nunique()
-        unique_patients_before = before_target['환자번호'].nunique()
+        unique_patients_campaign = kpi["캠페인 환자수"]
+        unique_patients_before = kpi["비교 환자수"]
         patient_growth = ((unique_patients_campaign - unique_patients_before) / unique_patients_before * 100) if unique_patients_before > 0 else 0
         
         st.metric(
@@ -280,6 +395,8 @@ with tab1:
     # 타겟 vs 비타겟 지역 비교 (타겟 지역이 선택된 경우)
     if target_province != "전체" and len(campaign_non_target) > 0:
         st.subheader("타겟 vs 비타겟 지역 성과 비교")
+        overlap = patient_set(campaign_target, patients) & patient_set(campaign_non_target, patients)
+        st.caption(f"캠페인 기간 타겟·비타겟 지역을 모두 방문한 환자: {len(overlap):,}명")
         
         col1, col2 = st.columns(2)
         
@@ -288,8 +405,8 @@ with tab1:
             st.write("**🎯 타겟 지역**")
             target_new_growth = ((new_patients_campaign - new_patients_before) / new_patients_before * 100) if new_patients_before > 0 else 0
             
-            non_target_new_campaign = len(campaign_non_target[campaign_non_target['초/재진'] == '신환'])
-            non_target_new_before = len(before_non_target[before_non_target['초/재진'] == '신환'])
+            non_target_new_campaign = campaign_non_target.count(NEW)
+            non_target_new_before = before_non_target.count(NEW)
             non_target_new_growth = ((non_target_new_campaign - non_target_new_before) / non_target_new_before * 100) if non_target_new_before > 0 else 0
             
             comparison_df = pd.DataFrame({
@@ -319,6 +436,73 @@ with tab1:
             ).properties(height=300)
             
             st.altair_chart(chart2, use_container_width=True)
+
+        # 비타겟 지역의 같은 기간 변화를 빼고 남는 타겟 지역 변화 (날짜 부트스트랩 / 지역 순열)
+        st.subheader("타겟 지역 추가 효과 (이중차분)")
+        did = did_test(pre_matrix, post_matrix, target_codes)
+        if not np.isfinite(did['uplift']):
+            st.info("이전 기간 신환이 없어 추가 효과를 추정할 수 없습니다.")
+        else:
+            d1, d2, d3 = st.columns(3)
+            d1.metric("추가 증가율", f"{did['uplift']:+.1%}",
+                      help="타겟 캠페인 기간 신환 / (타겟 이전 신환 × 비타겟 증감 비율) - 1")
+            d2.metric("캠페인 효과 신환", f"{did['excess']:+,.1f}명")
+            d3.metric("p값 (지역 순열)", f"{did['p_value']:.3f}" if np.isfinite(did['p_value']) else "-")
+            low, high = did['uplift_ci']
+            ex_low, ex_high = did['excess_ci']
+            st.caption(
+                f"95% 신뢰구간: 추가 증가율 {low:+.1%} ~ {high:+.1%}, 캠페인 효과 신환 {ex_low:+,.1f} ~ {ex_high:+,.1f}명 "
+                f"(날짜 부트스트랩 {N_BOOT:,}회). p값은 신환이 있는 행정동 {did['n_regions']:,}곳에서 "
+                f"타겟과 같은 수({did['n_target']:,}곳)를 무작위로 고른 가짜 타겟과 비교한 값입니다."
+            )
+
+        # 캠페인 전 학습 기간에 타겟 일별 신환을 비타겟 행정동들의 비음수 가중합으로 맞춘 뒤
+        # 캠페인 기간의 (실제 - 합성) 을 효과로 본다. 계절성·추세를 기여 지역이 함께 겪는다고 가정한다.
+        st.subheader("합성 대조군 비교")
+        fit_len = st.slider("학습 기간 (캠페인 전 일수)", 28, 365, 90, step=7)
+        first_day, daily_matrix = daily_new_matrix(pd.Timestamp(campaign_start) - pd.Timedelta(days=fit_len), campaign_end)
+        c0 = (pd.Timestamp(campaign_start) - first_day).days
+        c1 = min((pd.Timestamp(campaign_end) - first_day).days + 1, daily_matrix.shape[1])
+        f0 = max(c0 - fit_len, 0)
+        sc = None
+        if c0 - f0 >= 14 and c1 > c0:
+            sc = synthetic_control(daily_matrix[:, f0:c1], target_codes, slice(0, c0 - f0), slice(c0 - f0, c1 - f0))
+        if sc is None:
+            st.info("학습 기간 또는 캠페인 기간의 신환 데이터가 부족합니다.")
+        else:
+            s1, s2, s3, s4 = st.columns(4)
+            s1.metric("캠페인 기간 실제 신환", f"{sc['actual'][c0 - f0:].sum():,.0f}명")
+            s2.metric("합성 대조 예상", f"{sc['expected']:,.1f}명")
+            s3.metric("추정 효과", f"{sc['effect']:+,.1f}명",
+                      f"{sc['effect'] / sc['expected']:+.1%}" if sc['expected'] > 0 else None)
+            s4.metric("p값 (기여 지역 가짜 타겟)", f"{sc['p_value']:.3f}" if np.isfinite(sc['p_value']) else "-")
+
+            days = pd.date_range(first_day + pd.Timedelta(days=f0), periods=c1 - f0, freq='D')
+            sc_df = pd.DataFrame({'진료일자': days, '실제': sc['actual'], '합성 대조': sc['synthetic']})
+            sc_df = sc_df.melt(id_vars='진료일자', var_name='구분', value_name='신환수')
+            sc_df['7일 평균'] = sc_df.groupby('구분')['신환수'].transform(lambda v: v.rolling(7, min_periods=1).mean())
+            sc_line = alt.Chart(sc_df).mark_line().encode(
+                x=alt.X('진료일자:T', title='날짜'),
+                y=alt.Y('7일 평균:Q', title='신환 수 (7일 평균)'),
+                color=alt.Color('구분:N', scale=alt.Scale(domain=['실제', '합성 대조'], range=['#0072C3', '#FF8C42'])),
+                tooltip=['진료일자:T', '구분', alt.Tooltip('신환수:Q', format='.1f'), alt.Tooltip('7일 평균:Q', format='.1f')]
+            )
+            sc_rect = alt.Chart(pd.DataFrame({'start': [campaign_start], 'end': [campaign_end]})).mark_rect(
+                opacity=0.2, color='green'
+            ).encode(x='start:T', x2='end:T')
+            st.altair_chart((sc_rect + sc_line).properties(height=350).interactive(), use_container_width=True)
+
+            top = np.argsort(-sc['weights'])[:5]
+            top = top[sc['weights'][top] > 0]
+            donor_names = ", ".join(
+                f"{tree.nodes['시/군/구'].values[sc['donors'][i]]} {tree.nodes['name'].values[sc['donors'][i]]}({sc['weights'][i]:.2f})"
+                for i in top
+            )
+            st.caption(
+                f"학습 기간 RMSPE {sc['pre_rmspe']:.2f}명/일, 캠페인 기간 RMSPE {sc['post_rmspe']:.2f}명/일. "
+                f"p값은 기여 지역 {sc['n_placebo']:,}곳을 각각 가짜 타겟으로 둔 합성 대조의 RMSPE 비율 순위입니다. "
+                f"주요 기여 지역: {donor_names or '-'}"
+            )
     
     # 일별 트렌드
     st.subheader("일별 신환 트렌드")
@@ -326,13 +510,11 @@ with tab1:
     # 캠페인 전후 60일 데이터
     trend_start = campaign_start - timedelta(days=30)
     trend_end = campaign_end + timedelta(days=30)
-    trend_data = df[(df['진료일자'] >= pd.to_datetime(trend_start)) & (df['진료일자'] <= pd.to_datetime(trend_end))]
-
-    if target_province != "전체":
-        trend_data = trend_data[target_mask[trend_data.index]]
-
-    daily_new = trend_data[trend_data['초/재진'] == '신환'].groupby('진료일자').size().reset_index(name='신환수')
-    daily_new['7일 이동평균'] = daily_new['신환수'].rolling(window=7, min_periods=1).mean()
+    if precomputed is not None:
+        daily_new = precomputed.table('일별 신환')
+    else:
+        trend_data = period(trend_start, trend_end)
+        daily_new = metrics.daily_new_trend(Filter(trend_data).where(in_target(trend_data), NEW))
     
     base = alt.Chart(daily_new).encode(
         x=alt.X('진료일자:T', title='날짜')
@@ -370,28 +552,20 @@ with tab2:
     if target_province == "전체":
         st.info("타겟 지역을 선택하면 더 상세한 분석을 볼 수 있습니다.")
     
-    # 지역별 성과 계산
-    region_campaign = campaign_data.groupby('행정동').agg({
-        '환자번호': 'nunique',
-        '초/재진': lambda x: (x == '신환').sum()
-    }).rename(columns={'환자번호': '환자수_캠페인', '초/재진': '신환수_캠페인'})
-    
-    region_before = before_data.groupby('행정동').agg({
-        '환자번호': 'nunique',
-        '초/재진': lambda x: (x == '신환').sum()
-    }).rename(columns={'환자번호': '환자수_이전', '초/재진': '신환수_이전'})
-    
-    region_performance = pd.merge(region_campaign, region_before, 
-                                 left_index=True, right_index=True, how='outer').fillna(0)
-    
-    region_performance['신환_증가'] = region_performance['신환수_캠페인'] - region_performance['신환수_이전']
-    region_performance['신환_증가율'] = (region_performance['신환_증가'] / region_performance['신환수_이전'] * 100).replace([np.inf, -np.inf], 0).fillna(0)
-    region_performance['환자_증가율'] = ((region_performance['환자수_캠페인'] - region_performance['환자수_이전']) / region_performance['환자수_이전'] * 100).replace([np.inf, -np.inf], 0).fillna(0)
+    # 지역별 성과 계산 (월 파티션 저장소면 이전·캠페인 기간을 함께 덮는 구간만 읽는다)
+    if partitioned:
+        span = [pd.Timestamp(d) for d in (before_start, before_end, campaign_start, campaign_end)]
+        performance_data = period(min(span), max(span))
+    else:
+        performance_data = df
+    region_performance = metrics.region_performance(
+        engine, performance_data, campaign_start, campaign_end, before_start, before_end
+    )
     
     # 타겟 지역 표시
     if target_province != "전체":
         # 타겟 지역에 해당하는 행정동 목록 생성
-        target_regions_list = df[target_mask]['행정동'].dropna().unique().tolist()
+        target_regions_list = tree.dongs(target_province, target_city, target_dong)
         region_performance['타겟여부'] = region_performance.index.isin(target_regions_list)
     else:
         region_performance['타겟여부'] = False
@@ -433,32 +607,48 @@ with tab2:
         
         st.altair_chart(chart2, use_container_width=True)
     
+    # 행정동별 추가 신환: 그 동을 뺀 나머지 지역의 증감 비율로 기대치를 잡고 남는 신환 수
+    st.subheader("📐 행정동별 추가 신환 (이중차분, 95% 신뢰구간)")
+    active_dongs = np.flatnonzero((pre_matrix.sum(axis=1) + post_matrix.sum(axis=1)) > 0)
+    if len(active_dongs) < 2:
+        st.info("비교할 행정동이 부족합니다.")
+    else:
+        dong_uplift = region_uplift(pre_matrix[active_dongs], post_matrix[active_dongs])
+        dong_table = pd.DataFrame({
+            '행정동': tree.nodes['name'].values[active_dongs],
+            '시/군/구': tree.nodes['시/군/구'].values[active_dongs],
+            '신환수_이전': dong_uplift['pre'],
+            '신환수_캠페인': dong_uplift['post'],
+            '추가 신환': dong_uplift['excess'],
+            '하한': dong_uplift['low'],
+            '상한': dong_uplift['high'],
+            '타겟여부': target_codes[active_dongs] if target_province != "전체" else False,
+        })
+        dong_table['유의'] = (dong_table['하한'] > 0) | (dong_table['상한'] < 0)
+        top_uplift = dong_table.nlargest(15, '추가 신환')
+
+        base = alt.Chart(top_uplift).encode(y=alt.Y('행정동:N', sort=alt.SortField('추가 신환', order='descending'), title=''))
+        whisker = base.mark_rule().encode(x=alt.X('하한:Q', title='추가 신환 (명)'), x2='상한:Q')
+        point = base.mark_point(filled=True, size=80).encode(
+            x='추가 신환:Q',
+            color=alt.Color('타겟여부:N',
+                          scale=alt.Scale(domain=[True, False], range=['#FF6B6B', '#4ECDC4']),
+                          legend=alt.Legend(title='타겟 지역')),
+            tooltip=['시/군/구', '행정동', '신환수_이전', '신환수_캠페인',
+                     alt.Tooltip('추가 신환:Q', format='+.1f'),
+                     alt.Tooltip('하한:Q', format='+.1f'), alt.Tooltip('상한:Q', format='+.1f')]
+        )
+        st.altair_chart((whisker + point).properties(height=400), use_container_width=True)
+        st.caption(f"신뢰구간이 0 을 포함하지 않는 행정동: {int(dong_table['유의'].sum()):,}곳 / {len(dong_table):,}곳")
+
     # 지역별 침투율 변화 (인구 데이터가 있는 경우)
     if not pop_df.empty:
         st.subheader("🎯 지역별 시장 침투율 변화")
         
-        # 인구 데이터 전처리 (지역장악도 페이지와 동일한 방식)
-        def split_address(addr: str):
-            parts = addr.split()
-            special_cities = {"수원시","성남시","안양시","부천시","안산시","고양시","용인시","청주시","천안시","전주시","포항시","창원시"}
-            if parts[0]=="세종특별자치시" and len(parts)==2:
-                return pd.Series({"시/도":parts[0],"시/군/구":"","행정동":parts[1]})
-            elif len(parts)==4 and parts[1] in special_cities:
-                return pd.Series({"시/도":parts[0],"시/군/구":f"{parts[1]} {parts[2]}","행정동":parts[3]})
-            elif len(parts)==3 and parts[1] not in special_cities:
-                return pd.Series({"시/도":parts[0],"시/군/구":parts[1],"행정동":parts[2]})
-            else:
-                return pd.Series({"시/도":None,"시/군/구":None,"행정동":None})
-        
-        split_df = pop_df["행정기관"].apply(split_address)
-        pop_processed = pd.concat([pop_df, split_df], axis=1).dropna(subset=["시/도"])
-        
-        # 총 인구수 컬럼명 확인
-        if "총 인구수" in pop_processed.columns:
-            pop_processed = pop_processed.rename(columns={"총 인구수":"전체인구"})
-        
-        # 행정동별 인구 합계
-        pop_summary = pop_processed.groupby('행정동')['전체인구'].sum().reset_index()
+        # 행정동별 인구 합계 (적재 시 트리에 붙여 둔 인구, 인구 시트에 있는 행정동만)
+        nodes = tree.nodes
+        leaves = nodes[(nodes['level'] == 2) & (nodes['인구행'] > 0)]
+        pop_summary = leaves.groupby('행정동')['인구'].sum().reset_index(name='전체인구')
         
         penetration_data = region_performance.reset_index()
         penetration_data = pd.merge(penetration_data, pop_summary, on='행정동', how='left')
@@ -488,34 +678,37 @@ with tab3:
     st.header("👥 신환 분석")
     
     # 타겟 지역 필터 적용
-    if target_province != "전체":
-        campaign_data_filtered = campaign_data[target_mask[campaign_data.index]]
-        before_data_filtered = before_data[target_mask[before_data.index]]
-        after_data_filtered = after_data[target_mask[after_data.index]] if len(after_data) > 0 else after_data
-    else:
-        campaign_data_filtered = campaign_data
-        before_data_filtered = before_data
-        after_data_filtered = after_data
-    
-    # 신환 상세 분석
-    new_patients_campaign = campaign_data_filtered[campaign_data_filtered['초/재진'] == '신환']
-    new_patients_before = before_data_filtered[before_data_filtered['초/재진'] == '신환']
+    after_target, _ = split_target(after_data)
+
+    # 신환 상세 분석 (필요한 컬럼만 꺼낸다)
+    new_patients_campaign = split_target(campaign_data)[0].where(NEW).frame(['환자번호', '나이', '연령대', '성별'])
+    new_patients_before = split_target(before_data)[0].where(NEW).frame(['나이', '연령대', '성별'])
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("연령대별 신환 분포")
         
-        age_campaign = new_patients_campaign.groupby('연령대', observed=True).size().reset_index(name='캠페인')
-        age_before = new_patients_before.groupby('연령대', observed=True).size().reset_index(name='이전')
-        
-        age_comparison = pd.merge(age_campaign, age_before, on='연령대', how='outer')
-        age_comparison['캠페인'] = age_comparison['캠페인'].fillna(0)
-        age_comparison['이전'] = age_comparison['이전'].fillna(0)
+        band_name = st.selectbox("연령 구간", list(BANDINGS) + [CUSTOM])
+        banding = BANDINGS.get(band_name, BANDINGS["10세 단위"])
+        if band_name == CUSTOM:
+            edges = st.text_input("구간 시작 나이 (쉼표 구분)", "0, 7, 13, 19, 30, 65")
+            try:
+                banding = parse_edges(edges)
+            except ValueError as e:
+                st.error(str(e))
+        
+        # 1세 단위 신환 히스토그램을 선택한 구간으로 합산
+        age_comparison = pd.merge(
+            banding.frame(age_histogram(new_patients_campaign['나이']), '캠페인'),
+            banding.frame(age_histogram(new_patients_before['나이']), '이전'),
+            on='연령대'
+        )
+        age_comparison = age_comparison[(age_comparison['캠페인'] > 0) | (age_comparison['이전'] > 0)]
         age_comparison = age_comparison.melt(id_vars='연령대', var_name='기간', value_name='신환수')
         
         chart = alt.Chart(age_comparison).mark_bar().encode(
-            x=alt.X('연령대:N', title='연령대', sort=labels),
+            x=alt.X('연령대:N', title='연령대', sort=banding.labels),
             y=alt.Y('신환수:Q', title='신환 수'),
             color=alt.Color('기간:N', scale=alt.Scale(scheme='category10')),
             xOffset='기간:N',
@@ -527,8 +720,8 @@ with tab3:
     with col2:
         st.subheader("성별 신환 분포")
         
-        gender_campaign = new_patients_campaign.groupby('성별').size().reset_index(name='캠페인')
-        gender_before = new_patients_before.groupby('성별').size().reset_index(name='이전')
+        gender_campaign = new_patients_campaign.groupby('성별', observed=True).size().reset_index(name='캠페인')
+        gender_before = new_patients_before.groupby('성별', observed=True).size().reset_index(name='이전')
         
         gender_comparison = pd.merge(gender_campaign, gender_before, on='성별', how='outer')
         gender_comparison['캠페인'] = gender_comparison['캠페인'].fillna(0)
@@ -548,14 +741,19 @@ with tab3:
     # 신환 재방문 분석
     st.subheader("📊 신환 재방문 분석")
     
-    # 캠페인 기간 신환의 환자번호 추출
-    new_patient_ids = new_patients_campaign['환자번호'].unique()
+    # 캠페인 기간 신환 집합 (환자 비트맵)
+    new_patient_ids = patient_set(split_target(campaign_data)[0].where(NEW), patients)
     
     # 이후 30일간 재방문 확인
-    if len(after_data_filtered) > 0:
-        revisits = after_data_filtered[after_data_filtered['환자번호'].isin(new_patient_ids)]
+    if len(after_target) > 0:
+        # 타겟 지역 방문의 일별 비트맵 → 구간 OR 후 신환 집합과 AND
+        after_days = DayBitmaps.build(after_target, patients)
+        returned = (new_patient_ids & after_days.window(after_start, after_end)).codes()
         
-        revisit_count = revisits.groupby('환자번호').size().reset_index(name='재방문횟수')
+        revisit_count = pd.DataFrame({
+            '환자번호': patients[returned],
+            '재방문횟수': after_days.visits[returned],
+        })
         
         col1, col2 = st.columns(2)
         
@@ -592,14 +790,17 @@ with tab4:
         st.subheader("투자 수익률 (ROI)")
         
         # 신환 관련 메트릭
-        new_patients = len(campaign_data[campaign_data['초/재진'] == '신환'])
+        campaign_new = Filter(campaign_data).where(NEW)
+        new_patients = len(campaign_new)
         cac = marketing_cost / new_patients if new_patients > 0 else 0
         
         # 신환의 평균 재방문 횟수 계산 (향후 30일)
-        new_patient_ids = campaign_data[campaign_data['초/재진'] == '신환']['환자번호'].unique()
+        new_patient_ids = patient_set(campaign_new, patients)
         
         if len(after_data) > 0:
-            revisits_per_patient = after_data[after_data['환자번호'].isin(new_patient_ids)].groupby('환자번호').size().mean()
+            after_days = DayBitmaps.build(after_data, patients)
+            returned = (new_patient_ids & after_days.window(after_start, after_end)).codes()
+            revisits_per_patient = pd.Series(after_days.visits[returned]).mean()
         else:
             revisits_per_patient = 1
         
@@ -687,21 +888,38 @@ with tab4:
         # 예측 시뮬레이션
         st.subheader("🔮 수익 예측 시뮬레이션")
         
+        # 기본은 과거 신환 코호트의 실제 경과 월별 방문으로 추정하고, 가정 입력도 고를 수 있다
+        curves = cohort_curves()
+        ltv_basis = st.radio("LTV 산출 방식", ["과거 신환 코호트 실측", "가정 입력"], horizontal=True)
+        if curves.horizon == 0:
+            ltv_basis = "가정 입력"
+        max_months = 12 if ltv_basis == "가정 입력" else curves.horizon
+        
         # 시뮬레이션 파라미터
         col1, col2 = st.columns(2)
         
         with col1:
-            ltv_months = st.slider("LTV 계산 기간 (개월)", 1, 12, 6)
-            monthly_retention = st.slider("월 평균 재방문율 (%)", 0, 100, 70)
+            # 관측된 경과 월이 1개월뿐이면 최소·최대가 같아 슬라이더를 만들 수 없으므로 1개월로 고정한다
+            if max_months > 1:
+                ltv_months = st.slider("LTV 계산 기간 (개월)", 1, max_months, min(6, max_months))
+            else:
+                ltv_months = 1
+                st.caption("과거 코호트 관측 기간이 1개월뿐이라 LTV 계산 기간은 1개월로 고정됩니다.")
+            if ltv_basis == "가정 입력":
+                monthly_retention = st.slider("월 평균 재방문율 (%)", 0, 100, 70)
         
         with col2:
-            monthly_visits = st.slider("재방문시 월평균 방문 횟수", 1, 10, 2)
+            if ltv_basis == "가정 입력":
+                monthly_visits = st.slider("재방문시 월평균 방문 횟수", 1, 10, 2)
             
         # LTV 계산
-        projected_ltv = 0
-        for month in range(ltv_months):
-            retention = (monthly_retention / 100) ** month
-            projected_ltv += retention * monthly_visits * avg_revenue_per_visit
+        ltv_band = None
+        if ltv_basis == "가정 입력":
+            projected_ltv = float(assumed_ltv(ltv_months, monthly_retention / 100, monthly_visits, avg_revenue_per_visit))
+        else:
+            estimate = curves.ltv(ltv_months, avg_revenue_per_visit)
+            projected_ltv = float(estimate['ltv'][-1])
+            ltv_band = (float(estimate['low'][-1]), float(estimate['high'][-1]))
         
         projected_total_revenue = new_patients * projected_ltv
         projected_roi = ((projected_total_revenue - marketing_cost) / marketing_cost * 100) if marketing_cost > 0 else 0
@@ -728,15 +946,89 @@ with tab4:
                 delta_color="normal" if projected_roi > roi else "inverse"
             )
         
+        if ltv_band is not None:
+            low, high = ltv_band
+            st.caption(
+                f"과거 신환 {int(curves.size.sum()):,}명({len(curves.cohorts)}개 월 코호트)의 첫 방문 후 30일 단위 방문 수로 추정. "
+                f"95% 신뢰구간 LTV {low:,.0f} ~ {high:,.0f}원, "
+                f"총 수익 {new_patients * low:,.0f} ~ {new_patients * high:,.0f}원 (코호트 부트스트랩)."
+            )
+            curve_df = pd.DataFrame({
+                '경과 월': np.arange(1, ltv_months + 1),
+                '누적 LTV': estimate['ltv'],
+                '하한': estimate['low'],
+                '상한': estimate['high'],
+                '재방문율': estimate['retention'],
+            })
+            col1, col2 = st.columns(2)
+            with col1:
+                band = alt.Chart(curve_df).mark_area(opacity=0.25, color='#0072C3').encode(
+                    x=alt.X('경과 월:O', title='첫 방문 후 경과 월', axis=alt.Axis(labelAngle=0)),
+                    y=alt.Y('하한:Q', title='환자당 누적 매출 (원)'),
+                    y2='상한:Q'
+                )
+                line = alt.Chart(curve_df).mark_line(point=True, color='#0072C3').encode(
+                    x='경과 월:O', y='누적 LTV:Q',
+                    tooltip=['경과 월', alt.Tooltip('누적 LTV:Q', format=',.0f'),
+                             alt.Tooltip('하한:Q', format=',.0f'), alt.Tooltip('상한:Q', format=',.0f')]
+                )
+                st.altair_chart((band + line).properties(height=300, title='누적 LTV'), use_container_width=True)
+            with col2:
+                retention_chart = alt.Chart(curve_df[curve_df['경과 월'] > 1]).mark_line(point=True, color='#FF8C42').encode(
+                    x=alt.X('경과 월:O', title='첫 방문 후 경과 월', axis=alt.Axis(labelAngle=0)),
+                    y=alt.Y('재방문율:Q', title='그 달 방문 환자 비율', axis=alt.Axis(format='%')),
+                    tooltip=['경과 월', alt.Tooltip('재방문율:Q', format='.1%')]
+                )
+                st.altair_chart(retention_chart.properties(height=300, title='경과 월별 재방문율'), use_container_width=True)
+        
+        # 가정 입력 모형의 모든 조합(기간 × 재방문율 × 방문 횟수 × 매출)을 한 번에 계산해 두 축씩 본다
+        with st.expander("📐 시나리오 그리드 (가정 입력 모형)", expanded=False):
+            base = {
+                "LTV 기간(개월)": ltv_months,
+                "월 재방문율(%)": monthly_retention if ltv_basis == "가정 입력" else 70,
+                "월 방문 횟수": monthly_visits if ltv_basis == "가정 입력" else 2,
+                "방문당 매출(원)": avg_revenue_per_visit,
+            }
+            grid = ScenarioGrid.build(default_axes(avg_revenue_per_visit), new_patients, marketing_cost)
+            
+            g1, g2, g3 = st.columns(3)
+            grid_metric = g1.selectbox("지표", METRICS)
+            x_axis = g2.selectbox("가로축", list(AXES), index=1)
+            y_axis = g3.selectbox("세로축", [name for name in AXES if name != x_axis])
+            
+            heat = grid.slice(grid_metric, x_axis, y_axis, base)
+            fmt = ',.0f' if grid_metric != "ROI(%)" else '.0f'
+            scheme = alt.Scale(scheme='redyellowgreen', reverse=grid_metric == "손익분기 신환수")
+            heat_base = alt.Chart(heat).encode(
+                x=alt.X(f'{x_axis}:O', title=x_axis, axis=alt.Axis(labelAngle=0)),
+                y=alt.Y(f'{y_axis}:O', title=y_axis, sort='descending'),
+            )
+            heat_rect = heat_base.mark_rect().encode(
+                color=alt.Color(f'{grid_metric}:Q', scale=scheme, title=grid_metric),
+                tooltip=[x_axis, y_axis, alt.Tooltip(f'{grid_metric}:Q', format=fmt)]
+            )
+            heat_text = heat_base.mark_text(fontSize=10).encode(text=alt.Text(f'{grid_metric}:Q', format=fmt))
+            st.altair_chart((heat_rect + heat_text).properties(height=420), use_container_width=True)
+            
+            fixed = [f"{name} {AXES[name].format(base[name])}" for name in AXES if name not in (x_axis, y_axis)]
+            st.caption(f"고정값: {', '.join(fixed)} · 신환 {new_patients:,}명 · 마케팅 비용 {marketing_cost:,.0f}원")
+            
+            st.write("**변수별 민감도** (한 변수만 최솟값/최댓값으로 바꿨을 때)")
+            sensitivity = grid.sensitivity(grid_metric, base)
+            st.dataframe(
+                sensitivity.style.format({'최솟값일 때': '{:,.1f}', '기준': '{:,.1f}', '최댓값일 때': '{:,.1f}', '변동 폭': '{:,.1f}'}),
+                hide_index=True
+            )
+        
     else:
         st.info("💡 마케팅 비용을 입력하면 ROI 분석을 볼 수 있습니다.")
         
         # 비용 없이도 볼 수 있는 기본 메트릭
         st.subheader("기본 성과 지표")
         
-        new_patients = len(campaign_data[campaign_data['초/재진'] == '신환'])
+        new_patients = Filter(campaign_data).count(NEW)
         total_visits = len(campaign_data)
-        unique_patients = campaign_data['환자번호'].nunique()
+        unique_patients = nunique_patients(campaign_data)
         
         col1, col2, col3 = st.columns(3)
         
@@ -749,3 +1041,98 @@ with tab4:
         with col3:
             avg_visits = total_visits / unique_patients if unique_patients > 0 else 0
             st.metric("환자당 평균 방문", f"{avg_visits:.1f}회")
+
+with tab5:
+    st.header("🧩 캠페인 기여 분석")
+    st.caption("기간·지역이 겹치는 캠페인들에 각 신환을 규칙에 따라 나눠 줍니다. 방문마다 기여도의 합은 1 입니다.")
+    
+    # 캠페인 목록 (로컬 파일, 없으면 사이드바 캠페인 하나로 시작)
+    reg_path = registry_path(st.secrets)
+    registry = load_registry(reg_path)
+    if registry.empty:
+        registry = normalize_registry(pd.DataFrame([{
+            "캠페인": "현재 캠페인", "시작일": campaign_start, "종료일": campaign_end,
+            "시/도": target_province, "시/군/구": target_city, "행정동": target_dong, "비용": marketing_cost,
+        }]))
+        st.caption(f"`{reg_path}` 에 등록된 캠페인이 없어 사이드바 캠페인으로 시작합니다.")
+    
+    edited = st.data_editor(
+        registry,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "시작일": st.column_config.DateColumn("시작일", format="YYYY-MM-DD"),
+            "종료일": st.column_config.DateColumn("종료일", format="YYYY-MM-DD"),
+            "비용": st.column_config.NumberColumn("비용", min_value=0, step=100000, format="%d"),
+        },
+    )
+    if st.button("캠페인 목록 저장"):
+        save_registry(edited, reg_path)
+        st.success(f"{reg_path} 에 저장했습니다.")
+    registry = normalize_registry(edited)
+    # 방문 데이터와 같은 시/도 표기 (경기 → 경기도)
+    registry['시/도'] = registry['시/도'].map(province_map).fillna(registry['시/도'])
+    
+    col1, col2, col3 = st.columns(3)
+    rule_name = col1.radio("기여 규칙", list(RULES))
+    lookback = col2.slider("전환 인정 기간 (종료 후 일수)", 0, 90, 30)
+    half_life = col3.slider("시간 감쇠 반감기 (일)", 1, 60, 14, disabled=RULES[rule_name] != "decay")
+    
+    if registry.empty:
+        st.info("캠페인을 한 개 이상 등록하세요.")
+    else:
+        # 등록된 캠페인 전체 구간의 신환 방문 → (방문, 캠페인) 구간 조인 한 번
+        starts = registry['시작일'].values
+        ends = registry['종료일'].values
+        windows_end = (registry['종료일'] + pd.Timedelta(days=lookback)).values
+        span = period(registry['시작일'].min(), registry['종료일'].max() + pd.Timedelta(days=lookback))
+        new_rows = Filter(span).where(NEW)
+        new_dates = new_rows.column('진료일자').values
+        new_codes = new_rows.column(CODE_COL).values
+        
+        lo, hi, n_dongs = campaign_ranges(registry, tree)
+        rows, camp = interval_join(new_dates, new_codes, starts, windows_end, lo, hi)
+        credit = attribute(rows, camp, RULES[rule_name], new_dates, starts, ends, n_dongs, half_life)
+        summary = summarize(registry, rows, camp, credit)
+        touched, touches = np.unique(rows, return_counts=True)
+        
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("기간 내 신환", f"{len(new_dates):,}명")
+        m2.metric("캠페인 기여 신환", f"{len(touched):,}명")
+        m3.metric("기여 없는 신환", f"{len(new_dates) - len(touched):,}명")
+        m4.metric("여러 캠페인에 겹친 신환", f"{int((touches > 1).sum()):,}명")
+        
+        attr_chart = alt.Chart(summary).mark_bar().encode(
+            x=alt.X('기여 신환:Q', title=f'기여 신환 ({rule_name})'),
+            y=alt.Y('캠페인:N', sort='-x', title=''),
+            color=alt.value('#0072C3'),
+            tooltip=['캠페인', alt.Tooltip('기여 신환:Q', format='.1f'), '대상 신환', '단독 신환', '공유 신환',
+                     alt.Tooltip('신환당 비용:Q', format=',.0f')]
+        ).properties(height=max(150, 35 * len(summary)))
+        st.altair_chart(attr_chart, use_container_width=True)
+        
+        st.dataframe(
+            summary.style.format({
+                '시작일': '{:%Y-%m-%d}', '종료일': '{:%Y-%m-%d}', '비용': '{:,}',
+                '기여 신환': '{:,.1f}', '신환당 비용': '{:,.0f}',
+            }),
+            hide_index=True
+        )
+        
+        if len(registry) > 1:
+            st.subheader("캠페인 간 공유 신환")
+            overlap = overlap_matrix(rows, camp, len(registry))
+            names = registry['캠페인'].astype(str).tolist()
+            overlap_df = pd.DataFrame({
+                '캠페인 A': np.repeat(names, len(names)),
+                '캠페인 B': np.tile(names, len(names)),
+                '신환수': overlap.ravel(),
+            })
+            overlap_chart = alt.Chart(overlap_df).mark_rect().encode(
+                x=alt.X('캠페인 A:N', sort=names, title=''),
+                y=alt.Y('캠페인 B:N', sort=names, title=''),
+                color=alt.Color('신환수:Q', scale=alt.Scale(scheme='blues')),
+                tooltip=['캠페인 A', '캠페인 B', '신환수']
+            ).properties(height=max(200, 40 * len(names)))
+            st.altair_chart(overlap_chart, use_container_width=True)
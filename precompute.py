@@ -0,0 +1,138 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from dashboard import artifacts, datasource, metrics
+from dashboard.config import SECRETS_PATH, load_secrets
+from dashboard.engine import get_engine
+from dashboard.partition import slice_dates
+from dashboard.penetration import build_region_tree, prepare_patients
+from dashboard.pipeline import Filter
+from dashboard.population import PopulationTable
+from dashboard.regions import ALL, CODE_COL, prepare_population
+
+# 대시보드 기본 보기 사전 계산 (cron 용)
+#
+#   python precompute.py                       # [precomputed] path (기본 artifacts/)
+#   0 5 * * * cd /srv/dashboard && python precompute.py
+#
+# 페이지와 같은 로더·전처리·지표 함수(dashboard.metrics)로 표준 프리셋마다 KPI 값(JSON)과
+# 추이·히트맵·연령 표(Parquet)를 새 실행 폴더에 쓰고, 다 쓴 뒤 LATEST 를 바꾼다.
+# 페이지는 조건과 데이터 확인값(첫·마지막 진료일, 행 수)이 같은 프리셋이 있으면 계산 없이 그대로 보여 준다.
+# 마케팅 페이지 기본 캠페인 기간과 지역장악도 활성 기준일은 오늘 날짜 기준이라 매일 돌린다.
+
+PAGES = ("환자정보", "지역장악도", "마케팅성과분석", "마케팅성과분석_v2")
+# 환자정보: 데이터 마지막 날까지 최근 N일 (None = 전체 기간, 페이지 기본 보기)
+OVERVIEW_DAYS = (None, 365, 90, 30)
+# 지역장악도: 최근 N개월 활성 (페이지 기본 12개월)
+ACTIVE_MONTHS = (3, 6, 12, 24)
+# 마케팅: 어제까지 최근 N일 캠페인 (페이지 기본 30일)
+CAMPAIGN_DAYS = (7, 30, 90)
+
+
+def overview_presets(engine, visits, run):
+    first, last = visits[metrics.DATE_COL].min(), visits[metrics.DATE_COL].max()
+    stamp = metrics.data_stamp(first, last, len(visits))
+    genders = ["전체"] + visits["성별"].dropna().unique().tolist()
+    for days in OVERVIEW_DAYS:
+        start = first if days is None else max(first, last - pd.Timedelta(days=days - 1))
+        start, end = pd.Timestamp(start.date()), pd.Timestamp(last.date())
+        curr_period = slice_dates(visits, start, end)
+        ly_period = slice_dates(visits, start - pd.DateOffset(years=1), end - pd.DateOffset(years=1))
+        for gender in genders:
+            filters = metrics.overview_filters(metrics.LABELS_10Y, gender)
+            scalars, tables = metrics.overview(engine, curr_period, ly_period, filters)
+            run.add("환자정보", metrics.overview_params(start, end, metrics.LABELS_10Y, gender), stamp, scalars, tables)
+
+
+def penetration_presets(engine, secrets, raw, run):
+    pop = prepare_population(datasource.load_population(secrets))
+    patients = prepare_patients(raw.copy())
+    tree = build_region_tree(pop, patients)
+    patients[CODE_COL] = tree.leaf_codes(patients)
+    population = PopulationTable.build(pop, tree)
+    last = patients[metrics.DATE_COL].max()
+    stamp = metrics.data_stamp(patients[metrics.DATE_COL].min(), last, len(patients))
+
+    # 전체 + 인구 시트에 있는 시/도 (페이지 선택지와 같은 기준)
+    regions = [(ALL, ALL, ALL)] + [(name, ALL, ALL) for name in tree.children(having="인구행")]
+    for months in ACTIVE_MONTHS:
+        cutoff_day = pd.Timestamp(datetime.now() - timedelta(days=30 * months)).ceil("D")
+        active = slice_dates(patients, cutoff_day, last)
+        for path in regions:
+            scalars, tables = metrics.penetration(engine, tree, population, patients, active, *path)
+            run.add("지역장악도", metrics.penetration_params(cutoff_day, *path), stamp, scalars, tables)
+
+
+def campaign_presets(engine, visits, run, page):
+    stamp = metrics.data_stamp(visits[metrics.DATE_COL].min(), visits[metrics.DATE_COL].max(), len(visits))
+
+    def period(start, end):
+        return Filter(visits).where((metrics.DATE_COL, "between", (pd.to_datetime(start), pd.to_datetime(end))))
+
+    # v1 은 기본 타겟 행정동, v2 는 전체 지역
+    if page == "마케팅성과분석":
+        targets = [t for t in metrics.DEFAULT_TARGETS if t in set(visits["행정동"].dropna().unique())]
+        target_cond = [("행정동", "in", targets)] if targets else []
+    else:
+        targets, target_cond = (ALL, ALL, ALL), []
+
+    today = datetime.now().date()
+    for days in CAMPAIGN_DAYS:
+        campaign_start, campaign_end = today - timedelta(days=days), today - timedelta(days=1)
+        trend = period(campaign_start - timedelta(days=30), campaign_end + timedelta(days=30))
+        for option in metrics.COMPARISONS:
+            before_start, before_end = metrics.comparison_period(campaign_start, campaign_end, option)
+            scalars = metrics.campaign_kpis(
+                period(campaign_start, campaign_end).where(*target_cond),
+                period(before_start, before_end).where(*target_cond),
+            )
+            tables = {"일별 신환": metrics.daily_new_trend(trend.where(*target_cond, metrics.NEW))}
+            if page == "마케팅성과분석":
+                tables["지역별 성과"] = metrics.region_performance(
+                    engine, visits, campaign_start, campaign_end, before_start, before_end
+                )
+            params = metrics.campaign_params(campaign_start, campaign_end, before_start, before_end, targets)
+            run.add(page, params, stamp, scalars, tables)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="대시보드 기본 보기 사전 계산")
+    parser.add_argument("--out", help="결과 폴더 (기본: [precomputed] path 또는 artifacts)")
+    parser.add_argument("--pages", nargs="+", choices=PAGES, default=list(PAGES))
+    parser.add_argument("--keep", type=int, help="남겨 둘 실행 수 (기본: [precomputed] keep 또는 7)")
+    parser.add_argument("--secrets", default=SECRETS_PATH, help="데이터 소스 설정 파일")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.time()
+    secrets = load_secrets(args.secrets)
+    conf = secrets.get("precomputed", {})
+    root = artifacts.artifact_root({"precomputed": {"path": args.out or conf.get("path", artifacts.DEFAULT_PATH)}})
+    engine = get_engine(secrets)
+
+    raw = datasource.load_visits(secrets)
+    visits = metrics.prepare_visits(raw.copy())
+    print(f"방문 {len(visits):,}건 적재 ({time.time() - started:.1f}초)")
+
+    run = artifacts.RunWriter(root)
+    for page in args.pages:
+        t0 = time.time()
+        if page == "환자정보":
+            overview_presets(engine, visits, run)
+        elif page == "지역장악도":
+            penetration_presets(engine, secrets, raw, run)
+        else:
+            campaign_presets(engine, visits, run, page)
+        print(f"{page}: 프리셋 {len(run.pages.get(page, {})):,}개 ({time.time() - t0:.1f}초)")
+
+    run.publish(args.keep or conf.get("keep", artifacts.DEFAULT_KEEP))
+    print(f"{run.dir} ({time.time() - started:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboard import metrics, sample_data  # noqa: E402
+
+
+# 환자정보 페이지 전처리를 거친 합성 방문 이력 (테스트마다 새로 만들어 서로 영향이 없게)
+@pytest.fixture
+def visits():
+    raw, _ = sample_data.generate(6000, n_patients=1500, n_dongs=12, days=400, end="2024-06-30", seed=7)
+    return metrics.prepare_visits(raw)
+
+
+@pytest.fixture
+def population():
+    _, pop = sample_data.generate(10, n_dongs=12, seed=7)
+    return pop
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard.attribution import (
+    RULES, attribute, campaign_ranges, interval_join, normalize_registry, overlap_matrix, summarize,
+)
+from dashboard.regions import RegionTree, province_map
+
+CAMPAIGNS = [
+    # 캠페인, 시작일, 종료일, 시/도, 시/군/구, 행정동, 비용
+    ("월곶 전단", "2024-03-01", "2024-03-31", "경기도", "시흥시", "월곶동", 1_000_000),
+    ("시흥 버스", "2024-03-15", "2024-04-30", "경기도", "시흥시", "", 3_000_000),
+    ("전국 검색", "2024-02-01", "2024-05-31", "", "", "", 5_000_000),
+    ("같은 날 시작", "2024-03-15", "2024-04-10", "경기도", "", "", 500_000),
+    ("없는 지역", "2024-01-01", "2024-06-30", "강원도", "", "", 100_000),
+    ("기간 밖", "2025-01-01", "2025-01-31", "", "", "", 0),
+]
+
+
+@pytest.fixture
+def setup(visits):
+    visits = visits.copy()
+    visits["시/도"] = visits["시/도"].astype(object).map(province_map)
+    tree = RegionTree.build(visits)
+    codes = tree.leaf_codes(visits).astype(np.int64)
+    # 주소를 못 읽은 방문 (트리에 없음)
+    codes[::17] = -1
+    registry = normalize_registry(pd.DataFrame(CAMPAIGNS, columns=["캠페인", "시작일", "종료일", "시/도", "시/군/구", "행정동", "비용"]))
+    lo, hi, n_dongs = campaign_ranges(registry, tree)
+    dates = visits["진료일자"].values
+    return registry, dates, codes, lo, hi, n_dongs
+
+
+def brute_force(dates, codes, registry, lo, hi):
+    days = dates.astype("datetime64[D]")
+    pairs = set()
+    for c, (s, e) in enumerate(zip(registry["시작일"].values.astype("datetime64[D]"), registry["종료일"].values.astype("datetime64[D]"))):
+        hit = (days >= s) & (days <= e) & (codes >= lo[c]) & (codes < hi[c])
+        pairs |= {(int(r), c) for r in np.flatnonzero(hit)}
+    return pairs
+
+
+def join(registry, dates, codes, lo, hi):
+    return interval_join(dates, codes, registry["시작일"].values, registry["종료일"].values, lo, hi)
+
+
+def test_campaign_ranges(setup):
+    registry, _, _, lo, hi, n_dongs = setup
+    # "전체" 캠페인은 트리에 없는 행(-1)까지, 없는 지역은 빈 구간
+    assert lo[2] == -1 and lo[5] == -1
+    assert hi[4] <= lo[4]
+    assert n_dongs[0] == 1 and n_dongs[1] > 1 and n_dongs[2] >= n_dongs[3] >= n_dongs[1]
+
+
+def test_interval_join_matches_brute_force(setup):
+    registry, dates, codes, lo, hi, _ = setup
+    rows, camp = join(registry, dates, codes, lo, hi)
+    pairs = set(zip(rows.tolist(), camp.tolist()))
+    assert len(pairs) == len(rows)
+    assert pairs == brute_force(dates, codes, registry, lo, hi)
+    # 전체 캠페인은 지역코드 -1 방문도 잡는다
+    assert (codes[rows[camp == 2]] == -1).any()
+    assert not (camp == 4).any() and not (camp == 5).any()
+
+
+@pytest.mark.parametrize("rule", RULES.values())
+def test_credits_sum_to_one_per_visit(setup, rule):
+    registry, dates, codes, lo, hi, n_dongs = setup
+    rows, camp = join(registry, dates, codes, lo, hi)
+    credit = attribute(rows, camp, rule, dates, registry["시작일"].values, registry["종료일"].values, n_dongs)
+    assert (credit >= 0).all()
+    per_visit = pd.Series(credit).groupby(rows).sum()
+    np.testing.assert_allclose(per_visit.values, 1.0)
+
+
+def test_last_touch_picks_latest_start_and_breaks_ties():
+    rows = np.array([0, 0, 0, 1, 1, 2])
+    camp = np.array([0, 1, 2, 1, 2, 0])
+    starts = pd.to_datetime(["2024-01-01", "2024-02-01", "2024-02-01"]).values
+    credit = attribute(rows, camp, "last", None, starts, starts, np.ones(3))
+    # 시작일이 같은 캠페인 1·2 는 번호가 큰 쪽 하나만
+    np.testing.assert_array_equal(credit, [0, 0, 1, 0, 1, 1])
+
+
+def test_decay_and_region_weights():
+    rows = np.array([0, 0])
+    camp = np.array([0, 1])
+    dates = pd.to_datetime(["2024-03-29"]).values
+    starts = pd.to_datetime(["2024-03-01", "2024-03-01"]).values
+    ends = pd.to_datetime(["2024-03-01", "2024-03-15"]).values
+    # 종료 후 28일 vs 14일 → 반감기 14일 가중치 1/4 : 1/2
+    np.testing.assert_allclose(attribute(rows, camp, "decay", dates, starts, ends, np.ones(2)), [1 / 3, 2 / 3])
+    np.testing.assert_allclose(attribute(rows, camp, "region", dates, starts, ends, np.array([1, 3])), [0.75, 0.25])
+    assert len(attribute(np.array([], dtype=np.int64), np.array([], dtype=np.int64), "last", dates, starts, ends, np.ones(2))) == 0
+
+
+def test_summarize_and_overlap(setup):
+    registry, dates, codes, lo, hi, n_dongs = setup
+    rows, camp = join(registry, dates, codes, lo, hi)
+    credit = attribute(rows, camp, "decay", dates, registry["시작일"].values, registry["종료일"].values, n_dongs)
+    out = summarize(registry, rows, camp, credit)
+    pd.testing.assert_series_equal(out["대상 신환"], out["단독 신환"] + out["공유 신환"], check_names=False)
+    assert out["기여 신환"].sum() == pytest.approx(len(np.unique(rows)))
+    assert np.isnan(out.loc[5, "신환당 비용"])
+    assert out.loc[0, "신환당 비용"] == pytest.approx(1_000_000 / out.loc[0, "기여 신환"])
+
+    overlap = overlap_matrix(rows, camp, len(registry))
+    np.testing.assert_array_equal(np.diag(overlap), out["대상 신환"].values)
+    hits = [set(rows[camp == c].tolist()) for c in range(len(registry))]
+    for i in range(len(registry)):
+        for j in range(len(registry)):
+            assert overlap[i, j] == len(hits[i] & hits[j])
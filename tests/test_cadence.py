@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard.cadence import VisitGaps
+
+PID = "환자번호"
+
+
+def day_numbers(dates):
+    return pd.DatetimeIndex(dates).values.astype("datetime64[D]").astype(np.int64)
+
+
+# 환자별 방문일(같은 날 중복 제거, 정렬)과 그 간격
+def per_patient(df):
+    days = pd.Series(day_numbers(df["진료일자"]), index=df.index)
+    return {pid: np.unique(d.values) for pid, d in days.groupby(df[PID].astype(object))}
+
+
+@pytest.fixture
+def gaps(visits):
+    return VisitGaps.build(visits)
+
+
+def test_patient_summary_matches_brute_force(visits, gaps):
+    cats = visits[PID].cat.categories
+    for pid, days in per_patient(visits).items():
+        code = cats.get_loc(pid)
+        assert gaps.first[code] == days[0] and gaps.last[code] == days[-1]
+        assert gaps.n_days[code] == len(days)
+        expected = np.median(np.diff(days)) if len(days) > 1 else -1
+        assert gaps.typical[code] == expected
+
+
+def test_row_gaps_match_brute_force(visits, gaps):
+    days = day_numbers(visits["진료일자"])
+    patients = per_patient(visits)
+    seen = set()
+    # 같은 날 첫 행만 직전 간격이 있고, 나머지 행은 -2
+    for row in np.argsort(days, kind="stable"):
+        pid = visits[PID].iat[row]
+        d = patients[pid]
+        i = np.searchsorted(d, days[row])
+        if (pid, days[row]) in seen:
+            assert gaps.prev_gap[row] == -2
+        else:
+            assert gaps.prev_gap[row] == (d[i] - d[i - 1] if i else -1)
+        assert gaps.next_gap[row] == (d[i + 1] - d[i] if i + 1 < len(d) else -1)
+        seen.add((pid, days[row]))
+
+
+def test_uncompacted_ids_and_same_day_visits():
+    df = pd.DataFrame({
+        "진료일자": pd.to_datetime(["2024-01-10", "2024-01-01", "2024-01-01", "2024-01-05", "2024-01-03", "2024-02-01"]),
+        PID: ["A", "A", "A", "B", "A", "B"],
+        "초/재진": ["재진", "신환", "재진", "신환", "재진", "재진"],
+    })
+    gaps = VisitGaps.build(df)
+    np.testing.assert_array_equal(gaps.prev_gap, [7, -1, -2, -1, 2, 27])
+    np.testing.assert_array_equal(gaps.next_gap, [-1, 2, 2, 27, 7, -1])
+    # A: 간격 2, 7 → 중앙값 4.5 / B: 27
+    np.testing.assert_array_equal(gaps.typical, [4.5, 27])
+    assert str(gaps.expected_next()[0]) == "2024-01-14"
+    assert list(gaps.cohort_labels()[[0, 3]]) == ["2024-01", "2024-01"]
+    # 같은 날 두 번째 행은 세지 않는다: 5번의 방문일 중 30일 안에 다시 온 방문 3번
+    assert gaps.revisit_rate(np.ones(6, dtype=bool), 30) == pytest.approx(3 / 5)
+
+
+def test_dormancy_flags(visits, gaps):
+    as_of = visits["진료일자"].max()
+    since, typical, flag = gaps.dormancy(as_of, factor=2.0, fallback=90)
+    has = gaps.n_days > 0
+    np.testing.assert_array_equal(flag[has], since[has] > 2.0 * typical[has])
+    assert (typical[has & (gaps.n_days == 1)] == 90).all()
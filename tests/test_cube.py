@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from dashboard.cube import VisitCube
+from dashboard.pipeline import Filter
+
+WHERES = [
+    [],
+    [("진료일자", "between", (pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-31")))],
+    [("연령대", "in", ["30대", "40대"])],
+    [("성별", "==", "여"), ("시/군/구", "==", "시흥시")],
+    [("행정동", "in", ["월곶동", "배곧1동"]), ("진료일자", "between", (pd.Timestamp("2024-05-01"), pd.Timestamp("2024-06-30")))],
+]
+
+
+@pytest.fixture
+def cube(visits):
+    return VisitCube.build(visits)
+
+
+@pytest.mark.parametrize("where", WHERES)
+def test_exact_distinct_matches_filter(visits, cube, where):
+    assert cube.distinct(where, exact=True) == Filter(visits).where(*where).nunique_patients()
+
+
+@pytest.mark.parametrize("where", WHERES)
+def test_sums_match_filter(visits, cube, where):
+    f = Filter(visits).where(*where)
+    assert cube.sum("방문수", where) == len(f)
+    assert cube.sum("신환수", where) == f.count(("초/재진", "==", "신환"))
+
+
+def test_sketch_distinct_close_to_exact(cube):
+    exact = cube.distinct(exact=True)
+    assert abs(cube.distinct() - exact) <= 0.07 * exact
+
+
+def test_exact_requires_pairs(visits):
+    with pytest.raises(ValueError):
+        VisitCube.build(visits, exact=False).distinct(exact=True)
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from dashboard import metrics
+from dashboard.engine import DuckDBEngine, PandasEngine, get_engine
+
+pytest.importorskip("duckdb")
+
+START, END = pd.Timestamp("2024-03-01"), pd.Timestamp("2024-05-31")
+QUERIES = [
+    # (by, metrics, where)
+    (["요일", "진료시간대"], {"count": ("count", None)}, [("연령대", "in", ["30대", "40대"]), ("성별", "==", "여")]),
+    (["행정동"], {"환자수": ("nunique", "환자번호"), "신환수": ("count_if", ("초/재진", "신환"))},
+     [("진료일자", "between", (START, END))]),
+    (["나이"], {"환자수": ("nunique", "환자번호")}, [("시/군/구", "==", "시흥시")]),
+    (["연령대", "성별"], {"방문수": ("count", None), "평균나이": ("mean", "나이")}, [("나이", ">=", 20), ("나이", "<", 70)]),
+    ([], {"방문수": ("count", None), "환자수": ("nunique", "환자번호"), "신환수": ("count_if", ("초/재진", "신환"))},
+     [("진료일자", "between", (START, END))]),
+]
+
+
+@pytest.mark.parametrize("by, aggs, where", QUERIES)
+def test_duckdb_matches_pandas(visits, by, aggs, where):
+    expected = PandasEngine().aggregate(visits, by, aggs, where)
+    actual = DuckDBEngine().aggregate(visits, by, aggs, where)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False)
+
+
+def test_page_tables_match(visits):
+    filters = metrics.overview_filters(metrics.LABELS_10Y, "남")
+    pd.testing.assert_frame_equal(
+        metrics.visit_heatmap(DuckDBEngine(), visits, filters), metrics.visit_heatmap(PandasEngine(), visits, filters)
+    )
+    args = (visits, "2024-05-01", "2024-05-31", "2024-04-01", "2024-04-30")
+    pd.testing.assert_frame_equal(
+        metrics.region_performance(DuckDBEngine(), *args), metrics.region_performance(PandasEngine(), *args),
+        check_dtype=False,
+    )
+
+
+# 데이터 소스가 쓰는 parquet 처럼 category 없이 저장한다
+def test_parquet_path_matches(visits, tmp_path):
+    path = str(tmp_path / "visits.parquet")
+    plain = visits.astype({c: object for c in visits.columns if isinstance(visits[c].dtype, pd.CategoricalDtype)})
+    plain.to_parquet(path)
+    by, aggs, where = QUERIES[1]
+    pd.testing.assert_frame_equal(
+        DuckDBEngine().aggregate(path, by, aggs, where), PandasEngine().aggregate(path, by, aggs, where),
+        check_exact=False,
+    )
+
+
+def test_get_engine_rejects_unknown_type():
+    assert isinstance(get_engine({}), PandasEngine)
+    assert isinstance(get_engine({"engine": {"type": "duckdb"}}), DuckDBEngine)
+    with pytest.raises(ValueError):
+        get_engine({"engine": {"type": "duckbd"}})
+
+
+def test_get_engine_requires_duckdb(monkeypatch):
+    monkeypatch.setattr("dashboard.engine.duckdb", None)
+    with pytest.raises(ImportError):
+        get_engine({"engine": {"type": "duckdb"}})
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from dashboard.partition import slice_dates
+from dashboard.patient_index import DayBitmaps, patient_set, universe
+from dashboard.pipeline import Filter
+
+PID = "환자번호"
+
+
+def ids(df):
+    return set(df[PID].dropna())
+
+
+@pytest.fixture
+def periods(visits):
+    before = slice_dates(visits, "2024-01-01", "2024-03-31")
+    after = slice_dates(visits, "2024-03-01", "2024-06-30")
+    return before, after
+
+
+def test_set_algebra_matches_python_sets(periods):
+    before, after = periods
+    patients = universe(before, after)
+    a, b = patient_set(before, patients), patient_set(after, patients)
+    assert set(a.ids()) == ids(before)
+    assert len(a) == len(ids(before))
+    assert set((a & b).ids()) == ids(before) & ids(after)
+    assert set((a | b).ids()) == ids(before) | ids(after)
+    assert set((a - b).ids()) == ids(before) - ids(after)
+    assert len(a - b) + len(a & b) == len(a)
+
+
+def test_filter_rows_only(visits):
+    patients = universe(visits)
+    women = Filter(visits).where(("성별", "==", "여"))
+    assert set(patient_set(women, patients).ids()) == ids(visits[visits["성별"] == "여"])
+
+
+def test_universe_of_independent_frames():
+    # category 목록이 다른 프레임은 합친 universe 위치로 옮겨 센다
+    a = pd.DataFrame({PID: pd.Categorical(["A", "B", "C"])})
+    b = pd.DataFrame({PID: pd.Series(["C", "D", None])})
+    patients = universe(a, b)
+    sa, sb = patient_set(a, patients), patient_set(b, patients)
+    assert sorted((sa | sb).ids()) == ["A", "B", "C", "D"]
+    assert list((sa & sb).ids()) == ["C"]
+
+
+def test_different_universes_rejected(visits):
+    a = patient_set(visits, universe(visits))
+    b = patient_set(visits.iloc[:10], pd.Index(["X", "Y"]))
+    with pytest.raises(ValueError):
+        a & b
+
+
+@pytest.mark.parametrize("freq", ["D", "W"])
+def test_day_bitmap_window_matches_slice(visits, freq):
+    patients = universe(visits)
+    bitmaps = DayBitmaps.build(visits, patients, freq)
+    start, end = pd.Timestamp("2024-02-05"), pd.Timestamp("2024-04-28")  # 월요일 ~ 일요일
+    assert set(bitmaps.window(start, end).ids()) == ids(slice_dates(visits, start, end))
+    assert len(bitmaps.window("2030-01-01", "2030-12-31")) == 0
+    assert bitmaps.visits.sum() == visits[PID].notna().sum()
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard.sketch import HLL, hash_ids
+
+
+def ids(start, stop):
+    return pd.Series([f"P{i:07d}" for i in range(start, stop)])
+
+
+def sketch(series, precision=12):
+    return HLL(precision).add_hashes(hash_ids(series))
+
+
+@pytest.mark.parametrize("n", [1_000, 10_000, 100_000])
+def test_estimate_within_error_bound(n):
+    # p=12 의 표준 오차는 약 1.6%, 4 시그마 안에 들어와야 한다
+    assert abs(sketch(ids(0, n)).count() - n) <= 4 * 1.04 / np.sqrt(1 << 12) * n
+
+
+def test_small_counts_use_linear_counting():
+    assert abs(sketch(ids(0, 20)).count() - 20) <= 1
+
+
+def test_duplicates_do_not_change_the_sketch():
+    once = sketch(ids(0, 5000))
+    twice = sketch(pd.concat([ids(0, 5000), ids(0, 5000)]))
+    np.testing.assert_array_equal(once.registers, twice.registers)
+
+
+def test_merge_equals_sketch_of_union():
+    a, b = ids(0, 6000), ids(4000, 12000)
+    merged = sketch(a).merge(sketch(b))
+    np.testing.assert_array_equal(merged.registers, sketch(pd.concat([a, b])).registers)
+    assert abs(merged.count() - 12000) <= 4 * 0.0163 * 12000
+
+
+def test_merge_rejects_different_precision():
+    with pytest.raises(ValueError):
+        sketch(ids(0, 10), 12).merge(sketch(ids(0, 10), 10))
+
+
+def test_categorical_ids_hash_like_plain_values():
+    plain = ids(0, 300).sample(frac=1, random_state=0, ignore_index=True)
+    np.testing.assert_array_equal(hash_ids(plain.astype("category")), hash_ids(plain))
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from dashboard.spatial import KM_PER_DEG, LocationIndex, distance_band, haversine
+
+# 병원 근처·데이터 가장자리·데이터 밖 질의점
+QUERIES = [(37.390, 126.740), (37.500, 127.030), (37.300, 126.600), (36.000, 128.500)]
+
+
+@pytest.fixture
+def index(visits):
+    return LocationIndex.build(visits["y"], visits["x"])
+
+
+def test_haversine_degree_of_latitude():
+    assert haversine(37.0, 127.0, 38.0, 127.0) == pytest.approx(KM_PER_DEG)
+    assert haversine(37.0, 127.0, 37.0, 127.0) == 0
+
+
+def test_locations_match_visit_rows(visits, index):
+    loc = index.row_loc
+    has = visits["y"].notna().values
+    assert ((loc >= 0) == has).all()
+    np.testing.assert_allclose(index.lat[loc[has]], visits["y"].values[has], atol=1e-5)
+    np.testing.assert_allclose(index.lon[loc[has]], visits["x"].values[has], atol=1e-5)
+    assert index.rows(np.ones(len(index), dtype=bool)).sum() == has.sum()
+
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+@pytest.mark.parametrize("km", [0.5, 1, 3, 10, 50])
+def test_within_matches_brute_force(index, lat, lon, km):
+    np.testing.assert_array_equal(index.within(lat, lon, km), index.distances(lat, lon) <= km)
+
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+def test_nearest_matches_brute_force(index, lat, lon):
+    dist = index.distances(lat, lon)
+    assert dist[index.nearest(lat, lon)] == dist.min()
+
+
+def test_fine_grid_and_empty_index(visits):
+    fine = LocationIndex.build(visits["y"], visits["x"], cell_km=0.2)
+    lat, lon = QUERIES[0]
+    np.testing.assert_array_equal(fine.within(lat, lon, 2), fine.distances(lat, lon) <= 2)
+    empty = LocationIndex.build([np.nan], [np.nan])
+    assert len(empty) == 0 and not empty.within(lat, lon, 5).any() and empty.nearest(lat, lon) == -1
+
+
+def test_distance_band():
+    np.testing.assert_array_equal(distance_band([0.2, 1.0, 4.9, 25.0, np.nan]), [0, 1, 2, 5, -1])
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from dashboard.synth import nnls_batch, synthetic_control
+
+FIT, POST = slice(0, 90), slice(90, 120)
+
+
+def poisson_design(seed, T, K, J=3):
+    rng = np.random.default_rng(seed)
+    A = rng.poisson(rng.uniform(1, 6, K), (T, K)).astype(np.float64)
+    B = rng.poisson(4, (T, J)).astype(np.float64)
+    return A, B
+
+
+@pytest.mark.parametrize("seed, T, K", [(0, 20, 5), (1, 40, 8), (2, 60, 12), (3, 90, 20)])
+def test_nnls_matches_scipy(seed, T, K):
+    nnls = pytest.importorskip("scipy.optimize").nnls
+    A, B = poisson_design(seed, T, K)
+    W = nnls_batch(A, B)
+    ref = np.column_stack([nnls(A, b)[0] for b in B.T])
+    assert (W >= 0).all()
+    np.testing.assert_allclose(np.linalg.norm(A @ W - B, axis=0), np.linalg.norm(A @ ref - B, axis=0), rtol=1e-4)
+    np.testing.assert_allclose(W, ref, atol=1e-2)
+
+
+def test_nnls_mask_fixes_weights_at_zero():
+    nnls = pytest.importorskip("scipy.optimize").nnls
+    A, B = poisson_design(4, 40, 6, J=2)
+    mask = np.ones((6, 2))
+    mask[[0, 3], 1] = 0
+    W = nnls_batch(A, B, mask)
+    assert (W[[0, 3], 1] == 0).all()
+    keep = [1, 2, 4, 5]
+    np.testing.assert_allclose(W[keep, 1], nnls(A[:, keep], B[:, 1])[0], atol=1e-2)
+
+
+# 기여 지역 일별 신환 (포아송) + 그중 몇 곳의 가중합을 따르는 타겟, 캠페인 기간에 effect 건/일을 더한다
+def simulate(effect, seed, n_donors=25):
+    rng = np.random.default_rng(seed)
+    days = POST.stop
+    donors = rng.poisson(rng.uniform(2, 8, n_donors)[:, None] * (1 + 0.3 * np.sin(np.arange(days) / 7)), (n_donors, days))
+    weights = np.zeros(n_donors)
+    weights[:4] = [0.5, 0.3, 0.4, 0.2]
+    target = rng.poisson(weights @ donors + np.where(np.arange(days) >= POST.start, effect, 0))
+    matrix = np.vstack([target, donors])
+    return matrix, np.arange(len(matrix)) == 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_null_effect(seed):
+    res = synthetic_control(*simulate(0.0, seed), FIT, POST)
+    assert 0 <= res["p_value"] <= 1
+    assert res["p_value"] > 0.1
+    assert abs(res["effect"]) < 3 * np.sqrt(res["expected"])
+    assert res["n_placebo"] == 25
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_planted_effect_detected(seed):
+    res = synthetic_control(*simulate(8.0, seed), FIT, POST)
+    assert 0 <= res["p_value"] <= 1
+    assert res["p_value"] <= 2 / 26
+    assert res["effect"] == pytest.approx(8.0 * 30, rel=0.3)
+    assert (res["weights"] >= 0).all()
+
+
+def test_no_donors_or_no_target_volume():
+    matrix, target = simulate(0.0, 0)
+    assert synthetic_control(matrix[:1], target[:1], FIT, POST) is None
+    matrix[0, FIT] = 0
+    assert synthetic_control(matrix, target, FIT, POST) is None
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard.uplift import bootstrap_weights, did_test, region_day_matrix, region_uplift
+
+N_REGIONS, PRE_DAYS, POST_DAYS = 30, 60, 30
+TARGET = np.arange(N_REGIONS) < 3
+
+
+# 지역별 일 신환 수 (포아송). 캠페인 기간에는 모든 지역이 trend 배로 늘고, 타겟만 effect 배 더 늘어난다.
+def simulate(effect, seed, trend=1.2):
+    rng = np.random.default_rng(seed)
+    rate = rng.uniform(1, 5, N_REGIONS)[:, None]
+    pre = rng.poisson(rate, (N_REGIONS, PRE_DAYS))
+    boost = np.where(TARGET, effect, 1.0)[:, None]
+    post = rng.poisson(rate * trend * boost, (N_REGIONS, POST_DAYS))
+    return pre, post
+
+
+def test_region_day_matrix_counts():
+    dates = pd.to_datetime(["2024-01-01", "2024-01-01", "2024-01-03", "2023-12-31", "2024-01-02"]).values
+    codes = np.array([0, 0, 2, 1, -1])
+    m = region_day_matrix(codes, dates, 3, "2024-01-01", "2024-01-03")
+    np.testing.assert_array_equal(m, [[2, 0, 0], [0, 0, 0], [0, 0, 1]])
+
+
+def test_bootstrap_weights_resample_all_days():
+    w = bootstrap_weights(40, 500, np.random.default_rng(1))
+    assert w.shape == (500, 40)
+    assert (w.sum(axis=1) == 40).all()
+    # 날짜마다 평균 한 번 뽑힌다
+    assert w.mean() == pytest.approx(1.0)
+    np.testing.assert_array_equal(bootstrap_weights(10), bootstrap_weights(10))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_null_effect_ci_covers_zero(seed):
+    res = did_test(*simulate(1.0, seed), TARGET, n_boot=1000)
+    low, high = res["uplift_ci"]
+    assert low < 0 < high
+    assert res["excess_ci"][0] < 0 < res["excess_ci"][1]
+    assert 0.05 < res["p_value"] <= 1
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_planted_effect_detected(seed):
+    res = did_test(*simulate(1.8, seed), TARGET, n_boot=1000)
+    assert res["uplift_ci"][0] > 0
+    assert res["excess_ci"][0] > 0
+    assert res["uplift"] == pytest.approx(0.8, abs=0.3)
+    assert 0 < res["p_value"] < 0.05
+    assert res["n_target"] == 3 and res["n_regions"] == N_REGIONS
+
+
+# 대조 지역이 없으면 기대치가 NaN 이라 신뢰구간도 NaN 이다
+@pytest.mark.filterwarnings("ignore:All-NaN slice")
+def test_p_value_undefined_without_controls():
+    pre, post = simulate(1.0, 0)
+    assert np.isnan(did_test(pre, post, np.ones(N_REGIONS, dtype=bool), n_boot=100)["p_value"])
+
+
+def test_region_uplift_flags_planted_regions():
+    res = region_uplift(*simulate(2.0, 3), n_boot=1000)
+    assert (res["low"][TARGET] > 0).all()
+    assert (res["low"] <= res["excess"]).all() and (res["excess"] <= res["high"]).all()
+    # 효과가 없는 지역은 대부분 신뢰구간이 0 을 덮는다
+    covered = (res["low"][~TARGET] < 0) & (res["high"][~TARGET] > 0)
+    assert covered.mean() >= 0.8
+
+
+# 끝이 시작보다 앞인 기간 (예: 사용자 지정 비교 기간을 거꾸로 입력)
+def test_reversed_period_gives_empty_matrix_and_nan_result():
+    dates = pd.to_datetime(["2024-01-05", "2024-01-10"]).values
+    empty = region_day_matrix(np.array([0, 1]), dates, N_REGIONS, "2024-01-20", "2024-01-10")
+    assert empty.shape == (N_REGIONS, 0)
+    assert bootstrap_weights(0, 10).shape == (10, 0)
+
+    pre, post = simulate(1.0, 0)
+    for res in (did_test(empty, post, TARGET, n_boot=100), did_test(pre, empty, TARGET, n_boot=100)):
+        assert np.isnan(res["uplift"]) and np.isnan(res["excess"]) and np.isnan(res["p_value"])
+        assert np.isnan(res["uplift_ci"]).all() and np.isnan(res["excess_ci"]).all()
+    res = region_uplift(empty, post, n_boot=100)
+    assert np.isnan(res["excess"]).all()
+    np.testing.assert_array_equal(res["post"], post.sum(axis=1))
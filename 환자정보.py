@@ -1,11 +1,21 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import altair as alt
 import folium
-import gspread
 from streamlit_folium import folium_static
 from folium.plugins import FastMarkerCluster
 
+from dashboard import arrow_store, artifacts, datasource, export, metrics
+from dashboard.cadence import VisitGaps, gap_labels
+from dashboard.ages import BANDINGS, CUSTOM, LABELS_10Y, age_histogram, parse_edges
+from dashboard.compact import memory_report
+from dashboard.cube import VisitCube
+from dashboard.engine import get_engine
+from dashboard.partition import slice_dates
+from dashboard.pipeline import Filter
+from dashboard.spatial import LocationIndex, band_labels, clinic_location, distance_band
+
 def authenticate():
     if "authenticated" not in st.session_state:
         st.session_state.authenticated = False
@@ -30,76 +40,152 @@ st.set_page_config(page_title="환자 대시보드", layout="wide")
 
 authenticate()
 
-# 1) 데이터 로드 (Google Sheets via API)
-@st.cache_data
+# 1) 전처리 (배치 사전 계산과 같은 함수)
+labels = LABELS_10Y
+prepare = metrics.prepare_visits
+
+# 2) 데이터 로드 (Google Sheets / 로컬 소스, 공유 Arrow 파일이 설정되어 있으면 메모리 매핑)
+@st.cache_resource
 def load_data():
-    creds_dict = st.secrets["gcp_service_account"]
-    client = gspread.service_account_from_dict(creds_dict)
-    sheet_id = st.secrets["google_sheets"]["sheet_id"]
-    worksheet_name = st.secrets["google_sheets"]["worksheet_name"]
-    sheet = client.open_by_key(sheet_id).worksheet(worksheet_name)
-    records = sheet.get_all_records()
-    return pd.DataFrame(records)
-
-df = load_data()
-
-# 2) 전처리
-df['진료일자'] = pd.to_datetime(df['진료일자'], format='%Y%m%d')
-
-def categorize_time(hms):
-    if pd.isna(hms):
-        time_str = '000000'
-    else:
-        try:
-            val = int(hms)
-            time_str = str(val).zfill(6)
-        except:
-            time_str = str(hms).zfill(6)
-    hour = int(time_str[:2])
-    return f"{hour:02d}"
-
-df['진료시간대'] = df['진료시간'].apply(categorize_time)
-
-bins = list(range(0, 101, 10)) + [999]
-labels = ["9세이하"] + [f"{i}대" for i in range(10, 100, 10)] + ["100세이상"]
-df['연령대'] = pd.cut(
-    df['나이'],
-    bins=bins,
-    labels=labels,
-    right=False,
-    include_lowest=True
-)
+    return arrow_store.load_shared(
+        st.secrets, "환자정보_visits",
+        lambda: prepare(datasource.load_visits(st.secrets))
+    )
+
+# 일 × 지역 × 연령대 × 성별 사전 집계 (고유 환자 수는 셀별 스케치)
+@st.cache_resource
+def load_cube():
+    return VisitCube.build(load_data())
+
+# 환자 좌표 격자 색인 (중복 없는 위치 + 방문 행별 위치 번호)
+@st.cache_resource
+def load_location_index():
+    visits = load_data()
+    return LocationIndex.build(visits['y'], visits['x'])
+
+# 환자별 방문 간격 색인 ((환자, 진료일자) 정렬 한 번으로 직전·다음 방문 간격)
+@st.cache_resource
+def load_visit_gaps():
+    return VisitGaps.build(load_data())
+
+@st.cache_data
+def load_period(start, end):
+    return prepare(datasource.load_visits_range(st.secrets, start, end))
+
+@st.cache_resource
+def load_period_location_index(start, end):
+    visits = load_period(start, end)
+    return LocationIndex.build(visits['y'], visits['x'])
+
+@st.cache_resource
+def load_period_visit_gaps(start, end):
+    return VisitGaps.build(load_period(start, end))
+
+# 배치 사전 계산(precompute.py) 실행 하나 (LATEST 가 바뀌면 새 실행을 연다)
+@st.cache_resource
+def load_artifact_run(root, run):
+    return artifacts.ArtifactRun.open(root, run)
+
+@st.cache_data
+def load_date_bounds():
+    return datasource.visit_date_bounds(st.secrets)
+
+# 성별 선택지는 조회 기간과 무관하게 전체 기간 값으로 (기간을 바꿔도 선택이 초기화되지 않게)
+@st.cache_data
+def load_genders():
+    return datasource.load_visit_column(st.secrets, '성별').dropna().unique().tolist()
+
+# 월 파티션 저장소면 기간마다 겹치는 파티션만 읽고, 아니면 전체를 한 번 읽어 날짜로 잘라 쓴다
+partitioned = datasource.is_partitioned(st.secrets)
+df = None if partitioned else load_data()
+engine = get_engine(st.secrets)
+
+def period(start, end):
+    if partitioned:
+        return load_period(start, end)
+    return slice_dates(df, start, end)
+
+if partitioned:
+    min_date, max_date = load_date_bounds()
+else:
+    min_date, max_date = df['진료일자'].min(), df['진료일자'].max()
 
 # 3) 사이드바 필터
 st.sidebar.header("필터 설정")
-start_date = st.sidebar.date_input("시작 진료일자", df['진료일자'].min())
-end_date = st.sidebar.date_input("종료 진료일자", df['진료일자'].max())
+start_date = st.sidebar.date_input("시작 진료일자", min_date)
+end_date = st.sidebar.date_input("종료 진료일자", max_date)
+
+# 기준 기간 / 전년 동기 기간
+start = pd.to_datetime(start_date)
+end   = pd.to_datetime(end_date)
+ly_start = start - pd.DateOffset(years=1)
+ly_end   = end   - pd.DateOffset(years=1)
+curr_period = period(start, end)
+ly_period   = period(ly_start, ly_end)
+
 age_band = st.sidebar.multiselect(
     "연령대",
-    options=df['연령대'].cat.categories.tolist(),
-    default=df['연령대'].cat.categories.tolist()
+    options=labels,
+    default=labels
 )
 gender = st.sidebar.selectbox(
     "성별",
-    options=["전체"] + df['성별'].dropna().unique().tolist()
+    options=["전체"] + (load_genders() if partitioned else df['성별'].dropna().unique().tolist())
+)
+
+filters = metrics.overview_filters(age_band, gender)
+approx = st.sidebar.checkbox(
+    "환자수 근사 집계 (HLL)",
+    value=False,
+    help="집계 큐브의 스케치를 합쳐 고유 환자 수를 추정합니다 (오차 약 1.6%)."
+)
+# 행을 복사하지 않고 마스크만 들고 다닌다
+filtered = Filter(curr_period).where(*filters)
+cube = None if partitioned else load_cube()
+cube_where = [('진료일자', 'between', (start, end))] + filters
+
+# 기본 보기처럼 배치로 미리 계산한 프리셋과 조건·데이터가 같으면 그 결과를 그대로 쓴다 (근사 집계 제외)
+stamp = metrics.data_stamp(min_date, max_date, None if partitioned else len(df))
+precomputed = None if approx else artifacts.lookup(
+    st.secrets, "환자정보", metrics.overview_params(start, end, age_band, gender), stamp, load_artifact_run
 )
 
-filtered = df[
-    (df['진료일자'] >= pd.to_datetime(start_date)) &
-    (df['진료일자'] <= pd.to_datetime(end_date)) &
-    (df['연령대'].isin(age_band))
-]
-if gender != "전체":
-    filtered = filtered[filtered['성별'] == gender]
-
-# 4) KPI 카드
-patients_in_period = len(filtered.drop_duplicates("환자번호"))
-counts_in_period = len(filtered)
-new_count = len(filtered[filtered['초/재진'] == "신환"])
-return_count = len(filtered[filtered['초/재진'] != "신환"])
+with st.sidebar.expander("메모리 사용량", False):
+    st.dataframe(memory_report({"방문": curr_period if partitioned else df}), hide_index=True)
+    if cube is not None:
+        st.caption(f"집계 큐브: 셀 {len(cube.cells):,}개, {cube.nbytes() / 2**20:.1f} MB")
+
+# 데이터 내보내기 (버튼을 누를 때 조각 단위로 임시 파일에 써서 내려준다)
+with st.sidebar.expander("데이터 내보내기", False):
+    export_builders = export.table_builders(filtered)
+    export_tables = st.multiselect("내보낼 표", list(export_builders), default=list(export_builders)[:1])
+    export_fmt = st.radio("파일 형식", list(export.FORMATS), horizontal=True)
+    if export_tables:
+        st.download_button(
+            "내려받기",
+            data=export.deferred(export_fmt, lambda: {name: export_builders[name]() for name in export_tables}),
+            file_name=export.file_name(f"환자정보_{start:%Y%m%d}_{end:%Y%m%d}", export_fmt, len(export_tables)),
+            mime=export.mime(export_fmt, len(export_tables)),
+        )
+
+# 4) KPI 카드 (사전 계산 결과, 큐브가 있으면 셀 합계와 스케치 병합으로, 없으면 원본 행에서)
+if precomputed is not None:
+    kpi = precomputed.scalars
+elif cube is not None:
+    age_count = cube.sum('나이수', cube_where)
+    kpi = {
+        '환자수': cube.distinct(cube_where, exact=not approx),
+        '진료 횟수': int(cube.sum('방문수', cube_where)),
+        '신환수': int(cube.sum('신환수', cube_where)),
+        '평균 연령': cube.sum('나이합', cube_where) / age_count if age_count else float('nan'),
+    }
+else:
+    kpi = metrics.overview_kpis(filtered)
+patients_in_period, counts_in_period = kpi['환자수'], kpi['진료 횟수']
+new_count, avg_age = kpi['신환수'], kpi['평균 연령']
+return_count = counts_in_period - new_count
 new_ratio = new_count / counts_in_period if counts_in_period else 0
 return_ratio = return_count / counts_in_period if counts_in_period else 0
-avg_age = filtered['나이'].mean()
 
 col1, col2, col3, col4, col5 = st.columns(5)
 col1.metric("환자수", f"{patients_in_period:,}명")
@@ -108,25 +194,39 @@ col3.metric("신환 비율", f"{new_ratio:.1%}")
 col4.metric("재방문 비율", f"{return_ratio:.1%}")
 col5.metric("평균 연령", f"{avg_age:.1f}세")
 
+# 연령 구간별 내원 (1세 단위 히스토그램을 고른 구간으로 합산)
+st.subheader("연령 구간별 내원")
+band_col, edge_col = st.columns([1, 3])
+band_name = band_col.selectbox("연령 구간", list(BANDINGS) + [CUSTOM])
+banding = BANDINGS.get(band_name, BANDINGS["10세 단위"])
+if band_name == CUSTOM:
+    edges = edge_col.text_input("구간 시작 나이 (쉼표 구분)", "0, 7, 13, 19, 30, 65")
+    try:
+        banding = parse_edges(edges)
+    except ValueError as e:
+        edge_col.error(str(e))
+
+if precomputed is not None:
+    age_hist = precomputed.table('연령')['내원수'].values
+elif cube is not None:
+    age_hist = cube.age_hist(cube_where)
+else:
+    age_hist = age_histogram(filtered.column('나이'))
+age_dist = banding.frame(age_hist, '내원수')
+age_chart = alt.Chart(age_dist).mark_bar().encode(
+    x=alt.X('연령대:N', sort=banding.labels, title='연령 구간', axis=alt.Axis(labelAngle=0)),
+    y=alt.Y('내원수:Q', title='내원수'),
+    tooltip=['연령대', alt.Tooltip('내원수:Q', format=',')]
+).properties(height=300)
+st.altair_chart(age_chart, use_container_width=True)
+
 st.markdown("---")
 
 # 5) 일별 내원 추이 (토글 가능한 추세선)
 st.subheader("일별 내원 추이")
 
-# 일별 집계
-daily = (
-    filtered
-    .groupby('진료일자')
-    .size()
-    .reset_index(name='환자수')
-    .sort_values('진료일자')
-)
-
-# 이동평균 컬럼 추가
-daily['MA6']  = daily['환자수'].rolling(window=6,  min_periods=1).mean()
-daily['MA30'] = daily['환자수'].rolling(window=30, min_periods=1).mean()
-daily['MA60'] = daily['환자수'].rolling(window=60, min_periods=1).mean()
-daily['MA90'] = daily['환자수'].rolling(window=90, min_periods=1).mean()
+# 일별 집계 + 이동평균
+daily = precomputed.table('일별') if precomputed is not None else metrics.daily_trend(filtered)
 
 # long form 변환
 melted = daily.melt(
@@ -201,41 +301,8 @@ final_chart = (
 )
 st.altair_chart(final_chart, use_container_width=True)
 
-# 일별 집계
-daily2 = (
-    df
-    .groupby('진료일자')
-    .size()
-    .reset_index(name='환자수')
-    .sort_values('진료일자')
-)
-
-# 기준 기간 정의
-start = pd.to_datetime(start_date)
-end   = pd.to_datetime(end_date)
-
-# 전년 동기 기간
-ly_start = start - pd.DateOffset(years=1)
-ly_end   = end   - pd.DateOffset(years=1)
-
-# 기간별 필터링
-curr = daily2[(daily2['진료일자'] >= start) & (daily2['진료일자'] <= end)].copy()
-ly   = daily2[(daily2['진료일자'] >= ly_start) & (daily2['진료일자'] <= ly_end)].copy()
-
-# 전년 데이터를 '금년 날짜'로 옮겨오기
-ly['pseudo_date'] = ly['진료일자'] + pd.DateOffset(years=1)
-
-# 비교용 컬럼 추가
-curr['year_group'] = '조회 기간'
-ly  ['year_group'] = '전년 동기'
-
-# 날짜 컬럼 통일
-curr['plot_date'] = curr['진료일자']
-ly  ['plot_date'] = ly['pseudo_date']
-
-# 합치기
-comp = pd.concat([curr[['plot_date','환자수','year_group', '진료일자']],
-                  ly  [['plot_date','환자수','year_group', '진료일자']]])
+# 기간별 일별 집계 (전년 데이터는 '금년 날짜'로 옮긴 plot_date)
+comp = precomputed.table('전년 비교') if precomputed is not None else metrics.yoy_daily(curr_period, ly_period)
 
 comp_area = (
     alt.Chart(comp)
@@ -275,40 +342,8 @@ final_comp_chart = comp_area + comp_hover
 # st.subheader("전년 동기 내원 추이 비교")
 # #st.altair_chart(final_comp_chart, use_container_width=True)
 
-# 1) 선택 기간 월별 집계
-curr_monthly = (
-    filtered
-    .groupby(pd.Grouper(key='진료일자', freq='M'))
-    .size()
-    .reset_index(name='환자수')
-)
-# 2) 전년 동기 월별 집계
-ly_filtered = df[
-    (df['진료일자'] >= (pd.to_datetime(start_date) - pd.DateOffset(years=1))) &
-    (df['진료일자'] <= (pd.to_datetime(end_date)   - pd.DateOffset(years=1)))
-]
-ly_monthly = (
-    ly_filtered
-    .groupby(pd.Grouper(key='진료일자', freq='M'))
-    .size()
-    .reset_index(name='환자수')
-)
-# 3) 날짜를 비교하기 쉽게 연동
-ly_monthly['진료일자'] = ly_monthly['진료일자'] + pd.DateOffset(years=1)
-# 4) growth_rate 계산
-monthly = curr_monthly.merge(
-    ly_monthly.rename(columns={'환자수':'ly_환자수'}),
-    on='진료일자', how='left'
-)
-monthly['growth_rate'] = (monthly['환자수'] - monthly['ly_환자수']) / monthly['ly_환자수']
-
-# NaN을 0으로 채우고 int로 변환
-monthly['ly_환자수'] = monthly['ly_환자수'].fillna(0).astype(int)
-
-monthly['count_label'] = (
-    monthly['ly_환자수'].map(lambda x: f"{x:,}명") + "\\n-> " +
-    monthly['환자수'].map(lambda x: f"{x:,}명")
-)
+# 월별 집계와 전년 동월 대비 성장률
+monthly = precomputed.table('월별') if precomputed is not None else metrics.monthly_growth(filtered, ly_period)
 
 # 5) 월간 성장률 차트
 # 1) 막대 차트
@@ -385,8 +420,7 @@ with col2:
 
 # 7) 요일×시간대 히트맵
 st.subheader("요일×시간대 내원 패턴")
-filtered['요일'] = filtered['진료일자'].dt.day_name()
-heat = filtered.groupby(['요일', '진료시간대']).size().reset_index(name='count')
+heat = precomputed.table('히트맵') if precomputed is not None else metrics.visit_heatmap(engine, curr_period, filters)
 heat_chart = alt.Chart(heat).mark_rect().encode(
     x=alt.X('진료시간대:O', title="시간대", axis=alt.Axis(labelAngle=0)),
     y=alt.Y('요일:O', sort=['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']),
@@ -394,11 +428,158 @@ heat_chart = alt.Chart(heat).mark_rect().encode(
 )
 st.altair_chart(heat_chart, use_container_width=True)
 
+# 방문 간격 분석 (전체 이력 간격 색인, 월 파티션 저장소면 조회 기간 데이터로 색인)
+st.subheader("방문 간격 분석")
+if partitioned:
+    gap_source = curr_period
+    gaps = load_period_visit_gaps(start, end)
+    gap_rows = filtered.mask
+else:
+    gap_source = df
+    gaps = load_visit_gaps()
+    gap_rows = np.zeros(len(gaps), dtype=bool)
+    gap_rows[curr_period.index.values[filtered.mask]] = True
+
+period_gaps = gaps.gaps(gap_rows)
+retention_days = 90
+g1, g2, g3, g4 = st.columns(4)
+g1.metric("방문 간격 중앙값", f"{np.median(period_gaps):.0f}일" if len(period_gaps) else "-")
+g2.metric("30일 내 재방문율", f"{gaps.revisit_rate(gap_rows, 30, max_date):.1%}")
+g3.metric("90일 내 재방문율", f"{gaps.revisit_rate(gap_rows, 90, max_date):.1%}")
+# 기간 종료 후 90일을 다 지켜볼 수 있을 때만
+if end + pd.Timedelta(days=retention_days) <= pd.Timestamp(max_date):
+    g4.metric(f"기간 후 {retention_days}일 유지율", f"{gaps.retention(start, end, retention_days, gap_rows):.1%}")
+else:
+    g4.metric(f"기간 후 {retention_days}일 유지율", "-", help="기간 종료 후 90일치 데이터가 아직 없습니다.")
+
+gap_by = st.radio("간격 분포 기준", ["연령대", "시/도", "신환 코호트"], horizontal=True)
+if gap_by == "신환 코호트":
+    gap_groups = gaps.cohort_labels(gap_rows)
+else:
+    gap_groups = gap_source[gap_by].values[gap_rows]
+gap_dist = gaps.distribution(gap_groups, gap_rows)
+gap_hist = gaps.histogram(gap_groups, gap_rows)
+
+if gap_dist.empty:
+    st.info("기간 내 재방문이 없습니다.")
+else:
+    gap_chart = alt.Chart(gap_hist).mark_bar().encode(
+        x=alt.X('건수:Q', stack='normalize', title='간격 구간 비중', axis=alt.Axis(format='%')),
+        y=alt.Y('그룹:N', sort=gap_dist['그룹'].astype(str).tolist(), title=gap_by),
+        color=alt.Color('구간:N', sort=gap_labels(), scale=alt.Scale(scheme='blues'), title='방문 간격'),
+        order=alt.Order('구간_순서:Q'),
+        tooltip=['그룹', '구간', alt.Tooltip('건수:Q', format=',')]
+    ).transform_calculate(
+        구간_순서=f"indexof({gap_labels()}, datum.구간)"
+    ).properties(height=max(200, 28 * len(gap_dist)))
+    st.altair_chart(gap_chart, use_container_width=True)
+    st.dataframe(
+        gap_dist.style.format({'간격 수': '{:,}', '평균': '{:.1f}', '25%': '{:.0f}', '중앙값': '{:.0f}',
+                               '75%': '{:.0f}', '90%': '{:.0f}'}),
+        hide_index=True
+    )
+
+# 다음 방문 예상: 기간 내 환자의 마지막 방문일 + 본인 간격 중앙값 (데이터 마지막 날 이후 8주)
+as_of = np.datetime64(pd.Timestamp(max_date).date(), "D")
+gap_patients = gaps.patients(gap_rows)
+expected = gaps.expected_next()[gap_patients]
+upcoming = (expected > as_of) & (expected <= as_of + 56)
+if upcoming.any():
+    weeks = ((expected[upcoming] - as_of).astype(np.int64) - 1) // 7
+    weekly = pd.DataFrame({
+        '주차': [f"{w + 1}주 후" for w in range(8)],
+        '예상 방문 환자수': np.bincount(weeks, minlength=8),
+    })
+    next_chart = alt.Chart(weekly).mark_bar(color='#6baed6').encode(
+        x=alt.X('주차:N', sort=weekly['주차'].tolist(), title='', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('예상 방문 환자수:Q'),
+        tooltip=['주차', alt.Tooltip('예상 방문 환자수:Q', format=',')]
+    ).properties(height=250, title='다음 방문 예상 (마지막 방문일 + 본인 방문 간격 중앙값)')
+    st.altair_chart(next_chart, use_container_width=True)
+
+    soon = gap_patients[upcoming]
+    soon = soon[np.argsort(expected[upcoming], kind='stable')][:200]
+    with st.expander(f"다음 방문 예상 환자 ({int(upcoming.sum()):,}명 중 가까운 순 {len(soon)}명)", False):
+        st.dataframe(pd.DataFrame({
+            '환자번호': np.asarray(gap_source['환자번호'].cat.categories)[soon],
+            '방문일 수': gaps.n_days[soon],
+            '마지막 방문': gaps.last[soon].astype('datetime64[D]'),
+            '간격 중앙값(일)': gaps.typical[soon],
+            '다음 방문 예상': gaps.expected_next()[soon],
+        }), hide_index=True)
+
+# 병원 반경 분석 (전체 이력 좌표 색인, 월 파티션 저장소면 조회 기간 데이터로 색인)
+st.subheader("병원 반경 분석")
+if partitioned:
+    loc_source = curr_period
+    loc_index = load_period_location_index(start, end)
+    loc_rows = None
+else:
+    # 조회 기간은 전체 데이터의 연속 구간이고 인덱스는 0..n-1 이라 인덱스 값이 곧 행 위치다
+    loc_source = df
+    loc_index = load_location_index()
+    loc_rows = curr_period.index.values
+
+clinic = clinic_location(st.secrets)
+if clinic is None and len(loc_index):
+    clinic = {"name": "환자 위치 중앙", "lat": float(np.median(loc_index.lat)), "lon": float(np.median(loc_index.lon))}
+    st.caption("[clinic] 설정이 없어 환자 위치의 중앙값을 기준점으로 씁니다.")
+
+if clinic is None:
+    st.info("좌표가 있는 방문이 없습니다.")
+else:
+    radius = st.slider("반경 (km)", 1, 30, 5)
+    near = loc_index.rows(loc_index.within(clinic["lat"], clinic["lon"], radius), loc_rows)
+    row_loc = loc_index.row_loc if loc_rows is None else loc_index.row_loc[loc_rows]
+    with_coords = filtered.where(row_loc >= 0)
+    in_radius = filtered.where(near)
+    radius_patients = in_radius.nunique_patients()
+    coord_patients = with_coords.nunique_patients()
+
+    r1, r2, r3 = st.columns(3)
+    r1.metric(f"{radius}km 내 환자수", f"{radius_patients:,}명")
+    r2.metric(f"{radius}km 내 신환수", f"{in_radius.count(('초/재진', '==', '신환')):,}명")
+    r3.metric("좌표 있는 환자 중 비중", f"{radius_patients / coord_patients:.1%}" if coord_patients else "-")
+
+    nearest = loc_index.nearest(clinic["lat"], clinic["lon"])
+    if nearest >= 0:
+        region = loc_source.iloc[loc_index.first_row[nearest]]
+        gap = loc_index.distances(clinic["lat"], clinic["lon"])[nearest]
+        st.caption(
+            f"{clinic['name']} 위치에서 가장 가까운 환자 위치의 행정동: "
+            f"{region['시/도']} {region['시/군/구']} {region['행정동']} ({gap:.2f}km)"
+        )
+
+    # 거리 구간별 환자·신환 수 (위치별 거리 → 구간 → 방문 행)
+    band_names = band_labels()
+    loc_band = distance_band(loc_index.distances(clinic["lat"], clinic["lon"]))
+    row_band = loc_index.rows(loc_band, loc_rows, fill=-1)[filtered.mask]
+    bands = pd.DataFrame({
+        '구간': row_band,
+        '환자번호': filtered.column('환자번호').values,
+        '신환': (filtered.column('초/재진') == '신환').values,
+    })
+    bands = bands[bands['구간'] >= 0].groupby('구간').agg(환자수=('환자번호', 'nunique'), 신환수=('신환', 'sum'))
+    bands = bands.reindex(range(len(band_names)), fill_value=0).reset_index(drop=True)
+    bands.insert(0, '거리', band_names)
+    bands['환자 비중'] = bands['환자수'] / coord_patients if coord_patients else 0.0
+
+    band_chart = alt.Chart(bands).mark_bar().encode(
+        x=alt.X('거리:N', sort=band_names, title='병원과의 거리', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('환자수:Q', title='환자수'),
+        tooltip=['거리', alt.Tooltip('환자수:Q', format=','), alt.Tooltip('신환수:Q', format=','),
+                 alt.Tooltip('환자 비중:Q', format='.1%')]
+    ).properties(height=300)
+    st.altair_chart(band_chart, use_container_width=True)
+    st.dataframe(bands.style.format({'환자수': '{:,}', '신환수': '{:,}', '환자 비중': '{:.1%}'}), hide_index=True)
+
 # 7) 환자 지도 분포
 st.subheader("환자 지도 분포")
 m = folium.Map(location=[37.5665, 126.9780], zoom_start=7)
-filtered['x'].replace("", pd.NA, inplace=True)
-filtered['y'].replace("", pd.NA, inplace=True)
-data = list(filtered.dropna(subset=['y','x'])[['y','x']].itertuples(index=False, name=None))
+# 좌표는 적재 시 실수형으로 바뀌어 빈 칸이 NaN 이다
+data = list(filtered.frame(['y', 'x']).dropna().itertuples(index=False, name=None))
 FastMarkerCluster(data).add_to(m)
+if clinic is not None:
+    folium.Marker([clinic["lat"], clinic["lon"]], tooltip=clinic["name"], icon=folium.Icon(color="red")).add_to(m)
+    folium.Circle([clinic["lat"], clinic["lon"]], radius=radius * 1000, color="#e6550d", fill=False).add_to(m)
 folium_static(m, width=800, height=600)